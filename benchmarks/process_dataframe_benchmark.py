@@ -0,0 +1,86 @@
+"""
+Benchmark of process_dataframe against its former row-by-row implementation on the full
+election dataset. The outputs of both are checked to be equal before the times are reported.
+
+Usage (from the root of the repository):
+- python benchmarks/process_dataframe_benchmark.py [DATA_PATH] [--repeat N]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.data_processing import extract_data, process_dataframe
+
+DATA_PATH = './data/wiki-RfA.txt'
+
+
+def process_dataframe_reference(df):
+    """
+    Former implementation of process_dataframe: per-row 'RES' mapping, positional date fixes
+    and 'ELECTION_ID' assigned with iterrows.
+    """
+    df['DAT'] = df['DAT'].replace('', np.nan)
+    df['SRC'] = df['SRC'].replace('', np.nan)
+
+    numeric_columns = ['VOT', 'RES', 'YEA']
+    df[numeric_columns] = df[numeric_columns].apply(lambda x: pd.to_numeric(x, errors='coerce'))
+
+    df['RES'] = df['RES'].apply(lambda x: 1 if x == 1 else 0)
+
+    df['DAT'] = pd.to_datetime(df['DAT'], format='mixed', errors='coerce')
+
+    df.at[6821, 'DAT'] = pd.to_datetime('2012-07-01 14:47')
+    df.at[27608, 'DAT'] = pd.to_datetime('2010-01-03 20:44')
+    df.at[116963, 'DAT'] = pd.to_datetime('2007-05-26 14:47')
+    df.at[70591, 'DAT'] = pd.to_datetime('2008-05-24 03:29')
+
+    df['ELECTION_ID'] = 0
+    current_id = 1
+
+    for index, row in df.iterrows():
+        tgt_value = row['TGT']
+
+        if index > 0 and df.at[index - 1, 'TGT'] != tgt_value:
+            current_id += 1
+
+        df.at[index, 'ELECTION_ID'] = current_id
+
+
+def best_time(func, raw_df, repeat):
+    """
+    Returns the best time of func over repeat runs on copies of raw_df, and its last output.
+    """
+    times = []
+    for _ in range(repeat):
+        df = raw_df.copy()
+        start = time.perf_counter()
+        func(df)
+        times.append(time.perf_counter() - start)
+    return min(times), df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default=DATA_PATH)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    raw_df = extract_data(args.data_path)
+    print(f'{len(raw_df)} votes in {args.data_path}')
+
+    reference_time, reference_df = best_time(process_dataframe_reference, raw_df, 1)
+    new_time, new_df = best_time(process_dataframe, raw_df, args.repeat)
+    pd.testing.assert_frame_equal(new_df, reference_df)
+
+    print(f'reference (iterrows): {reference_time:8.3f} s')
+    print(f'process_dataframe:    {new_time:8.3f} s')
+    print(f'speedup:              {reference_time / new_time:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Throughput benchmark of remove_wiki_markup and remove_wiki_markup_batch, in comments per
+second, against the former twelve-pass implementation on the comments of the election
+dataset. The outputs are checked to be equal before the throughputs are reported.
+
+Usage (from the root of the repository):
+- python benchmarks/wiki_markup_benchmark.py [DATA_PATH] [--repeat N]
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from modules.data_processing import extract_data, remove_wiki_markup, remove_wiki_markup_batch
+
+DATA_PATH = './data/wiki-RfA.txt'
+
+
+def remove_wiki_markup_reference(txt):
+    """
+    Former implementation of remove_wiki_markup: twelve uncompiled re.sub passes.
+    """
+    cleaned_txt = re.sub(r"\[\[.*?\]\]", "", txt)
+    cleaned_txt = re.sub(r"&[a-zA-Z]+;|&#[0-9]+;", "", cleaned_txt)
+    cleaned_txt = re.sub(r"'''(.*?)'''", r"\1", cleaned_txt)
+    cleaned_txt = re.sub(r"''(.*?)''", r"\1", cleaned_txt)
+    cleaned_txt = re.sub(r"<.*?>", "", cleaned_txt)
+    cleaned_txt = re.sub(r"\[\[.*?\|([^\]]*?)\]\]", r"\1", cleaned_txt)
+    cleaned_txt = re.sub(r"\[http[^\]]*?\]", "", cleaned_txt)
+    cleaned_txt = re.sub(r"\{\{.*?\}\}", "", cleaned_txt)
+    cleaned_txt = re.sub(r"==([^=]+)==", r"\1", cleaned_txt)
+    cleaned_txt = re.sub(r"==([^=]+)==", r"\1", cleaned_txt)
+    cleaned_txt = re.sub(r'--', ' ', cleaned_txt)
+    cleaned_txt = re.sub(r"'''", ' ', cleaned_txt)
+    return cleaned_txt
+
+
+def best_time(func, texts, repeat):
+    """
+    Returns the best time of func(texts) over repeat runs, and its output.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(texts)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('data_path', nargs='?', default=DATA_PATH)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    texts = extract_data(args.data_path)['TXT']
+    print(f'{len(texts)} comments ({texts.nunique()} distinct) in {args.data_path}')
+
+    variants = [
+        ('reference (Series.apply)', lambda txt: txt.apply(remove_wiki_markup_reference)),
+        ('remove_wiki_markup (Series.apply)', lambda txt: txt.apply(remove_wiki_markup)),
+        ('remove_wiki_markup_batch', remove_wiki_markup_batch),
+    ]
+    expected = None
+    for name, func in variants:
+        seconds, cleaned = best_time(func, texts, args.repeat)
+        if expected is None:
+            expected = cleaned
+        elif not cleaned.equals(expected):
+            raise AssertionError(f'{name} differs from the reference')
+        print(f'{name:<36} {len(texts) / seconds:14,.0f} comments/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+USER_COLUMNS = ['SRC', 'TGT', 'USER', 'USR1', 'USR2']
+
+
+def user_categories(*dfs):
+    """
+    Collects the sorted usernames appearing in the user columns ('SRC', 'TGT', 'USER',
+    'USR1', 'USR2') of the given DataFrames, to be used as the shared dictionary of to_compact.
+
+    Parameters:
+    - dfs (pandas DataFrames): e.g. wiki_df, voters_df, candidates_df.
+
+    Returns:
+    - users (pandas Index): Sorted unique usernames.
+    """
+    names = [df[column].dropna().astype(object) for df in dfs for column in USER_COLUMNS if column in df]
+    if not names:
+        return pd.Index([], dtype=object)
+    return pd.Index(pd.unique(pd.concat(names))).sort_values()
+
+
+def to_compact(df, path, users=None):
+    """
+    Writes a DataFrame (processed votes table or summary table) to an uncompressed Arrow
+    IPC (Feather v2) file that can be memory-mapped and read column by column:
+
+    - user columns are dictionary-encoded against users, so that the user codes are the
+      same in every file written with the same users,
+    - integer columns are narrowed to the smallest integer type holding their values
+      (e.g. 'VOT' and 'RES' as int8, 'YEA' as int16),
+    - text columns are stored as Arrow strings, i.e. one buffer and an offsets array.
+
+    Parameters:
+    - df (pandas DataFrame): DataFrame to write.
+    - path (str): Destination file.
+    - users (pandas Index, optional): Shared user dictionary, by default user_categories(df).
+      A ValueError is raised if it lacks some of the usernames of df.
+    """
+    if users is None:
+        users = user_categories(df)
+
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if column in USER_COLUMNS:
+            codes = pd.Categorical(values.astype(object), categories=users)
+            unknown = values.notna().to_numpy() & (codes.codes == -1)
+            if unknown.any():
+                raise ValueError(f'Usernames of column {column!r} missing from users: '
+                                 f'{list(pd.unique(values[unknown]))}')
+            values = codes
+        elif pd.api.types.is_integer_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            values = pd.to_numeric(values, downcast='integer')
+        columns[column] = values
+
+    compact_df = pd.DataFrame(columns, index=df.index)
+    feather.write_feather(pa.Table.from_pandas(compact_df), path, compression='uncompressed')
+
+
+def load_compact(path, columns=None, memory_map=True):
+    """
+    Reads a file written by to_compact.
+
+    With memory_map, the file is mapped instead of read, so only the buffers of the
+    requested columns are ever loaded: e.g. columns=['SRC', 'TGT', 'VOT'] for graph work
+    does not touch the text.
+
+    Parameters:
+    - path (str): File written by to_compact.
+    - columns (list of str, optional): Columns to load, all by default.
+    - memory_map (bool): Whether to memory-map the file.
+
+    Returns:
+    - df (pandas DataFrame): The loaded DataFrame, user columns being categorical.
+    """
+    if columns is not None:
+        # keep the stored index (e.g. of a filtered votes table) along with the projection
+        with pa.memory_map(path) as source:
+            metadata = pa.ipc.open_file(source).schema.pandas_metadata or {}
+        index_columns = [name for name in metadata.get('index_columns', []) if isinstance(name, str)]
+        columns = list(columns) + [name for name in index_columns if name not in columns]
+
+    table = feather.read_table(path, columns=columns, memory_map=memory_map)
+    return table.to_pandas()
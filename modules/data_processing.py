@@ -1,34 +1,328 @@
 import pandas as pd
 import numpy as np
+import os
 import re
-from collections import defaultdict
+import tempfile
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 
-def extract_data(file_path):
+VOTE_FIELDS = ['SRC', 'TGT', 'VOT', 'RES', 'YEA', 'DAT', 'TXT']
+VOTE_DATE_FORMAT = '%H:%M, %d %B %Y'
+DEFAULT_CHUNKSIZE = 50000
+
+# Link form of the usernames in the auxiliary datasets, e.g. '[[User:Rich Farmbrough|Rich Farmbrough]]'
+USER_LINK_PATTERN = re.compile(r'\[\[User:[^\|]+\|([^\]]+)\]\]')
+
+
+class UserRegistry:
+    """
+    Interns usernames into dense int32 ids shared by all the DataFrames of the analysis, so
+    that joins, graph construction and membership tests run on integer arrays instead of
+    strings. Ids are given in order of first appearance and never change once assigned.
+
+    Usernames are normalized first: the '[[User:x|y]]' link form is replaced by 'y', as done
+    by the format_* functions. Missing and empty usernames get the id -1.
+
+    Usage:
+    - registry = UserRegistry()
+    - wiki_df = extract_data(DATA_PATH, registry=registry)         # adds 'SRC_ID' and 'TGT_ID'
+    - voters_df = create_voters_df(wiki_df, registry=registry)     # adds 'USER_ID'
+    - registry.add_id_columns(edits_df, ['user_name'])             # adds 'user_name_ID'
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        self.intern(list(names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return self.normalize(name) in self.ids
+
+    @staticmethod
+    def normalize(name):
+        """
+        Returns the username without the '[[User:...|...]]' link form, None if it is missing.
+        """
+        if not isinstance(name, str) or not name:
+            return None
+        match = USER_LINK_PATTERN.match(name)
+        return match.group(1) if match else name
+
+    def _codes(self, names, add):
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+        unique_ids = np.empty(len(uniques) + 1, dtype=np.int32)
+        unique_ids[-1] = -1
+        for i, name in enumerate(uniques):
+            name = self.normalize(name)
+            if name is None:
+                unique_ids[i] = -1
+            elif name in self.ids:
+                unique_ids[i] = self.ids[name]
+            elif add:
+                unique_ids[i] = self.ids[name] = len(self.names)
+                self.names.append(name)
+            else:
+                unique_ids[i] = -1
+        # the -1 codes of the missing values pick the trailing -1
+        return unique_ids[codes]
+
+    def intern(self, names):
+        """
+        Returns the ids of the usernames, registering the ones not seen yet.
+
+        Parameters:
+        - names (array-like of str): Usernames, possibly in the '[[User:x|y]]' form.
+
+        Returns:
+        - ids (numpy.ndarray of int32): The id of each username, -1 when it is missing.
+        """
+        return self._codes(names, add=True)
+
+    def lookup(self, names):
+        """
+        Returns the ids of the usernames without registering anything, -1 for the unknown ones.
+        """
+        return self._codes(names, add=False)
+
+    def name(self, ids):
+        """
+        Returns the usernames of the ids, None for -1.
+        """
+        ids = np.asarray(ids)
+        names = np.array(self.names + [None], dtype=object)
+        return names[np.where(ids < 0, len(self.names), ids)]
+
+    def categories(self):
+        """
+        Returns the usernames ordered by id, e.g. as the shared user dictionary of to_compact,
+        in which case the stored codes are the ids themselves.
+        """
+        return pd.Index(self.names, dtype=object)
+
+    def add_id_columns(self, df, columns):
+        """
+        Adds in place an int32 id column named '<column>_ID' next to each username column.
+
+        Parameters:
+        - df (pandas DataFrame): DataFrame to modify.
+        - columns (list of str): Username columns, e.g. ['SRC', 'TGT'].
+
+        Returns:
+        - df (pandas DataFrame): The modified DataFrame.
+        """
+        for column in columns:
+            df[f'{column}_ID'] = self.intern(df[column])
+        return df
+
+
+def _iter_vote_records(data_file):
+    """
+    Yields the records of the Wikipedia Admin Elections text file one at a time.
+
+    A record ends at a blank line, or when one of its keys shows up a second time, so that
+    a missing line only leaves an empty field in its own record instead of misaligning the
+    records after it.
+
+    Parameters:
+    - data_file (file object): The opened text file.
+
+    Returns:
+    - record (dict): Mapping from key ('SRC', 'TGT', ...) to the raw string value.
+    """
+    record = {}
+    for line in data_file:
+        formatted_line = line.strip()
+        if not formatted_line:
+            if record:
+                yield record
+                record = {}
+            continue
+
+        key, _, value = formatted_line.partition(':')
+        if key in record:
+            yield record
+            record = {}
+        record[key] = value
+
+    if record:
+        yield record
+
+
+def extract_data(file_path, registry=None):
     """
     Extracts data corresponding to Wikipedia Admin Elections from corresponding text file.
     
     Parameters:
     - file_path (str): The path to the text file.
+    - registry (UserRegistry, optional): If given, the 'SRC_ID' and 'TGT_ID' columns are added.
 
     Returns:
     - df (pandas.DataFrame): A DataFrame containing the parsed data with the specified columns.
     """
     
-    data = []
-    data_dict = defaultdict(list)
+    data_dict = {field: [] for field in VOTE_FIELDS}
     
     with open(file_path, encoding ='utf-8') as data_file:
-        for line in data_file: 
-            formatted_line = line.strip()
-            if formatted_line:
-                # parsing the line 
-                parsed_line = formatted_line.split(':', 1)
-                data_dict[parsed_line[0]].append(parsed_line[1])
+        for record in _iter_vote_records(data_file):
+            for field in VOTE_FIELDS:
+                data_dict[field].append(record.get(field, ''))
                 
     df = pd.DataFrame(data_dict)
+    if registry is not None:
+        registry.add_id_columns(df, ['SRC', 'TGT'])
     return df
 
 
+def _parse_vote_dates(dates):
+    """
+    Converts raw 'DAT' strings to datetime. Almost all of them follow VOTE_DATE_FORMAT,
+    so they are parsed with it first and only the remaining ones go through the (much
+    slower) format='mixed' inference, which gives the same result as parsing everything
+    with format='mixed'.
+    """
+    dates = pd.Series(dates, dtype=object)
+    parsed = pd.to_datetime(dates, format=VOTE_DATE_FORMAT, errors='coerce')
+    remaining = parsed.isna() & dates.notna() & (dates != '')
+    if remaining.any():
+        parsed[remaining] = pd.to_datetime(dates[remaining], format='mixed', errors='coerce')
+    return parsed
+
+
+def _narrow_integers(values, dtype):
+    """
+    Converts raw strings to the given integer dtype, falling back to the nullable
+    version of that dtype (e.g. 'Int8') when some values are missing or invalid.
+    """
+    numeric = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    if numeric.isna().any():
+        return numeric.astype(np.dtype(dtype).name.capitalize()).array
+    return numeric.to_numpy(dtype=dtype)
+
+
+class VoteChunk:
+    """
+    Typed columns for a block of consecutive votes of the Wikipedia Admin Elections text file.
+
+    'SRC' and 'TGT' are categorical, 'VOT' and 'RES' int8, 'YEA' int16 and 'DAT' datetime64.
+    The comments are not stored as one Python object per vote but in a single string buffer:
+    the comment of the i-th vote of the chunk is txt_buffer[txt_offsets[i]:txt_offsets[i + 1]].
+    """
+
+    def __init__(self, columns, txt_buffer, txt_offsets, start=0):
+        self.columns = columns
+        self.txt_buffer = txt_buffer
+        self.txt_offsets = txt_offsets
+        self.start = start
+
+    def __len__(self):
+        return len(self.txt_offsets) - 1
+
+    def txt(self, i):
+        """
+        Returns the comment of the i-th vote of the chunk.
+        """
+        return self.txt_buffer[self.txt_offsets[i]:self.txt_offsets[i + 1]]
+
+    def to_frame(self, with_text=True):
+        """
+        Builds a DataFrame from the chunk, indexed by the position of the votes in the file.
+
+        Parameters:
+        - with_text (bool): Whether to materialize the 'TXT' column.
+
+        Returns:
+        - df (pandas.DataFrame): The typed votes of the chunk.
+        """
+        df = pd.DataFrame(self.columns, index=pd.RangeIndex(self.start, self.start + len(self)))
+        if with_text:
+            df['TXT'] = [self.txt(i) for i in range(len(self))]
+        return df
+
+
+def _build_vote_chunk(records, start, registry=None):
+    columns = {}
+    for field in ['SRC', 'TGT']:
+        columns[field] = pd.Categorical([record.get(field) or None for record in records])
+        if registry is not None:
+            columns[f'{field}_ID'] = registry.intern(columns[field])
+    for field, dtype in [('VOT', np.int8), ('RES', np.int8), ('YEA', np.int16)]:
+        columns[field] = _narrow_integers([record.get(field, '') for record in records], dtype)
+    columns['DAT'] = _parse_vote_dates([record.get('DAT', '') for record in records]).to_numpy()
+
+    texts = [record.get('TXT', '') for record in records]
+    txt_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=txt_offsets[1:])
+
+    return VoteChunk(columns, ''.join(texts), txt_offsets, start)
+
+
+def iter_vote_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, registry=None):
+    """
+    Streams the Wikipedia Admin Elections text file as fixed-size chunks of typed columns,
+    so that only one chunk of raw strings is alive at any time.
+
+    Parameters:
+    - file_path (str): The path to the text file.
+    - chunksize (int): Number of votes per chunk (the last one may be smaller).
+    - registry (UserRegistry, optional): If given, the int32 'SRC_ID' and 'TGT_ID' columns are added.
+
+    Returns:
+    - chunk (VoteChunk): The typed votes, one chunk at a time.
+    """
+    with open(file_path, encoding='utf-8') as data_file:
+        records = _iter_vote_records(data_file)
+        start = 0
+        while True:
+            block = list(islice(records, chunksize))
+            if not block:
+                break
+            yield _build_vote_chunk(block, start, registry)
+            start += len(block)
+
+
+def read_votes(file_path, chunksize=None, with_text=True, registry=None):
+    """
+    Reads the Wikipedia Admin Elections text file into typed columns ('SRC'/'TGT' categorical,
+    'VOT'/'RES' int8, 'YEA' int16, 'DAT' datetime64) instead of the raw strings of extract_data.
+    Note that 'RES' keeps its raw -1/1 values and unparsable dates are left as NaT.
+
+    Parameters:
+    - file_path (str): The path to the text file.
+    - chunksize (int, optional): If given, returns an iterator of VoteChunk of that size
+      instead of a single DataFrame.
+    - with_text (bool): Whether to materialize the 'TXT' column.
+    - registry (UserRegistry, optional): If given, the int32 'SRC_ID' and 'TGT_ID' columns are added.
+
+    Returns:
+    - df (pandas.DataFrame) or iterator of VoteChunk.
+    """
+    if chunksize is not None:
+        return iter_vote_chunks(file_path, chunksize, registry)
+
+    frames = [chunk.to_frame(with_text) for chunk in iter_vote_chunks(file_path, registry=registry)]
+    if not frames:
+        return VoteChunk({}, '', np.zeros(1, dtype=np.int64)).to_frame(with_text)
+
+    df = pd.concat(frames)
+    for field in ['SRC', 'TGT']:
+        df[field] = pd.api.types.union_categoricals([frame[field] for frame in frames])
+    return df
+
+
+# Votes whose date is misspelled in the raw file, identified by (SRC, TGT, raw DAT) so that
+# the fix does not depend on the position of the vote in the file.
+DATE_PATCHES = pd.DataFrame([
+    ('JonasEncyclopedia', 'Zagalejo', '14:47, 1 Julu 2012', '2012-07-01 14:47'),
+    ('HJ Mitchell', 'Alan16', '20:44, 3 Janry 2010', '2010-01-03 20:44'),
+    ('QuasyBoy', 'Imdanumber1', '17:44, 26 Mya 2007', '2007-05-26 14:47'),
+    ('Pathoschild', 'Werdna', '31:29, 24 May 2008', '2008-05-24 03:29'),
+], columns=['SRC', 'TGT', 'DAT', 'FIXED_DAT'])
+
+
 def process_dataframe(df):
     """
     Processes a DataFrame in place by performing the following operations:
@@ -37,166 +331,270 @@ def process_dataframe(df):
     2. Converts specified numeric columns ('VOT', 'RES', 'YEA') to numeric, handling errors with NaN.
     3. Converts 'RES' column values to 1 if the value is 1, else 0.
     4. Converts 'DAT' column to datetime.
-    5. Updates specific values in 'DAT' column to predefined datetime values.
+    5. Updates the misspelled values of the 'DAT' column listed in DATE_PATCHES.
     6. Marks distinct elections with 'ELECTION_ID' column
     
     Parameters:
     - df (pd.DataFrame): The input DataFrame to be processed in place.
     """
-    df['DAT'].replace('', np.nan, inplace=True)
-    df['SRC'].replace('', np.nan, inplace=True)
+    # Look up the votes to patch on the raw strings, before they are converted
+    patch_rows = df[['SRC', 'TGT', 'DAT']].reset_index().merge(DATE_PATCHES, on=['SRC', 'TGT', 'DAT'])
+
+    df['DAT'] = df['DAT'].replace('', np.nan)
+    df['SRC'] = df['SRC'].replace('', np.nan)
     
     # Convert specified columns to numeric
     numeric_columns = ['VOT', 'RES', 'YEA']
     df[numeric_columns] = df[numeric_columns].apply(lambda x: pd.to_numeric(x, errors='coerce'))
     
     # Convert 'RES' column to 1 if value is 1, else 0
-    df['RES'] = df['RES'].apply(lambda x: 1 if x == 1 else 0)
+    df['RES'] = np.where(df['RES'] == 1, 1, 0)
     
-    # Convert 'DAT' column to datetime with specified format
-    df['DAT'] = pd.to_datetime(df['DAT'], format='mixed', errors='coerce')
+    # Convert 'DAT' column to datetime
+    df['DAT'] = _parse_vote_dates(df['DAT'])
     
-    # Update specific values in 'DAT' column
-    df.at[6821, 'DAT'] = pd.to_datetime('2012-07-01 14:47')
-    df.at[27608, 'DAT'] = pd.to_datetime('2010-01-03 20:44')
-    df.at[116963, 'DAT'] = pd.to_datetime('2007-05-26 14:47')
-    df.at[70591, 'DAT'] = pd.to_datetime('2008-05-24 03:29')
+    # Update the misspelled values in 'DAT' column
+    df.loc[patch_rows['index'], 'DAT'] = pd.to_datetime(patch_rows['FIXED_DAT']).to_numpy()
     
-    
-    df['ELECTION_ID'] = 0
-    current_id = 1
-
-    for index, row in df.iterrows():
-        tgt_value = row['TGT']
-
-        # Check if the 'TGT' value is different from the previous row
-        if index > 0 and df.at[index - 1, 'TGT'] != tgt_value:
-            current_id += 1  # Increment ELECTION_ID for a new 'TGT' value
-
-        df.at[index, 'ELECTION_ID'] = current_id
+    # A new election starts whenever 'TGT' differs from the previous row
+    df['ELECTION_ID'] = df['TGT'].ne(df['TGT'].shift()).cumsum()
         
         
-def create_elections_df(df):
+def _aggregate_votes(df, keys, **aggregations):
+    """
+    Computes in a single groupby pass the vote counts of each group, along with any
+    additional named aggregations, by one-hot encoding 'VOT' once beforehand.
+
+    Parameters:
+    - df (pandas DataFrame): Votes DataFrame with at least the columns in keys and 'VOT'.
+    - keys (list of str): Columns to group by.
+    - aggregations: Additional named aggregations, e.g. Latest=('DAT', 'max'). The derived
+      columns '_LEN' (length of 'TXT') and '_SAME' ('VOT' equal to 'RES') can be aggregated too.
+
+    Returns:
+    - aggregated_df: DataFrame indexed by keys with the columns 'Total Votes', 'Positive Votes',
+      'Negative Votes', 'Neutral Votes', 'Group Size' followed by the additional aggregations.
+    """
+    columns = {key: df[key] for key in keys}
+    columns['VOT'] = df['VOT']
+    columns['_POS'] = df['VOT'].eq(1)
+    columns['_NEG'] = df['VOT'].eq(-1)
+    columns['_NEU'] = df['VOT'].eq(0)
+
+    for column, _ in aggregations.values():
+        if column == '_LEN':
+            columns['_LEN'] = df['TXT'].str.len()
+        elif column == '_SAME':
+            columns['_SAME'] = df['VOT'].eq(df['RES'])
+        elif column not in columns:
+            columns[column] = df[column]
+
+    return pd.DataFrame(columns).groupby(keys).agg(**{
+        'Total Votes': ('VOT', 'count'),
+        'Positive Votes': ('_POS', 'sum'),
+        'Negative Votes': ('_NEG', 'sum'),
+        'Neutral Votes': ('_NEU', 'sum'),
+        'Group Size': ('VOT', 'size'),
+    }, **aggregations)
+
+
+def create_elections_df(df, registry=None):
     """
     Create a summary DataFrame for elections.
 
     Parameters:
     - df: DataFrame containing election data with columns 'ELECTION_ID', 'TGT', 'RES', 'VOT', and 'DAT'.
+    - registry (UserRegistry, optional): If given, the 'TGT_ID' column is added.
 
     Returns:
     - elections_df: Summary DataFrame with columns 'ELECTION_ID', 'TGT', 'RES', 'Total Votes', 'Positive Votes',
       'Negative Votes', 'Neutral Votes', 'Positive Percentage', 'Negative Percentage', 'Neutral Percentage',
       'Earliest Voting Date', 'Latest Voting Date'.
     """
-    # Group by 'ELECTION_ID', 'TGT', 'RES'
-    grouped_df = df.groupby(['ELECTION_ID', 'TGT', 'RES'])
-
-    # Calculate counts and percentages
-    counts = grouped_df['VOT'].count()
-    positive_votes = grouped_df['VOT'].apply(lambda x: (x == 1).sum())
-    negative_votes = grouped_df['VOT'].apply(lambda x: (x == -1).sum())
-    neutral_votes = grouped_df['VOT'].apply(lambda x: (x == 0).sum())
+    elections_df = _aggregate_votes(df, ['ELECTION_ID', 'TGT', 'RES'],
+                                    **{'Earliest Voting Date': ('DAT', 'min'),
+                                       'Latest Voting Date': ('DAT', 'max')})
 
     # Calculate percentages
-    positive_percentage = (positive_votes / counts) * 100
-    negative_percentage = (negative_votes / counts) * 100
-    neutral_percentage = (neutral_votes / counts) * 100
-
-    # Get earliest and latest voting dates
-    earliest_date = grouped_df['DAT'].min()
-    latest_date = grouped_df['DAT'].max()
-
-    # Create the summary DataFrame
-    elections_df = pd.DataFrame({
-        'Total Votes': counts,
-        'Positive Votes': positive_votes,
-        'Negative Votes': negative_votes,
-        'Neutral Votes': neutral_votes,
-        'Positive Percentage': positive_percentage,
-        'Negative Percentage': negative_percentage,
-        'Neutral Percentage': neutral_percentage,
-        'Earliest Voting Date': earliest_date,
-        'Latest Voting Date': latest_date
-    }).reset_index()
-
+    for vote in ['Positive', 'Negative', 'Neutral']:
+        elections_df[f'{vote} Percentage'] = (elections_df[f'{vote} Votes'] / elections_df['Total Votes']) * 100
+
+    elections_df = elections_df[['Total Votes', 'Positive Votes', 'Negative Votes', 'Neutral Votes',
+                                 'Positive Percentage', 'Negative Percentage', 'Neutral Percentage',
+                                 'Earliest Voting Date', 'Latest Voting Date']].reset_index()
+    if registry is not None:
+        registry.add_id_columns(elections_df, ['TGT'])
     return elections_df
 
 
-def create_candidates_df(df):
+def create_candidates_df(df, registry=None):
     """
     Create a summary DataFrame for candidates based on 'TGT' (candidate).
 
     Parameters:
     - df: DataFrame containing election data with columns 'TGT', 'ELECTION_ID', 'RES', 'VOT', 'TXT'.
+    - registry (UserRegistry, optional): If given, the 'USER_ID' column is added.
 
     Returns:
     - candidates_df: Summary DataFrame with information about candidates.
     """
-    # Calculate Total Votes, Positive Votes, Negative Votes, Neutral Votes, and Average Length
-    grouped_df = df.groupby(['TGT', 'ELECTION_ID', 'RES'])
-    counts = grouped_df['VOT'].count()
-    positive_votes = grouped_df['VOT'].apply(lambda x: (x == 1).sum())
-    negative_votes = grouped_df['VOT'].apply(lambda x: (x == -1).sum())
-    neutral_votes = grouped_df['VOT'].apply(lambda x: (x == 0).sum())
-    average_length = grouped_df['TXT'].apply(lambda x: x.str.len().mean())
-
-    # Create a DataFrame with calculated values
-    elections_df = pd.DataFrame({
-        'TGT': grouped_df['TGT'].first(),
-        'ELECTION_ID': grouped_df['ELECTION_ID'].first(),
-        'RES': grouped_df['RES'].first(),
-        'Total Votes': counts,
-        'Positive Votes': positive_votes,
-        'Negative Votes': negative_votes,
-        'Neutral Votes': neutral_votes,
-        'Average Length': average_length
-    }).reset_index(drop=True)
+    # Calculate Total Votes, Positive Votes, Negative Votes, Neutral Votes, and Average Length per election
+    elections_df = _aggregate_votes(df, ['TGT', 'ELECTION_ID', 'RES'],
+                                    **{'Average Length': ('_LEN', 'mean')}).reset_index()
+    elections_df['Won'] = elections_df['RES'].eq(1)
+    elections_df['Lost'] = elections_df['RES'].eq(0)
 
     # Aggregate data by 'TGT' for final candidate statistics
-    grouped_candidates = elections_df.groupby('TGT')
-    candidates_df = pd.DataFrame({
-        'USER': grouped_candidates['TGT'].first(),
-        'Number of Elections': grouped_candidates['ELECTION_ID'].nunique(),
-        'Won Elections': grouped_candidates['RES'].apply(lambda x: (x == 1).sum()),
-        'Lost Elections': grouped_candidates['RES'].apply(lambda x: (x == 0).sum()),
-        'Votes Received': grouped_candidates['Total Votes'].sum(),
-        'Positive Percentage': grouped_candidates['Positive Votes'].sum() / grouped_candidates['Total Votes'].sum(),
-        'Negative Percentage': grouped_candidates['Negative Votes'].sum() / grouped_candidates['Total Votes'].sum(),
-        'Neutral Percentage': grouped_candidates['Neutral Votes'].sum() / grouped_candidates['Total Votes'].sum(),
-        'Average Length Received': grouped_candidates['Average Length'].mean()
-    }).reset_index(drop=True)
+    candidates_df = elections_df.groupby('TGT').agg(**{
+        'Number of Elections': ('ELECTION_ID', 'nunique'),
+        'Won Elections': ('Won', 'sum'),
+        'Lost Elections': ('Lost', 'sum'),
+        'Votes Received': ('Total Votes', 'sum'),
+        'Positive Votes': ('Positive Votes', 'sum'),
+        'Negative Votes': ('Negative Votes', 'sum'),
+        'Neutral Votes': ('Neutral Votes', 'sum'),
+        'Average Length Received': ('Average Length', 'mean'),
+    })
+
+    for vote in ['Positive', 'Negative', 'Neutral']:
+        candidates_df[f'{vote} Percentage'] = candidates_df[f'{vote} Votes'] / candidates_df['Votes Received']
 
+    candidates_df['USER'] = candidates_df.index
+    candidates_df = candidates_df[['USER', 'Number of Elections', 'Won Elections', 'Lost Elections', 'Votes Received',
+                                   'Positive Percentage', 'Negative Percentage', 'Neutral Percentage',
+                                   'Average Length Received']].reset_index(drop=True)
+    if registry is not None:
+        registry.add_id_columns(candidates_df, ['USER'])
     return candidates_df
 
 
 
-def create_voters_df(df):
+def create_voters_df(df, registry=None, with_activity=False):
     """
     Create a summary DataFrame for voters based on 'SRC' (voter).
 
     Parameters:
     - df: DataFrame containing election data with columns 'SRC', 'YEA', 'VOT', 'RES'.
+    - registry (UserRegistry, optional): If given, the 'USER_ID' column is added.
+    - with_activity (bool): Whether to also return the voter x year activity matrix, whose rows
+      are in the order of voters_df (see voter_activity and cohort_retention).
 
     Returns:
     - voters_df: Summary DataFrame with information about voters.
+    - activity_df (only if with_activity): Boolean DataFrame indexed by 'USER' with one column
+      per year, True when the voter voted that year.
     """
     # Group by 'SRC' (voter) and calculate voter-related statistics
-    voter_grouped = df[df['SRC'].notna()].groupby('SRC')
-    voters_df = pd.DataFrame({
-        'USER': voter_grouped['SRC'].first(),
-        'Active Years': voter_grouped['YEA'].unique(),
-        'Votes Count': voter_grouped['VOT'].count(),
-        'Positive Percentage': voter_grouped['VOT'].apply(lambda x: (x == 1).mean() * 100),
-        'Negative Percentage': voter_grouped['VOT'].apply(lambda x: (x == -1).mean() * 100),
-        'Neutral Percentage': voter_grouped['VOT'].apply(lambda x: (x == 0).mean() * 100),
-        'Voted Differently': voter_grouped.apply(lambda group: (group['VOT'] != group['RES']).mean() * 100),
-        'Voted Similarly': voter_grouped.apply(lambda group: (group['VOT'] == group['RES']).mean() * 100),
-        'Average Length Cast': voter_grouped['TXT'].apply(lambda x: x.str.len().mean())
-    }).reset_index(drop=True)
-
+    voters_df = _aggregate_votes(df[df['SRC'].notna()], ['SRC'],
+                                 **{'Active Years': ('YEA', 'unique'),
+                                    'Similar Votes': ('_SAME', 'sum'),
+                                    'Average Length Cast': ('_LEN', 'mean')})
+
+    group_size = voters_df['Group Size']
+    voters_df['USER'] = voters_df.index
+    voters_df['Votes Count'] = voters_df['Total Votes']
+    voters_df['Positive Percentage'] = voters_df['Positive Votes'] / group_size * 100
+    voters_df['Negative Percentage'] = voters_df['Negative Votes'] / group_size * 100
+    voters_df['Neutral Percentage'] = voters_df['Neutral Votes'] / group_size * 100
+    voters_df['Voted Differently'] = (group_size - voters_df['Similar Votes']) / group_size * 100
+    voters_df['Voted Similarly'] = voters_df['Similar Votes'] / group_size * 100
+
+    voters_df = voters_df[['USER', 'Active Years', 'Votes Count', 'Positive Percentage', 'Negative Percentage',
+                           'Neutral Percentage', 'Voted Differently', 'Voted Similarly',
+                           'Average Length Cast']].reset_index(drop=True)
+    if registry is not None:
+        registry.add_id_columns(voters_df, ['USER'])
+    if with_activity:
+        activity_df = voter_activity(df, sparse=False).reindex(voters_df['USER'], fill_value=False)
+        return voters_df, activity_df
     return voters_df
 
 
+def voter_activity(df, cohort='YEA', user_column='SRC', sparse=True):
+    """
+    Builds the user x cohort activity matrix of the votes: True when the user voted at least
+    once in the cohort.
+
+    Parameters:
+    - df (pandas DataFrame): Votes DataFrame with the columns user_column and cohort.
+    - cohort (str): Column defining the cohorts, e.g. 'YEA' for years or 'ELECTION_ID' for
+      election participation, or 'month' for the months of 'DAT'. Votes without a cohort are
+      ignored.
+    - user_column (str): Column of the users, 'SRC' for the voters or 'TGT' for the candidates.
+    - sparse (bool): Whether the columns are sparse, which is needed for fine cohorts such as
+      elections.
+
+    Returns:
+    - activity_df (pandas DataFrame): Boolean DataFrame indexed by user, with one column per
+      cohort, both sorted.
+    """
+    cohorts = df['DAT'].dt.to_period('M') if cohort == 'month' else df[cohort]
+    valid = (df[user_column].notna() & cohorts.notna()).to_numpy()
+    user_codes, users = pd.factorize(df[user_column][valid], sort=True)
+    cohort_codes, cohort_values = pd.factorize(cohorts[valid], sort=True)
+
+    matrix = sp.csr_matrix((np.ones(len(user_codes), dtype=bool), (user_codes, cohort_codes)),
+                           shape=(len(users), len(cohort_values)))
+    users = pd.Index(users, name='USER')
+    cohort_values = pd.Index(cohort_values, name=cohort)
+    if sparse:
+        activity_df = pd.DataFrame.sparse.from_spmatrix(matrix.astype(np.int8), index=users, columns=cohort_values)
+        return activity_df.astype(pd.SparseDtype(bool, False))
+    return pd.DataFrame(matrix.toarray(), index=users, columns=cohort_values)
+
+
+def cohort_retention(activity_df, counts=False):
+    """
+    Computes for every pair of cohorts the share of the users active in the first one who are
+    also active in the second one, as the heatmap of voters active in both years of the Data
+    Exploration notebook. The co-activity counts of all the pairs are a single product X.T @ X
+    of the activity matrix.
+
+    Parameters:
+    - activity_df (pandas DataFrame): Boolean user x cohort matrix, dense or sparse, e.g. from
+      voter_activity or create_voters_df(..., with_activity=True).
+    - counts (bool): Whether to return the numbers of users active in both cohorts instead.
+
+    Returns:
+    - retention_df (pandas DataFrame): Cohort x cohort DataFrame whose cell (c1, c2) is the
+      number of users active in c1 and c2 divided by the number of users active in c1, 1 on the
+      diagonal and NaN for the rows of cohorts without users.
+    """
+    if all(isinstance(dtype, pd.SparseDtype) for dtype in activity_df.dtypes):
+        matrix = activity_df.sparse.to_coo().tocsr()
+    else:
+        matrix = sp.csr_matrix(activity_df.to_numpy(dtype=bool))
+    matrix = matrix.astype(np.int32)
+
+    co_activity = (matrix.T @ matrix).toarray()
+    if counts:
+        return pd.DataFrame(co_activity, index=activity_df.columns, columns=activity_df.columns)
+
+    active = np.diag(co_activity)[:, None]
+    retention = np.divide(co_activity, active, out=np.full(co_activity.shape, np.nan), where=active > 0)
+    return pd.DataFrame(retention, index=activity_df.columns, columns=activity_df.columns)
+
+
+
+# Substitutions of remove_wiki_markup, in the order they are applied, as
+# (compiled pattern or None for a plain string replacement, replacement, literal that
+# every match contains). A pass is skipped when its literal is not in the text, which
+# cannot change the result since the pattern could not match anyway.
+WIKI_MARKUP_PASSES = [
+    (re.compile(r"\[\[.*?\]\]"), "", "[["), # internal links like: '[[WP:NETPOS]]'
+    (re.compile(r"&[a-zA-Z]+;|&#[0-9]+;"), "", "&"), # html entities like: '&nbsp;–&nbsp';
+    (re.compile(r"'''(.*?)'''"), r"\1", "'''"), # bold
+    (re.compile(r"''(.*?)''"), r"\1", "''"), # italic
+    (re.compile(r"<.*?>"), "", "<"), # html
+    (re.compile(r"\[\[.*?\|([^\]]*?)\]\]"), r"\1", "[["), # links
+    (re.compile(r"\[http[^\]]*?\]"), "", "[http"), # external links
+    (re.compile(r"\{\{.*?\}\}"), "", "{{"), # templates
+    (re.compile(r"==([^=]+)=="), r"\1", "=="), # header
+    (re.compile(r"==([^=]+)=="), r"\1", "=="), # nested header: '====a====' needs two passes
+    (None, " ", "--"), # dash
+    (None, " ", "'''"), # bold left unpaired
+]
+
 
 def remove_wiki_markup(txt):
     
@@ -210,20 +608,39 @@ def remove_wiki_markup(txt):
     - cleaned_txt (string): text without markup
     """
     
-    cleaned_txt = re.sub(r"\[\[.*?\]\]", "", txt) # internal links like: '[[WP:NETPOS]]'
-    cleaned_txt = re.sub(r"&[a-zA-Z]+;|&#[0-9]+;", "", cleaned_txt) # html entities like: '&nbsp;–&nbsp';
-    cleaned_txt = re.sub(r"'''(.*?)'''", r"\1", cleaned_txt) # bold
-    cleaned_txt = re.sub(r"''(.*?)''", r"\1", cleaned_txt) # italic
-    cleaned_txt = re.sub(r"<.*?>", "", cleaned_txt) # html
-    cleaned_txt = re.sub(r"\[\[.*?\|([^\]]*?)\]\]", r"\1", cleaned_txt) # links
-    cleaned_txt = re.sub(r"\[http[^\]]*?\]", "", cleaned_txt) # external links 
-    cleaned_txt = re.sub(r"\{\{.*?\}\}", "", cleaned_txt) # templates 
-    cleaned_txt = re.sub(r"==([^=]+)==", r"\1", cleaned_txt) # header 
-    cleaned_txt = re.sub(r"==([^=]+)==", r"\1", cleaned_txt) # dash
-    cleaned_txt = re.sub(r'--', ' ', cleaned_txt)
-    cleaned_txt = re.sub(r"'''", ' ', cleaned_txt)
+    cleaned_txt = txt
+    for pattern, replacement, literal in WIKI_MARKUP_PASSES:
+        if literal in cleaned_txt:
+            if pattern is None:
+                cleaned_txt = cleaned_txt.replace(literal, replacement)
+            else:
+                cleaned_txt = pattern.sub(replacement, cleaned_txt)
     return cleaned_txt
 
+
+def remove_wiki_markup_batch(texts):
+    """
+    Removes the wiki markup from many texts, cleaning each distinct text only once.
+
+    Parameters:
+    - texts (pandas Series or iterable of strings): texts containing markup to be removed
+
+    Returns:
+    - cleaned_texts (pandas Series with the same index, or list): texts without markup
+    """
+    series = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+    cleaned = {txt: remove_wiki_markup(txt) for txt in pd.unique(series)}
+    cleaned_texts = series.map(cleaned)
+    return cleaned_texts if isinstance(texts, pd.Series) else cleaned_texts.tolist()
+
+NUMBER_TOKEN_PATTERN = re.compile(r"[A-Za-z\.]*[0-9]+[A-Za-z%°\.]*")
+DASH_PATTERN = re.compile(r"(\s\-\s|-$)")
+ENTITY_PATTERN = re.compile(r"\&\S*\s")
+# Removing '&...' up to the next whitespace gives the same result before or after deleting
+# other non-whitespace characters, so all single character deletions share one table
+DELETED_CHARACTERS = str.maketrans('', '', ',!?%()/"&+#$£:@-')
+
+
 def nlp_pipeline(text):
     '''
     performs several text preprocessing steps
@@ -234,228 +651,855 @@ def nlp_pipeline(text):
     Returns:
     - processed_text (string): preprocessed text
     '''
-    processed_text = text.lower()
-    processed_text = processed_text.replace('\n', ' ').replace('\r', '')
+    processed_text = text.lower().replace('\r', '')
     processed_text = ' '.join(processed_text.split())
-    processed_text = re.sub(r"[A-Za-z\.]*[0-9]+[A-Za-z%°\.]*", "", processed_text)
-    processed_text = re.sub(r"(\s\-\s|-$)", "", processed_text)
-    processed_text = re.sub(r"[,\!\?\%\(\)\/\"]", "", processed_text)
-    processed_text = re.sub(r"\&\S*\s", "", processed_text)
-    processed_text = re.sub(r"\&", "", processed_text)
-    processed_text = re.sub(r"\+", "", processed_text)
-    processed_text = re.sub(r"\#", "", processed_text)
-    processed_text = re.sub(r"\$", "", processed_text)
-    processed_text = re.sub(r"\£", "", processed_text)
-    processed_text = re.sub(r"\%", "", processed_text)
-    processed_text = re.sub(r"\:", "", processed_text)
-    processed_text = re.sub(r"\@", "", processed_text)
-    processed_text = re.sub(r"\-", "", processed_text)
-
-    return processed_text
+    processed_text = NUMBER_TOKEN_PATTERN.sub("", processed_text)
+    if '-' in processed_text:
+        processed_text = DASH_PATTERN.sub("", processed_text)
+    if '&' in processed_text:
+        processed_text = ENTITY_PATTERN.sub("", processed_text)
 
-def parse_other_datasets(file_path):
-    data = []
-    row_data = []
+    return processed_text.translate(DELETED_CHARACTERS)
+
+def nlp_pipeline_batch(texts):
+    '''
+    performs the nlp_pipeline preprocessing steps on a whole Series, processing each
+    distinct text only once
+    
+    Parameters:
+    - texts (pandas Series): texts to be preprocessed
+    
+    Returns:
+    - processed_texts (pandas Series): preprocessed texts, with the same index
+    '''
+    unique_texts = pd.unique(texts)
+    return texts.map(dict(zip(unique_texts, map(nlp_pipeline, unique_texts))))
+
+# Column specs of read_wikitable: column name -> options, where
+# - 'dtype': 'int64' to convert the cells to integers, otherwise they are kept as strings,
+# - 'thousands': thousands separator removed before converting,
+# - 'user_link': whether to replace the '[[User:x|y]]' link form by 'y',
+# - 'fill': value of the cells that cannot be converted, either a constant or 'next+1' for
+#   one more than the next converted value of the column.
+# In the authors table the first 101 users are tied and listed as 'Top 100 Random Sort'
+# with a protected count: they get rank 1 and one more article than the 101st user.
+EDITORS_COLUMNS = {
+    'RANK': {'dtype': 'int64'},
+    'USER': {'user_link': True},
+    'NB_EDITS': {'dtype': 'int64', 'thousands': ','},
+}
+AUTHORS_COLUMNS = {
+    'RANK': {'dtype': 'int64', 'fill': 1},
+    'USER': {'user_link': True},
+    'NB_ARTICLES': {'dtype': 'int64', 'thousands': ',', 'fill': 'next+1'},
+}
+CREATORS_COLUMNS = {
+    'RANK': {'dtype': 'int64'},
+    'USER': {'user_link': True},
+    'NB_PAGES': {'dtype': 'int64', 'thousands': ','},
+}
+
+
+WIKITABLE_BLOCK_BYTES = 1 << 24
+INTEGER_CHARACTERS = set('0123456789-\n')
+
+
+def _wikitable_column(texts, options):
+    """
+    Converts the texts of the cells of a column according to its options.
+
+    Parameters:
+    - texts (list of str): Text of each cell, None for the empty ones.
+    - options (dict): Options of the column in the column spec.
+
+    Returns:
+    - values (list or numpy.ndarray): The converted column.
+    """
+    if options.get('user_link'):
+        return [match.group(1) if text and text[:7] == '[[User:' and (match := USER_LINK_PATTERN.match(text))
+                else text for text in texts]
+
+    if options.get('dtype') != 'int64':
+        return texts
+
+    thousands = options.get('thousands')
+    if texts and None not in texts:
+        # parse the whole column at once when it only contains integers
+        joined = '\n'.join(texts)
+        if thousands:
+            joined = joined.replace(thousands, '')
+        if set(joined) <= INTEGER_CHARACTERS:
+            values = np.fromstring(joined, dtype=np.int64, sep='\n')
+            if len(values) == len(texts):
+                return values
+
+    # some cells are not integers: convert them one by one and fill the leading ones (e.g. the
+    # tied block at the top of the list of authors)
+    values = []
+    for text in texts:
+        try:
+            values.append(int(text.replace(thousands, '') if thousands else text))
+        except (ValueError, TypeError, AttributeError):
+            values.append(None)
+
+    fill = options.get('fill')
+    if fill is None:
+        raise ValueError(f'Cannot convert cell {values.index(None)} to integer and no fill is given')
+    first = next((i for i, value in enumerate(values) if value is not None), len(values))
+    if None in values[first:]:
+        raise ValueError(f'Cannot convert cell {values.index(None, first)} to integer, only the cells '
+                         f'before the first integer are filled')
+    if fill == 'next+1':
+        filled = pd.Series(values, dtype='float64').bfill() + 1
+        if filled.isna().any():
+            raise ValueError("'next+1' fill with no converted value after the last cells")
+        values = [int(filled.iat[i]) if value is None else value for i, value in enumerate(values)]
+    else:
+        values = [fill if value is None else value for value in values]
+    return np.array(values, dtype=np.int64)
+
+
+def _wikitable_block_rows(lines, n_cells):
+    """
+    Splits a block of raw wikitable lines into its rows of cells.
 
-    with open(file_path, 'r', encoding='utf-8') as file:
+    Parameters:
+    - lines (list of str): Lines ending with a row separator.
+    - n_cells (int): Number of cells of the rows, given by the header.
+
+    Returns:
+    - cells (list of list): For each cell position, the raw line of the cell in every row,
+      '|' for the rows that are too short.
+    """
+    if len(lines) % (n_cells + 1) == 0 and set(lines[n_cells::n_cells + 1]) <= {'|-\n', '|-'}:
+        # fast path when every row has exactly n_cells cells: the columns are strided slices
+        cells = [lines[i::n_cells + 1] for i in range(n_cells)]
+        if all(len(column) == ('\n' + ''.join(column)).count('\n| ') for column in cells):
+            return cells
+
+    # '| text' and '|' are cells, anything else ('|-', blank line, ...) ends the current row
+    is_cell = np.array([line[:1] == '|' and line[1:2] in ' \r\n' for line in lines], dtype=bool)
+    cell_index = np.flatnonzero(is_cell)
+    if not len(cell_index):
+        return []
+
+    row = np.cumsum(~is_cell)[cell_index]
+    row_start = np.r_[True, row[1:] != row[:-1]]
+    row_id = np.cumsum(row_start) - 1
+    position = cell_index - cell_index[row_start][row_id]
+    raw_cells = np.array(lines, dtype=object)[cell_index]
+
+    n_rows = row_id[-1] + 1
+    if position.max() >= n_cells:
+        raise ValueError('A row of the wikitable has more cells than the header')
+
+    cells = []
+    for i in range(n_cells):
+        selected = position == i
+        column = np.full(n_rows, '|', dtype=object)
+        column[row_id[selected]] = raw_cells[selected]
+        cells.append(column.tolist())
+    return cells
+
+
+def read_wikitable(file_path, columns=None, registry=None):
+    """
+    Reads a wikitable dump ('| cell' lines, rows separated by '|-', the first row being the
+    header) in a single streaming pass over blocks of lines: the lines of a block are split
+    into rows and columns with array operations, then each cell is converted once.
+
+    Parameters:
+    - file_path (str): The path to the text file.
+    - columns (dict, optional): Column spec, e.g. EDITORS_COLUMNS. The columns missing from the
+      spec are kept as strings; empty cells are None.
+    - registry (UserRegistry, optional): If given, an id column is added for each
+      'user_link' column, e.g. 'USER_ID'.
+
+    Returns:
+    - df (pandas DataFrame): The typed table.
+    """
+    columns = columns or {}
+    header = []
+    carry = []
+
+    with open(file_path, encoding='utf-8') as file:
         for line in file:
             line = line.strip()
-            if line[:2] == '| ':
-                row_data.append(line[2:])
-            else:
-                if row_data:
-                    data.append(row_data)
-                    row_data = []
+            if line == '|' or line[:2] == '| ':
+                header.append(line[2:])
+            elif header:
+                break
+        texts = [[] for _ in header]
+
+        while header:
+            block = file.readlines(WIKITABLE_BLOCK_BYTES)
+            lines = carry + block
+            if block:
+                # keep the last, possibly incomplete, row for the next block
+                end = len(lines)
+                while end and lines[end - 1][:1] == '|' and lines[end - 1][1:2] in ' \r\n':
+                    end -= 1
+                lines, carry = lines[:end], lines[end:]
+
+            for column, column_texts in zip(_wikitable_block_rows(lines, len(header)), texts):
+                column_texts.extend([cell[2:].strip() or None for cell in column])
+
+            if not block:
+                break
+
+    if not header:
+        return pd.DataFrame()
+
+    df = pd.DataFrame({name: _wikitable_column(column_texts, columns.get(name, {}))
+                       for name, column_texts in zip(header, texts)},
+                      columns=header)
+    if registry is not None:
+        registry.add_id_columns(df, [name for name in header if columns.get(name, {}).get('user_link')])
+    return df
 
-    if row_data:
-        data.append(row_data)
 
-    column_names = data[0] if data else None
-    df = pd.DataFrame(data[1:], columns=column_names)
-    return df
+def parse_other_datasets(file_path):
+    """
+    Reads a wikitable dump with every cell kept as a string, see read_wikitable.
+    """
+    return read_wikitable(file_path)
+
 
+def _format_wikitable_df(df, columns, registry=None):
+    for name, options in columns.items():
+        cells = df[name].tolist()
+        if options.get('user_link'):
+            cells = [str(cell) for cell in cells]
+        df[name] = _wikitable_column(cells, options)
+    if registry is not None:
+        registry.add_id_columns(df, [name for name, options in columns.items() if options.get('user_link')])
 
-def format_authors_df(df):
+
+def format_authors_df(df, registry=None):
     """
-    Modifies the input DataFrame with specific transformations.
+    Modifies the input DataFrame with specific transformations, as read_wikitable with AUTHORS_COLUMNS.
 
-    - For indexes 0 to 100, it takes the value in the column 'NB_ARTICLES' of the 101st index and adds 1 to those values.
-    - Sets the 'RANK' column to 1 for first 100 rows.
+    - For the tied users listed before the ranking, it sets 'RANK' to 1 and 'NB_ARTICLES' to the value
+      of the first ranked user plus 1.
     - Converts 'RANK' column to numeric, 'NB_ARTICLES' to integer, and 'USER' to string data types.
     - Cleans the 'USER' column to retain only the username without the "User:..." prefix.
 
     Args:
     - df (pandas DataFrame): Input DataFrame to be modified.
+    - registry (UserRegistry, optional): If given, the 'USER_ID' column is added.
 
     Returns:
     - None (modifies the DataFrame in place).
     """
-
-    df.loc[:100, 'NB_ARTICLES'] = str(int(df.loc[101, 'NB_ARTICLES'].replace(',', '')) + 1)
-    df.loc[:100, 'RANK'] = 1
-    df['RANK'] = pd.to_numeric(df['RANK'])
-    df['NB_ARTICLES'] = df['NB_ARTICLES'].str.replace(',', '').astype(int)
-    df['USER'] = df['USER'].astype(str)
-    to_format = df['USER'].str.match(r'\[\[User:[^\|]+\|([^\]]+)\]\]', na=False)
-    df.loc[to_format, 'USER'] = df.loc[to_format, 'USER'].str.extract(r'\[\[User:[^\|]+\|([^\]]+)\]\]', expand=False)
-    
+    _format_wikitable_df(df, AUTHORS_COLUMNS, registry)
     
     
-def format_editors_df(df):
+def format_editors_df(df, registry=None):
     """
-    Modifies the input DataFrame with specific transformations.
+    Modifies the input DataFrame with specific transformations, as read_wikitable with EDITORS_COLUMNS.
 
-    - Converts 'RANK' column to numeric, 'NB_ARTICLES' to integer, and 'USER' to string data types.
+    - Converts 'RANK' column to numeric, 'NB_EDITS' to integer, and 'USER' to string data types.
     - Cleans the 'USER' column to retain only the username without the "User:..." prefix.
 
     Args:
     - df (pandas DataFrame): Input DataFrame to be modified.
+    - registry (UserRegistry, optional): If given, the 'USER_ID' column is added.
 
     Returns:
     - None (modifies the DataFrame in place).
     """
-
-    df['RANK'] = pd.to_numeric(df['RANK'])
-    df['NB_EDITS'] = df['NB_EDITS'].str.replace(',', '').astype(int)
-    df['USER'] = df['USER'].astype(str)
-    to_format = df['USER'].str.match(r'\[\[User:[^\|]+\|([^\]]+)\]\]', na=False)
-    df.loc[to_format, 'USER'] = df.loc[to_format, 'USER'].str.extract(r'\[\[User:[^\|]+\|([^\]]+)\]\]', expand=False)
+    _format_wikitable_df(df, EDITORS_COLUMNS, registry)
     
     
-def format_creators_df(df):
+def format_creators_df(df, registry=None):
     """
-    Modifies the input DataFrame with specific transformations.
+    Modifies the input DataFrame with specific transformations, as read_wikitable with CREATORS_COLUMNS.
 
-    - Converts 'RANK' column to numeric, 'NB_ARTICLES' to integer, and 'USER' to string data types.
+    - Converts 'RANK' column to numeric, 'NB_PAGES' to integer, and 'USER' to string data types.
     - Cleans the 'USER' column to retain only the username without the "User:..." prefix.
 
     Args:
     - df (pandas DataFrame): Input DataFrame to be modified.
+    - registry (UserRegistry, optional): If given, the 'USER_ID' column is added.
 
     Returns:
     - None (modifies the DataFrame in place).
     """
-
-    df['RANK'] = pd.to_numeric(df['RANK'])
-    df['NB_PAGES'] = df['NB_PAGES'].str.replace(',', '').astype(int)
-    df['USER'] = df['USER'].astype(str)
-    to_format = df['USER'].str.match(r'\[\[User:[^\|]+\|([^\]]+)\]\]', na=False)
-    df.loc[to_format, 'USER'] = df.loc[to_format, 'USER'].str.extract(r'\[\[User:[^\|]+\|([^\]]+)\]\]', expand=False)
+    _format_wikitable_df(df, CREATORS_COLUMNS, registry)
 
 
 
-def calculate_agreement_before_election(wiki_df, elections_df):
+def _encode_agreement_votes(wiki_df, elections_df):
     """
-    Creates agreement before election DataFrame
+    Integer-codes the votes used by the agreement computation.
 
-    Args:
-    - wiki_df (pandas DataFrame): Wiki DataFrame
-    - elections_df (pandas DataFrame): Elections DataFrame
+    Parameters:
+    - wiki_df (pandas DataFrame): Wiki DataFrame with columns 'SRC', 'ELECTION_ID', 'VOT', 'DAT'.
+    - elections_df (pandas DataFrame): Elections DataFrame with columns 'TGT', 'Earliest Voting Date'.
 
     Returns:
-    - agreement_before_election_df
+    - users (pandas Index): Sorted voter names, the position of a name being its user code.
+    - election_codes (numpy array): Election code of each vote.
+    - user_codes (numpy array): User code of each vote.
+    - votes (numpy array): 'VOT' of each vote, as float64 with NaN for the missing ones.
+    - before (numpy array): Whether each vote was cast before the first election of its voter
+      (False for voters that never were candidates).
     """
-    #Initialize the dictionary to store the results
-    agreement_dict = {}
+    votes_df = wiki_df[wiki_df['SRC'].notna()]
 
-    i = 0
-    total_rows = len(wiki_df)
-    
-    with tqdm(total=total_rows) as pbar:
-        while i < len(wiki_df):
-            row1 = wiki_df.iloc[i]
-            src1 = row1['SRC']
-            tgt = row1['TGT']
-            vot1 = row1['VOT']
-            dat1 = row1['DAT']
-            
-            election_date_usr1 = elections_df[elections_df['TGT'] == src1]['Earliest Voting Date']
-            
-            if election_date_usr1.empty:
-                before_election_usr1 = False
-            else:
-                before_election_usr1 = dat1 <= election_date_usr1.iloc[0]
-
-            j = i + 1
-            while j < len(wiki_df) and wiki_df.iloc[j]['TGT'] == tgt:
-                row2 = wiki_df.iloc[j]
-                src2 = row2['SRC']
-                vot2 = row2['VOT']
-                dat2 = row2['DAT']
-                
-                election_date_usr2 = elections_df[elections_df['TGT'] == src2]['Earliest Voting Date']
+    user_codes, users = pd.factorize(votes_df['SRC'], sort=True)
+    election_codes, _ = pd.factorize(votes_df['ELECTION_ID'], sort=True)
 
-                if election_date_usr2.empty:
-                    before_election_usr2 = False
-                else:
-                    before_election_usr2 = dat2 <= election_date_usr2.iloc[0]
+    # Index user -> date of their first election, looked up once per vote
+    first_election_date = elections_df.groupby('TGT')['Earliest Voting Date'].min()
+    first_dates = first_election_date.reindex(users).to_numpy()
+    before = votes_df['DAT'].to_numpy() <= first_dates[user_codes]
 
-                
-                agreed = (vot1==vot2)
-                
-                dict_entry = None
-                
+    # float64 rather than the object array of a nullable 'VOT' (e.g. from read_votes), which
+    # np.load cannot memory-map in the worker processes
+    votes = votes_df['VOT'].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return pd.Index(users), election_codes, user_codes, votes, before
+
+
+def _pair_count_matrices(election_codes, user_codes, votes, before, n_elections, n_users):
+    """
+    Counts, for every pair of users, the votes they cast in the same elections.
+
+    Each election contributes the outer product of its per-user vote counts, so summing
+    over elections is a sparse product of the election x user count matrices.
+
+    Returns:
+    - matrices (dict): Sparse n_users x n_users matrices. 'Total Votes' and 'Agreed' are
+      symmetric; entry [u, v] of 'Total Votes before' and 'Agreed before' only counts the
+      pairs where the vote of u was cast before the first election of u.
+    """
+    def count_matrix(mask):
+        return sp.csr_matrix((np.ones(np.count_nonzero(mask), dtype=np.int64),
+                              (election_codes[mask], user_codes[mask])),
+                             shape=(n_elections, n_users))
+
+    all_votes = count_matrix(np.ones(len(user_codes), dtype=bool))
+    before_votes = count_matrix(before)
+    agreed = sp.csr_matrix((n_users, n_users), dtype=np.int64)
+    agreed_before = sp.csr_matrix((n_users, n_users), dtype=np.int64)
+
+    for value in pd.unique(votes[pd.notna(votes)]):
+        same_vote = votes == value
+        vote_counts = count_matrix(same_vote)
+        agreed = agreed + vote_counts.T @ vote_counts
+        agreed_before = agreed_before + count_matrix(same_vote & before).T @ vote_counts
+
+    return {
+        'Total Votes': (all_votes.T @ all_votes).tocsr(),
+        'Agreed': agreed.tocsr(),
+        'Total Votes before': (before_votes.T @ all_votes).tocsr(),
+        'Agreed before': agreed_before.tocsr(),
+    }
+
+
+def _agreement_frame(matrices, users):
+    """
+    Turns the pair count matrices into the agreement DataFrame, with one row per pair of
+    distinct users (USR1 < USR2) that voted in at least one common election.
+    """
+    pairs = sp.triu(matrices['Total Votes'], k=1).tocoo()
+    order = np.lexsort((pairs.col, pairs.row))
+    usr1, usr2 = pairs.row[order], pairs.col[order]
+
+    def sample(name, rows, cols):
+        return np.asarray(matrices[name][rows, cols], dtype=np.int64).ravel()
 
-                #Ensure a pair of SRC values (SRC1, SRC2) or (SRC2, SRC1)
-                #Check if they already exist in the dictionary
-                if (src1, src2) not in agreement_dict and (src2, src1) not in agreement_dict:
-                    agreement_dict[(src1, src2)] = {'Total Votes': 1, 
-                                                    'Agreed': 0,
-                                                    'Total Votes before USR1 election': 0,
-                                                    'Total Votes before USR2 election': 0,
-                                                    'Agreed before USR1 election': 0,
-                                                    'Agreed before USR2 election': 0}
-                    
-                    dict_entry = agreement_dict[(src1, src2)]
-                    
-                elif (src1, src2) in agreement_dict:
-                    dict_entry = agreement_dict[(src1, src2)]
-                    
-                elif (src2, src1) in agreement_dict:
-                    dict_entry = agreement_dict[(src2, src1)]
-                    
-                if before_election_usr1:
-                    dict_entry['Total Votes before USR1 election'] += 1
-                    if agreed:
-                        dict_entry['Agreed before USR1 election'] += 1
-
-                if before_election_usr2:
-                    dict_entry['Total Votes before USR2 election'] += 1
-                    if agreed:
-                        dict_entry['Agreed before USR2 election'] += 1
-
-                #Update Agreed if VOT1 equals VOT2
-                if agreed:
-                        dict_entry['Agreed'] += 1
-                        
-                dict_entry['Total Votes'] += 1
-
-                j += 1
-
-            #Move to the next Row
-            i += 1
-            pbar.update(1)
-            
-
-    usr1_list, usr2_list, total_votes_list, agreed_list, total_votes_before_usr1_list, total_votes_before_usr2_list, agreed_before_usr1_list, agreed_before_usr2_list = zip(*[
-        (src1, src2, values['Total Votes'], values['Agreed'], values['Total Votes before USR1 election'],
-         values['Total Votes before USR2 election'], values['Agreed before USR1 election'], values['Agreed before USR2 election'])
-        for (src1, src2), values in agreement_dict.items()
-    ])
-    
     agreement_df = pd.DataFrame({
-        'USR1': usr1_list,
-        'USR2': usr2_list,
-        'Total Votes': total_votes_list,
-        'Agreed': agreed_list,
-        'Total Votes before USR1 election': total_votes_before_usr1_list,
-        'Total Votes before USR2 election': total_votes_before_usr2_list,
-        'Agreed before USR1 election': agreed_before_usr1_list,
-        'Agreed before USR2 election': agreed_before_usr2_list,
+        'USR1': users[usr1],
+        'USR2': users[usr2],
+        'Total Votes': pairs.data[order].astype(np.int64),
+        'Agreed': sample('Agreed', usr1, usr2),
+        'Total Votes before USR1 election': sample('Total Votes before', usr1, usr2),
+        'Total Votes before USR2 election': sample('Total Votes before', usr2, usr1),
+        'Agreed before USR1 election': sample('Agreed before', usr1, usr2),
+        'Agreed before USR2 election': sample('Agreed before', usr2, usr1),
     })
-    
+
     agreement_df['Agreement Ratio'] = agreement_df['Agreed'] / agreement_df['Total Votes']
     agreement_df['Agreement Ratio before USR1 election'] = agreement_df['Agreed before USR1 election'] / agreement_df['Total Votes before USR1 election']
     agreement_df['Agreement Ratio before USR2 election'] = agreement_df['Agreed before USR2 election'] / agreement_df['Total Votes before USR2 election']
-    
+
     return agreement_df
+
+
+def _election_shards(election_codes, n_elections, n_shards):
+    """
+    Splits votes sorted by election into at most n_shards contiguous ranges of whole
+    elections, balanced by their estimated number of pairs (squared election size).
+
+    Returns:
+    - shards (list of tuple): (start, stop) vote positions of each shard.
+    """
+    sizes = np.bincount(election_codes, minlength=n_elections).astype(np.int64)
+    vote_offsets = np.concatenate([[0], np.cumsum(sizes)])
+    pair_costs = np.cumsum(sizes ** 2)
+
+    targets = pair_costs[-1] * np.arange(1, n_shards) / n_shards
+    cuts = np.searchsorted(pair_costs, targets, side='right')
+    bounds = np.unique(np.concatenate([[0], vote_offsets[cuts], [len(election_codes)]]))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _pair_counts_worker(array_paths, start, stop, n_elections, n_users):
+    """
+    Computes the pair count matrices of the votes [start, stop) read from memory-mapped
+    .npy files, so that the workers do not receive pickled copies of the votes.
+    """
+    election_codes, user_codes, votes, before = [np.load(path, mmap_mode='r')[start:stop] for path in array_paths]
+    return _pair_count_matrices(election_codes, user_codes, votes, before, n_elections, n_users)
+
+
+def _tree_reduce(partials):
+    """
+    Sums the partial pair count matrices two by two until only one set is left.
+    """
+    while len(partials) > 1:
+        merged = [{name: left[name] + right[name] for name in left}
+                  for left, right in zip(partials[0::2], partials[1::2])]
+        if len(partials) % 2:
+            merged.append(partials[-1])
+        partials = merged
+    return partials[0]
+
+
+def _parallel_pair_count_matrices(election_codes, user_codes, votes, before, n_elections, n_users, workers):
+    """
+    Same as _pair_count_matrices, with the elections split into balanced shards that are
+    counted in a process pool and merged in a tree reduction. Counts are integers, so the
+    result does not depend on the sharding.
+    """
+    order = np.argsort(election_codes, kind='stable')
+    arrays = [election_codes[order], user_codes[order], votes[order], before[order]]
+    shards = _election_shards(arrays[0], n_elections, workers)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        array_paths = []
+        for i, array in enumerate(arrays):
+            array_paths.append(os.path.join(tmp_dir, f'{i}.npy'))
+            np.save(array_paths[-1], array)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_pair_counts_worker, array_paths, start, stop, n_elections, n_users)
+                       for start, stop in shards]
+            partials = [future.result() for future in futures]
+
+    return _tree_reduce(partials)
+
+
+def calculate_agreement_before_election(wiki_df, elections_df, workers=1, registry=None):
+    """
+    Creates agreement before election DataFrame
+
+    For every pair of voters, counts the votes they cast in the same elections and how many
+    of them agreed, overall and restricted to the votes cast before the first election of
+    USR1 (resp. USR2) as a candidate.
+
+    Args:
+    - wiki_df (pandas DataFrame): Wiki DataFrame
+    - elections_df (pandas DataFrame): Elections DataFrame
+    - workers (int, optional): Number of worker processes the elections are sharded over,
+      None for one per CPU. The result is the same for any number of workers.
+    - registry (UserRegistry, optional): If given, the 'USR1_ID' and 'USR2_ID' columns are added.
+
+    Returns:
+    - agreement_before_election_df
+    """
+    users, election_codes, user_codes, votes, before = _encode_agreement_votes(wiki_df, elections_df)
+    n_elections = election_codes.max() + 1 if len(election_codes) else 0
+
+    if workers is None:
+        workers = os.cpu_count()
+
+    if workers > 1 and n_elections > 1:
+        matrices = _parallel_pair_count_matrices(election_codes, user_codes, votes, before,
+                                                 n_elections, len(users), workers)
+    else:
+        matrices = _pair_count_matrices(election_codes, user_codes, votes, before, n_elections, len(users))
+
+    agreement_df = _agreement_frame(matrices, users)
+    if registry is not None:
+        registry.add_id_columns(agreement_df, ['USR1', 'USR2'])
+    return agreement_df
+
+
+def _grown(array, size, fill=None):
+    """
+    Returns array with room for size items, doubling its capacity when it is full so that
+    appending n items costs O(n) amortized. The new slots are set to fill if given.
+    """
+    if size <= len(array):
+        return array
+    grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[:len(array)] = array
+    if fill is not None:
+        grown[len(array):] = fill
+    return grown
+
+
+def _resized(matrix, n):
+    matrix = matrix.tocsr(copy=True)
+    matrix.resize((n, n))
+    return matrix
+
+
+class AgreementIndex:
+    """
+    Pair counts of the agreement before election table, kept up to date as new elections
+    are appended, so that the table does not have to be rebuilt from scratch.
+
+    The index stores the integer-coded votes seen so far (sorted by election, in arrays whose
+    capacity doubles when full), the positions of the votes of every user, the date of the
+    first election of every candidate and the sparse user x user pair count matrices.
+    Calling update() with the votes of new elections only counts the pairs of those
+    elections, and re-evaluates the 'before election' flags of the past votes of the users
+    whose first election moved, recounting the elections of the flags that changed.
+
+    The counts of each update are kept as a separate level, merged with the previous one once
+    it is about as large, so that an update does not rewrite the whole matrices.
+
+    Usage:
+    - index = AgreementIndex.from_votes(wiki_df)
+    - index.update(new_votes_df)
+    - index.save('./data/agreement_index.npz'), AgreementIndex.load('./data/agreement_index.npz')
+    - index.to_frame() returns the same DataFrame as calculate_agreement_before_election
+    """
+
+    MATRICES = ['Total Votes', 'Agreed', 'Total Votes before', 'Agreed before']
+
+    def __init__(self):
+        self.users = []
+        self.user_ids = {}
+        self.user_votes = []
+        self.n_votes = 0
+        self.n_elections = 0
+        self._first_dates = np.array([], dtype='datetime64[ns]')
+        self._election_codes = np.array([], dtype=np.int64)
+        self._user_codes = np.array([], dtype=np.int64)
+        self._votes = np.array([], dtype=np.float64)
+        self._dates = np.array([], dtype='datetime64[ns]')
+        self._levels = []
+
+    @property
+    def first_dates(self):
+        return self._first_dates[:len(self.users)]
+
+    @property
+    def election_codes(self):
+        return self._election_codes[:self.n_votes]
+
+    @property
+    def user_codes(self):
+        return self._user_codes[:self.n_votes]
+
+    @property
+    def votes(self):
+        return self._votes[:self.n_votes]
+
+    @property
+    def dates(self):
+        return self._dates[:self.n_votes]
+
+    @property
+    def matrices(self):
+        """
+        Returns the pair count matrices, merging the levels of the updates into one.
+        """
+        n_users = len(self.users)
+        merged = {name: sp.csr_matrix((n_users, n_users), dtype=np.int64) for name in self.MATRICES}
+        for level in self._levels:
+            for name, matrix in level.items():
+                merged[name] = merged[name] + _resized(matrix, n_users)
+        for matrix in merged.values():
+            matrix.eliminate_zeros()
+        self._levels = [merged]
+        return merged
+
+    @classmethod
+    def from_votes(cls, wiki_df):
+        """
+        Builds the index from a processed Wiki DataFrame.
+        """
+        index = cls()
+        index.update(wiki_df)
+        return index
+
+    def _register_users(self, names):
+        for name in pd.unique(names[pd.notna(names)]):
+            if name not in self.user_ids:
+                self.user_ids[name] = len(self.users)
+                self.users.append(name)
+                self.user_votes.append([])
+        self._first_dates = _grown(self._first_dates, len(self.users), fill=np.datetime64('NaT'))
+
+    def _add(self, delta):
+        """
+        Adds a level of pair counts, merging the last levels while the older one is not much
+        larger, so that every count is merged O(log(updates)) times.
+        """
+        self._levels.append({name: matrix.tocsr() for name, matrix in delta.items()})
+        while len(self._levels) > 1:
+            newer, older = self._levels[-1], self._levels[-2]
+            if sum(matrix.nnz for matrix in older.values()) > 2 * sum(matrix.nnz for matrix in newer.values()):
+                break
+            n = max(matrix.shape[0] for matrix in list(older.values()) + list(newer.values()))
+            merged = {name: _resized(older[name], n) for name in older}
+            for name, matrix in newer.items():
+                merged[name] = merged[name] + _resized(matrix, n) if name in merged else _resized(matrix, n)
+            self._levels[-2:] = [merged]
+
+    def _append_votes(self, election_codes, user_codes, votes, dates):
+        start, self.n_votes = self.n_votes, self.n_votes + len(election_codes)
+        for name, values in [('_election_codes', election_codes), ('_user_codes', user_codes),
+                             ('_votes', votes), ('_dates', dates)]:
+            array = _grown(getattr(self, name), self.n_votes)
+            array[start:self.n_votes] = values
+            setattr(self, name, array)
+
+        order = np.argsort(user_codes, kind='stable')
+        users, bounds = np.unique(user_codes[order], return_index=True)
+        for user, positions in zip(users, np.split(order + start, bounds[1:])):
+            self.user_votes[user].extend(positions.tolist())
+
+    def _recount_moved(self, candidates, first_dates):
+        """
+        Updates the 'before' pair counts for the candidates whose first election date moved
+        to first_dates: only the votes of these candidates are re-checked, and the elections
+        of the votes whose flag changed are recounted.
+        """
+        positions = np.array([position for user in candidates for position in self.user_votes[user]],
+                             dtype=np.int64)
+        vote_users = self.user_codes[positions]
+        changed = (self.dates[positions] <= self.first_dates[vote_users]) != \
+            (self.dates[positions] <= first_dates[vote_users])
+        if not changed.any():
+            return
+
+        # votes are sorted by election, so each touched election is a range of positions
+        touched = np.unique(self.election_codes[positions[changed]])
+        starts = np.searchsorted(self.election_codes, touched, side='left')
+        stops = np.searchsorted(self.election_codes, touched, side='right')
+        rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+        local_codes = np.repeat(np.arange(len(touched)), stops - starts)
+
+        user_codes, votes, dates = self.user_codes[rows], self.votes[rows], self.dates[rows]
+        args = (local_codes, user_codes, votes)
+        removed = _pair_count_matrices(*args, dates <= self.first_dates[user_codes], len(touched), len(self.users))
+        added = _pair_count_matrices(*args, dates <= first_dates[user_codes], len(touched), len(self.users))
+        self._add({name: added[name] - removed[name] for name in ['Total Votes before', 'Agreed before']})
+
+    def update(self, new_votes_df):
+        """
+        Adds the votes of newly appended elections to the index, in time proportional to
+        their number and to the number of past votes of the candidates whose first election
+        they move earlier.
+
+        Parameters:
+        - new_votes_df (pandas DataFrame): Processed votes of new elections only, with columns
+          'SRC', 'TGT', 'ELECTION_ID', 'VOT', 'DAT'. 'ELECTION_ID' only needs to be unique
+          within the batch.
+        """
+        self._register_users(pd.concat([new_votes_df['SRC'], new_votes_df['TGT']]).to_numpy())
+        n_users = len(self.users)
+
+        # First election dates, moved for candidates whose first election is in the batch
+        batch_first = new_votes_df.groupby('TGT')['DAT'].min()
+        candidates = np.array([self.user_ids[name] for name in batch_first.index], dtype=np.int64)
+        old_first = self.first_dates[candidates]
+        new_first = batch_first.to_numpy(dtype='datetime64[ns]')
+        moved = ~np.isnat(new_first) & (np.isnat(old_first) | (new_first < old_first))
+        first_dates = self.first_dates.copy()
+        first_dates[candidates[moved]] = new_first[moved]
+
+        if moved.any():
+            self._recount_moved(candidates[moved], first_dates)
+        self._first_dates[:n_users] = first_dates
+
+        # Pairs of the new elections, stored sorted by election
+        new_votes_df = new_votes_df[new_votes_df['SRC'].notna()]
+        batch_codes, batch_elections = pd.factorize(new_votes_df['ELECTION_ID'], sort=True)
+        order = np.argsort(batch_codes, kind='stable')
+        batch_codes = batch_codes[order]
+        user_codes = np.array([self.user_ids[name] for name in new_votes_df['SRC']], dtype=np.int64)[order]
+        votes = new_votes_df['VOT'].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        dates = new_votes_df['DAT'].to_numpy(dtype='datetime64[ns]')[order]
+
+        self._add(_pair_count_matrices(batch_codes, user_codes, votes, dates <= first_dates[user_codes],
+                                       len(batch_elections), n_users))
+        self._append_votes(batch_codes + self.n_elections, user_codes, votes, dates)
+        self.n_elections += len(batch_elections)
+
+    def to_frame(self):
+        """
+        Returns the agreement before election DataFrame, with USR1 < USR2 in each pair.
+        """
+        order = np.argsort(np.array(self.users, dtype=object), kind='stable')
+        matrices = {name: matrix[order][:, order] for name, matrix in self.matrices.items()}
+        return _agreement_frame(matrices, pd.Index(self.users)[order])
+
+    def save(self, path):
+        """
+        Writes the index to a .npz file.
+        """
+        arrays = {
+            'users': np.array(self.users, dtype=str),
+            'first_dates': self.first_dates,
+            'election_codes': self.election_codes,
+            'user_codes': self.user_codes,
+            'votes': self.votes,
+            'dates': self.dates,
+            'n_elections': np.array(self.n_elections),
+        }
+        for i, (name, matrix) in enumerate(self.matrices.items()):
+            arrays[f'matrix{i}_data'] = matrix.data
+            arrays[f'matrix{i}_indices'] = matrix.indices
+            arrays[f'matrix{i}_indptr'] = matrix.indptr
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by save().
+        """
+        index = cls()
+        with np.load(path) as arrays:
+            index.users = arrays['users'].tolist()
+            index.user_ids = {name: i for i, name in enumerate(index.users)}
+            index.user_votes = [[] for _ in index.users]
+            index._first_dates = arrays['first_dates']
+            index.n_elections = int(arrays['n_elections'])
+            index._append_votes(arrays['election_codes'], arrays['user_codes'], arrays['votes'], arrays['dates'])
+
+            n_users = len(index.users)
+            index._levels = [{name: sp.csr_matrix((arrays[f'matrix{i}_data'], arrays[f'matrix{i}_indices'],
+                                                   arrays[f'matrix{i}_indptr']), shape=(n_users, n_users))
+                              for i, name in enumerate(cls.MATRICES)}]
+        return index
+
+
+class ActivityIndex:
+    """
+    Per-user activity sorted by time, with prefix sums of its values, so that the activity
+    of a user before a given time is found by binary search instead of scanning the whole
+    table.
+
+    The events are sorted by (user, time) and each one gets a key combining the code of its
+    user and the rank of its time, so that a batch of (user, time) queries is answered by a
+    single searchsorted on the keys. The sums of the values over the events of a user before
+    a time are then differences of prefix sums.
+
+    Usage:
+    - vote_index = ActivityIndex.from_votes(wiki_df)
+    - vote_index.before(['Bilby'], [pd.Timestamp('2005-01-01')]) returns a DataFrame with
+      the number of votes of Bilby before 2005 and the sums of the vote values.
+    """
+
+    def __init__(self, users, times, **values):
+        """
+        Parameters:
+        - users (array-like): User of each event, missing users are ignored.
+        - times (array-like of datetime64): Time of each event, missing times are ignored.
+        - values: Arrays of the values summed by before(), one per event.
+        """
+        users = pd.Series(users, dtype=object).to_numpy()
+        times = pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[ns]')
+        values = {name: np.asarray(value, dtype=np.float64) for name, value in values.items()}
+
+        keep = pd.notna(users) & ~np.isnat(times)
+        user_codes, users = pd.factorize(users[keep])
+        self.users = pd.Index(users)
+        self.times = np.unique(times[keep])
+        keys = user_codes * (len(self.times) + 1) + np.searchsorted(self.times, times[keep])
+
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.sums = {name: np.concatenate([[0], np.cumsum(value[keep][order])]) for name, value in values.items()}
+
+    @classmethod
+    def from_votes(cls, wiki_df):
+        """
+        Builds the index of the votes cast by each user ('SRC'), with the values 'Yes', 'No'
+        and 'Neutral' (number of votes of each type) and 'Length' (length of the comments).
+        """
+        votes = wiki_df['VOT'].to_numpy()
+        return cls(wiki_df['SRC'], wiki_df['DAT'],
+                   Yes=votes == 1, No=votes == -1, Neutral=votes == 0,
+                   Length=wiki_df['TXT'].str.len().fillna(0))
+
+    @classmethod
+    def from_edits(cls, edits_df):
+        """
+        Builds the index of the monthly edits of each user ('user_name', 'month'), with the
+        value 'Revisions'.
+        """
+        return cls(edits_df['user_name'], edits_df['month'], Revisions=edits_df['revisions'].fillna(0))
+
+    def before(self, users, times):
+        """
+        Sums the activity of each user strictly before the corresponding time.
+
+        Parameters:
+        - users (array-like): Users to look up.
+        - times (array-like of datetime64): Times to look up, one per user.
+
+        Returns:
+        - activity (pandas DataFrame): 'Count', the number of events, and the sum of each value,
+          one row per query (all 0 for unknown users or missing times).
+        """
+        user_codes = self.users.get_indexer(pd.Series(users, dtype=object))
+        times = pd.to_datetime(pd.Series(times)).to_numpy(dtype='datetime64[ns]')
+        valid = (user_codes >= 0) & ~np.isnat(times)
+
+        base = np.where(valid, user_codes, 0) * (len(self.times) + 1)
+        start = np.searchsorted(self.keys, base)
+        stop = np.searchsorted(self.keys, base + np.searchsorted(self.times, times))
+        stop = np.where(valid, stop, start)
+
+        activity = pd.DataFrame({'Count': stop - start})
+        for name, sums in self.sums.items():
+            activity[name] = sums[stop] - sums[start]
+        return activity
+
+
+def summarize_before_adminship(elections_df, wiki_df, edits_df=None, vote_index=None, edit_index=None):
+    """
+    Summarizes for every election the activity of the candidate before its start: the votes
+    the candidate cast, the average length of their comments and the revisions made.
+
+    Parameters:
+    - elections_df (pandas DataFrame): Elections DataFrame from create_elections_df.
+    - wiki_df (pandas DataFrame): Processed Wiki DataFrame.
+    - edits_df (pandas DataFrame, optional): Monthly edits with columns 'user_name', 'month'
+      and 'revisions'.
+    - vote_index, edit_index (ActivityIndex, optional): Indexes to reuse, built from wiki_df
+      and edits_df otherwise.
+
+    Returns:
+    - summary_before_adminship_df (pandas DataFrame): Columns 'ELECTION_ID', 'TGT', 'RES',
+      'TotalNumPrevVotes', 'NumPrevVotesNo', 'NumPrevVotesYes', 'NumPrevVotesNeutral',
+      'AvgPrevCommentLength' and 'NumPrevRevisions'.
+    """
+    summary_df = elections_df[['ELECTION_ID', 'TGT', 'RES', 'Earliest Voting Date']].drop_duplicates()
+    summary_df = summary_df.reset_index(drop=True)
+    candidates, start_dates = summary_df['TGT'], summary_df.pop('Earliest Voting Date')
+
+    if vote_index is None:
+        vote_index = ActivityIndex.from_votes(wiki_df)
+    votes = vote_index.before(candidates, start_dates)
+    summary_df['NumPrevVotesNo'] = votes['No'].astype(np.int64)
+    summary_df['NumPrevVotesYes'] = votes['Yes'].astype(np.int64)
+    summary_df['NumPrevVotesNeutral'] = votes['Neutral'].astype(np.int64)
+    summary_df.insert(3, 'TotalNumPrevVotes',
+                      summary_df[['NumPrevVotesNo', 'NumPrevVotesYes', 'NumPrevVotesNeutral']].sum(axis=1))
+    summary_df['AvgPrevCommentLength'] = votes['Length'] / votes['Count'].replace(0, np.nan)
+
+    if edit_index is None and edits_df is not None:
+        edit_index = ActivityIndex.from_edits(edits_df)
+    if edit_index is not None:
+        summary_df['NumPrevRevisions'] = edit_index.before(candidates, start_dates)['Revisions']
+    return summary_df
@@ -0,0 +1,856 @@
+import os
+import numpy as np
+import pandas as pd
+import networkx as nx
+import scipy.sparse as sp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+WINDOW_UNITS = {'year': 'datetime64[Y]', 'month': 'datetime64[M]'}
+BETWEENNESS_BATCH_SIZE = 128
+LOUVAIN_THRESHOLD = 1e-7
+
+
+class GraphSnapshot:
+    """
+    Vote graph of one time window, as CSR adjacency arrays over the users of the window.
+
+    The local node i is the user of code nodes[i] in the TemporalVoteGraph it comes from, so
+    that the nodes of different snapshots can be compared without going through usernames.
+    Undirected graphs store every edge in both directions, except the self-loops.
+
+    Attributes:
+    - start, stop: Bounds of the window, stop excluded (Timestamps, or integers for an integer
+      time column).
+    - nodes (numpy.ndarray): User code of each local node, sorted.
+    - indptr, indices (numpy.ndarray): CSR adjacency of the local nodes, sorted by row then column.
+    - weights (numpy.ndarray): Number of votes of each edge in the window.
+    - users (pandas Index): Usernames of the user codes.
+    - directed (bool): Whether the edges go from SRC to TGT.
+    """
+
+    def __init__(self, start, stop, nodes, indptr, indices, weights, users, directed):
+        self.start, self.stop = start, stop
+        self.nodes = nodes
+        self.indptr, self.indices, self.weights = indptr, indices, weights
+        self.users = users
+        self.directed = directed
+
+    @classmethod
+    def from_edgelist(cls, df, source, target, weight=None, directed=False):
+        """
+        Builds the graph of an edge list DataFrame, as nx.from_pandas_edgelist, e.g. for the
+        agreement and similarity graphs of the Graph Analysis notebook.
+
+        Parameters:
+        - df (pandas DataFrame): One row per edge.
+        - source, target (str): Columns of the endpoints.
+        - weight (str, optional): Column of the edge weights, summed over duplicated edges.
+          By default the weights are the number of rows of each edge.
+        - directed (bool): Whether the edges go from source to target.
+
+        Returns:
+        - snapshot (GraphSnapshot): Graph without time bounds, whose nodes are the users in
+          order of first appearance.
+        """
+        codes, users = pd.factorize(pd.concat([df[source], df[target]], ignore_index=True))
+        rows, cols = codes[:len(df)].astype(np.int64), codes[len(df):].astype(np.int64)
+        weights = np.ones(len(df)) if weight is None else df[weight].to_numpy(dtype=np.float64)
+        if not directed:
+            loops = rows == cols
+            rows, cols = np.concatenate([rows, cols[~loops]]), np.concatenate([cols, rows[~loops]])
+            weights = np.concatenate([weights, weights[~loops]])
+
+        adjacency = sp.csr_matrix((weights, (rows, cols)), shape=(len(users), len(users)))
+        adjacency.sum_duplicates()
+        return cls(None, None, np.arange(len(users)), adjacency.indptr, adjacency.indices, adjacency.data,
+                   pd.Index(users), directed)
+
+    def __repr__(self):
+        return f'GraphSnapshot({self.start} - {self.stop}, {self.n_nodes} nodes, {self.n_edges} edges)'
+
+    @property
+    def n_nodes(self):
+        return len(self.nodes)
+
+    @property
+    def n_edges(self):
+        if self.directed:
+            return len(self.indices)
+        return len(self._edge_list()[0])
+
+    def node_names(self):
+        """
+        Returns the usernames of the local nodes.
+        """
+        return self.users[self.nodes]
+
+    def to_scipy(self):
+        """
+        Returns the adjacency as a scipy CSR matrix sharing the arrays of the snapshot.
+        """
+        return sp.csr_matrix((self.weights, self.indices, self.indptr), shape=(self.n_nodes, self.n_nodes),
+                             copy=False)
+
+    def to_networkx(self):
+        """
+        Returns the snapshot as a networkx graph whose nodes are the usernames and whose edges
+        have the number of votes as 'weight', i.e. the graph built with nx.from_pandas_edgelist
+        in the Graph Analysis notebook (plus the weights).
+        """
+        names = self.node_names().to_numpy()
+        rows, cols, weights = self._edge_list()
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.add_nodes_from(names)
+        graph.add_weighted_edges_from(zip(names[rows], names[cols], weights.tolist()))
+        return graph
+
+    def _edge_list(self):
+        """
+        Returns the (rows, cols, weights) of the edges, each undirected edge once.
+        """
+        rows = np.repeat(np.arange(self.n_nodes), np.diff(self.indptr))
+        keep = slice(None) if self.directed else rows <= self.indices
+        return rows[keep], self.indices[keep], self.weights[keep]
+
+    def to_igraph(self):
+        """
+        Returns the snapshot as an igraph graph with the usernames as the 'name' vertex attribute
+        and the number of votes as the 'weight' edge attribute.
+        """
+        import igraph as ig
+
+        rows, cols, weights = self._edge_list()
+        graph = ig.Graph(n=self.n_nodes, edges=np.column_stack((rows, cols)).tolist(), directed=self.directed)
+        graph.vs['name'] = list(self.node_names())
+        graph.es['weight'] = weights.tolist()
+        return graph
+
+
+def _window_starts(first, last, span, stride):
+    """
+    Returns the starts of the windows of length span every stride from first, up to the
+    first window whose end is past last, so that every value in [first, last] is in a window
+    (except for the gaps between windows when stride is longer than span).
+    """
+    starts = np.arange(first, last + 1, stride, dtype=np.int64)
+    return starts[:np.searchsorted(starts + span, last, side='right') + 1]
+
+
+class TemporalVoteGraph:
+    """
+    Integer-coded vote edges sorted by time, from which the vote graphs of successive time
+    windows are produced by adding the votes entering the window and removing the votes
+    leaving it, instead of building every window graph from its votes.
+
+    Every distinct (SRC, TGT) pair, or unordered pair for an undirected graph, is an edge
+    whose number of votes in the current window is kept up to date; the adjacency entries of
+    all the edges are sorted once, so that a snapshot only selects the entries of the edges
+    with votes in the window.
+
+    Usage:
+    - temporal_graph = TemporalVoteGraph.from_votes(wiki_df[wiki_df['VOT'] == 1], time_column='YEA')
+    - graphs = [snapshot.to_networkx() for snapshot in temporal_graph.windows(span=2)]
+    - snapshots = list(temporal_graph.windows(span=3, stride=3, unit='month'))   # on 'DAT'
+    """
+
+    def __init__(self, sources, targets, times, users, directed=False):
+        """
+        Parameters:
+        - sources, targets (array-like of int): User codes of the voters and of the candidates.
+        - times (array-like): Time of each vote, datetimes or integers (e.g. years).
+        - users (pandas Index): Usernames of the user codes.
+        - directed (bool): Whether the edges go from the voter to the candidate.
+        """
+        times = np.asarray(times)
+        self.is_datetime = np.issubdtype(times.dtype, np.datetime64)
+        if self.is_datetime:
+            times = times.astype('datetime64[ns]').view(np.int64)
+        order = np.argsort(times, kind='stable')
+        self.times = times[order]
+        self.users = pd.Index(users)
+        self.directed = directed
+
+        sources = np.asarray(sources, dtype=np.int64)[order]
+        targets = np.asarray(targets, dtype=np.int64)[order]
+        if not directed:
+            sources, targets = np.minimum(sources, targets), np.maximum(sources, targets)
+        n_users = max(len(self.users), 1)
+        edge_keys, self.edge_codes = np.unique(sources * n_users + targets, return_inverse=True)
+        self.edge_codes = self.edge_codes.ravel()
+        self.edge_sources, self.edge_targets = edge_keys // n_users, edge_keys % n_users
+
+        # adjacency entries of every edge, sorted by (row, column)
+        rows, cols, entry_edges = self.edge_sources, self.edge_targets, np.arange(len(edge_keys))
+        if not directed:
+            loops = rows == cols
+            rows, cols = np.concatenate([rows, cols[~loops]]), np.concatenate([cols, rows[~loops]])
+            entry_edges = np.concatenate([entry_edges, entry_edges[~loops]])
+        entry_order = np.lexsort((cols, rows))
+        self.entry_rows, self.entry_cols = rows[entry_order], cols[entry_order]
+        self.entry_edges = entry_edges[entry_order]
+
+    @classmethod
+    def from_votes(cls, wiki_df, time_column='DAT', directed=False, registry=None):
+        """
+        Builds the temporal graph of the votes of a wiki DataFrame, without the votes missing a
+        voter, a candidate or a time.
+
+        Parameters:
+        - wiki_df (pandas DataFrame): Wiki DataFrame with columns 'SRC', 'TGT' and time_column,
+          e.g. filtered on 'VOT' beforehand.
+        - time_column (str): 'DAT' for windows of any span, or 'YEA' for windows of years.
+        - directed (bool): Whether the edges go from SRC to TGT.
+        - registry (UserRegistry, optional): If given, the user codes are the registry ids.
+
+        Returns:
+        - temporal_graph (TemporalVoteGraph)
+        """
+        votes_df = wiki_df[wiki_df['SRC'].notna() & wiki_df['TGT'].notna() & wiki_df[time_column].notna()]
+        if registry is not None:
+            sources, targets = registry.intern(votes_df['SRC']), registry.intern(votes_df['TGT'])
+            users = registry.categories()
+        else:
+            codes, users = pd.factorize(pd.concat([votes_df['SRC'], votes_df['TGT']], ignore_index=True))
+            sources, targets = codes[:len(votes_df)], codes[len(votes_df):]
+        return cls(sources, targets, votes_df[time_column].to_numpy(), users, directed)
+
+    def _label(self, value):
+        return pd.Timestamp(value) if self.is_datetime else value
+
+    def _window_bounds(self, span, stride, unit):
+        """
+        Returns the (start, stop) time values of the windows of span periods (or of the
+        duration span when unit is None) starting every stride, from the first vote until the
+        last window ending after the last vote.
+        """
+        if not len(self.times):
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if unit is None and self.is_datetime:
+            span, stride = pd.Timedelta(span).value, pd.Timedelta(stride).value
+        if span <= 0 or stride <= 0:
+            raise ValueError('span and stride must be positive')
+
+        if unit is None:
+            first, last = self.times[0], self.times[-1]
+            starts = _window_starts(first, last, span, stride)
+            return starts, starts + span
+
+        if unit not in WINDOW_UNITS:
+            raise ValueError(f'Unknown window unit {unit!r}, expected one of {sorted(WINDOW_UNITS)} or None')
+        if not self.is_datetime:
+            if unit != 'year':
+                raise ValueError('Windows of months need a datetime time column such as DAT')
+            first, last = self.times[0], self.times[-1]
+            starts = _window_starts(first, last, span, stride)
+            return starts, starts + span
+
+        periods = self.times[[0, -1]].view('datetime64[ns]').astype(WINDOW_UNITS[unit]).view(np.int64)
+        starts = _window_starts(periods[0], periods[1], span, stride)
+
+        def to_times(values):
+            return values.view(WINDOW_UNITS[unit]).astype('datetime64[ns]').view(np.int64)
+
+        return to_times(starts), to_times(starts + span)
+
+    def _snapshot(self, start, stop, counts):
+        active = counts[self.entry_edges] > 0
+        rows, cols = self.entry_rows[active], self.entry_cols[active]
+        nodes = np.unique(rows) if not self.directed else np.union1d(rows, cols)
+
+        local_rows = np.searchsorted(nodes, rows)
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(local_rows, minlength=len(nodes)), out=indptr[1:])
+        return GraphSnapshot(self._label(start), self._label(stop), nodes, indptr,
+                             np.searchsorted(nodes, cols), counts[self.entry_edges[active]],
+                             self.users, self.directed)
+
+    def snapshot(self, start, stop):
+        """
+        Returns the graph of the votes cast in [start, stop).
+        """
+        bounds = np.array([start, stop], dtype='datetime64[ns]').view(np.int64) if self.is_datetime else \
+            np.array([start, stop], dtype=np.int64)
+        first, last = np.searchsorted(self.times, bounds)
+        counts = np.bincount(self.edge_codes[first:last], minlength=len(self.edge_sources))
+        return self._snapshot(bounds[0], bounds[1], counts)
+
+    def windows(self, span=1, stride=1, unit='year'):
+        """
+        Yields the graphs of successive time windows.
+
+        Parameters:
+        - span (int or timedelta-like): Length of the windows, in units, or as a duration
+          (e.g. '90D') when unit is None.
+        - stride (int or timedelta-like): Offset between the starts of successive windows.
+        - unit (str or None): 'year' or 'month' for windows aligned on calendar years or months,
+          None for windows starting at the first vote.
+
+        Returns:
+        - snapshots (generator of GraphSnapshot): Ordered by start.
+        """
+        starts, stops = self._window_bounds(span, stride, unit)
+        first_votes, last_votes = np.searchsorted(self.times, starts), np.searchsorted(self.times, stops)
+
+        counts = np.zeros(len(self.edge_sources), dtype=np.int64)
+        low = high = 0
+        for start, stop, first, last in zip(starts, stops, first_votes, last_votes):
+            # the votes [low, high) are in the window, move it to [first, last)
+            np.subtract.at(counts, self.edge_codes[low:min(first, high)], 1)
+            np.add.at(counts, self.edge_codes[max(first, high):last], 1)
+            low, high = first, last
+            yield self._snapshot(start, stop, counts)
+
+
+def degree_centrality(snapshot):
+    """
+    Returns the degree centrality of the nodes of a snapshot, as nx.degree_centrality (a
+    self-loop counts twice in the degree of an undirected graph, and a directed degree is
+    the sum of the in and out degrees).
+    """
+    rows = np.repeat(np.arange(snapshot.n_nodes), np.diff(snapshot.indptr))
+    degrees = np.bincount(rows, minlength=snapshot.n_nodes) + \
+        np.bincount(snapshot.indices[rows == snapshot.indices] if not snapshot.directed else snapshot.indices,
+                    minlength=snapshot.n_nodes)
+    return degrees / (snapshot.n_nodes - 1) if snapshot.n_nodes > 1 else np.ones(snapshot.n_nodes)
+
+
+def _dependencies(indptr, indices, sources, batch_size=BETWEENNESS_BATCH_SIZE):
+    """
+    Sums the Brandes dependencies of the given sources on every node of an unweighted graph.
+
+    The breadth-first searches of a batch of sources run together: the number of shortest
+    paths reaching the next level is the sparse product of the current level (a batch x node
+    matrix of path counts) with the adjacency, and the dependencies are propagated back level
+    by level with the product by the transposed adjacency.
+
+    Parameters:
+    - indptr, indices (numpy.ndarray): CSR adjacency, the rows being the tails of the edges.
+    - sources (numpy.ndarray): Sources of the shortest paths.
+    - batch_size (int): Number of sources searched together.
+
+    Returns:
+    - dependencies (numpy.ndarray): Sum over the sources s of the fraction of the shortest
+      paths from s to every other node going through each node.
+    """
+    n_nodes = len(indptr) - 1
+    adjacency = sp.csr_matrix((np.ones(len(indices)), indices, indptr), shape=(n_nodes, n_nodes))
+    transposed = adjacency.T.tocsr()
+    dependencies = np.zeros(n_nodes)
+
+    for batch_start in range(0, len(sources), batch_size):
+        batch = np.asarray(sources[batch_start:batch_start + batch_size])
+        batch_rows = np.arange(len(batch))
+        paths = np.zeros((len(batch), n_nodes))
+        depths = np.full((len(batch), n_nodes), -1, dtype=np.int32)
+        paths[batch_rows, batch] = 1
+        depths[batch_rows, batch] = 0
+
+        # forward: the (batch row, node) entries of each level
+        levels = [(batch_rows, batch)]
+        while True:
+            rows, cols = levels[-1]
+            reached = (sp.csr_matrix((paths[rows, cols], (rows, cols)), shape=paths.shape) @ adjacency).tocoo()
+            new = depths[reached.row, reached.col] < 0
+            rows, cols = reached.row[new], reached.col[new]
+            if not len(rows):
+                break
+            paths[rows, cols] = reached.data[new]
+            depths[rows, cols] = len(levels)
+            levels.append((rows, cols))
+
+        # backward: a node at depth d gets paths[v] / paths[w] * (1 + delta[w]) from its successors w
+        deltas = np.zeros(paths.shape)
+        for depth in range(len(levels) - 1, 0, -1):
+            rows, cols = levels[depth]
+            coefficients = (1 + deltas[rows, cols]) / paths[rows, cols]
+            received = (sp.csr_matrix((coefficients, (rows, cols)), shape=paths.shape) @ transposed).tocoo()
+            parents = depths[received.row, received.col] == depth - 1
+            rows, cols = received.row[parents], received.col[parents]
+            deltas[rows, cols] += paths[rows, cols] * received.data[parents]
+
+        deltas[batch_rows, batch] = 0
+        dependencies += deltas.sum(axis=0)
+    return dependencies
+
+
+def betweenness_error_bound(n_nodes, k, confidence=0.95):
+    """
+    Returns the maximum error on the normalized betweenness of any node of the k-pivot
+    approximation, with the given probability.
+
+    Each pivot s gives the unbiased estimate n * delta_s(v) / ((n - 1)(n - 2)) of the
+    normalized betweenness of v, which lies in [0, n / (n - 1)], so that by Hoeffding's
+    inequality and a union bound over the n nodes, the mean of k pivots is within
+    n / (n - 1) * sqrt(ln(2n / (1 - confidence)) / (2k)) of the exact value for every node.
+    """
+    if n_nodes <= 2 or k >= n_nodes:
+        return 0.0
+    return n_nodes / (n_nodes - 1) * np.sqrt(np.log(2 * n_nodes / (1 - confidence)) / (2 * k))
+
+
+def betweenness_pivots(n_nodes, error, confidence=0.95):
+    """
+    Returns the number of pivots for which betweenness_error_bound is at most error.
+    """
+    if n_nodes <= 2:
+        return n_nodes
+    k = np.log(2 * n_nodes / (1 - confidence)) / (2 * (error * (n_nodes - 1) / n_nodes) ** 2)
+    return int(min(n_nodes, np.ceil(k)))
+
+
+def betweenness_centrality(snapshot, k=None, normalized=True, workers=1, seed=None,
+                           batch_size=BETWEENNESS_BATCH_SIZE):
+    """
+    Computes the betweenness centrality of the nodes of a snapshot with Brandes' algorithm on
+    the CSR arrays, as nx.betweenness_centrality (unweighted, without the endpoints).
+
+    Parameters:
+    - snapshot (GraphSnapshot): Graph, e.g. from TemporalVoteGraph.windows or
+      GraphSnapshot.from_edgelist.
+    - k (int, optional): If given, only k pivots drawn at random are used as sources and the
+      result is scaled by n / k, see betweenness_error_bound for the error.
+    - normalized (bool): Whether to divide by the number of pairs of other nodes.
+    - workers (int, optional): Number of worker processes the sources are partitioned over,
+      None for one per CPU.
+    - seed (int, optional): Seed of the pivots.
+    - batch_size (int): Number of sources searched together.
+
+    Returns:
+    - betweenness (numpy.ndarray): Betweenness of each local node.
+    """
+    n_nodes = snapshot.n_nodes
+    if k is None or k >= n_nodes:
+        sources, scale = np.arange(n_nodes), 1.0
+    else:
+        sources = np.sort(np.random.default_rng(seed).choice(n_nodes, k, replace=False))
+        scale = n_nodes / k
+
+    if workers is None:
+        workers = os.cpu_count()
+    if workers > 1 and len(sources) > batch_size:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_dependencies, snapshot.indptr, snapshot.indices, part, batch_size)
+                       for part in np.array_split(sources, workers)]
+            dependencies = sum(future.result() for future in futures)
+    else:
+        dependencies = _dependencies(snapshot.indptr, snapshot.indices, sources, batch_size)
+
+    if normalized:
+        if n_nodes > 2:
+            scale /= (n_nodes - 1) * (n_nodes - 2)
+    elif not snapshot.directed:
+        # every pair of nodes is counted from both ends
+        scale /= 2
+    return dependencies * scale
+
+
+def centrality(snapshot, k=None, workers=1, seed=None):
+    """
+    Returns the degree and betweenness centralities of the nodes of a snapshot.
+
+    Parameters:
+    - snapshot (GraphSnapshot): Graph.
+    - k, workers, seed: See betweenness_centrality.
+
+    Returns:
+    - centrality_df (pandas DataFrame): Columns 'User', 'Degree_Centrality' and
+      'Betweenness_Centrality'.
+    """
+    return pd.DataFrame({
+        'User': snapshot.node_names(),
+        'Degree_Centrality': degree_centrality(snapshot),
+        'Betweenness_Centrality': betweenness_centrality(snapshot, k=k, workers=workers, seed=seed),
+    })
+
+
+def max_centrality_df(snapshots, k=None, workers=1, seed=None):
+    """
+    Creates the centrality DataFrame of the Graph Analysis notebook: the maximum degree and
+    betweenness centralities of every user over the window graphs.
+
+    Parameters:
+    - snapshots (iterable of GraphSnapshot): e.g. TemporalVoteGraph.windows(span=2).
+    - k, workers, seed: See betweenness_centrality.
+
+    Returns:
+    - centrality_df (pandas DataFrame): Columns 'User', 'Max_Degree_Centrality' and
+      'Max_Betweenness_Centrality', sorted by user.
+    """
+    centrality_df = pd.concat([centrality(snapshot, k=k, workers=workers, seed=seed) for snapshot in snapshots],
+                              ignore_index=True)
+    centrality_df = centrality_df.rename(columns={'Degree_Centrality': 'Max_Degree_Centrality',
+                                                  'Betweenness_Centrality': 'Max_Betweenness_Centrality'})
+    return centrality_df.groupby('User').max().reset_index()
+
+
+def _symmetric_adjacency(snapshot, weighted):
+    """
+    Returns the undirected adjacency of a snapshot as a CSR matrix whose diagonal holds twice
+    the weight of the self-loops, so that its row sums are the degrees.
+    """
+    adjacency = snapshot.to_scipy().astype(np.float64)
+    if not weighted:
+        adjacency.data = np.ones(len(adjacency.data))
+    if snapshot.directed:
+        adjacency = adjacency + adjacency.T
+    else:
+        adjacency = adjacency + sp.diags(adjacency.diagonal())
+    return sp.csr_matrix(adjacency)
+
+
+def _relabel(membership):
+    """
+    Relabels the communities by decreasing size, ties broken by their first node.
+    """
+    _, first, codes, sizes = np.unique(membership, return_index=True, return_inverse=True, return_counts=True)
+    order = np.lexsort((first, -sizes))
+    labels = np.empty(len(order), dtype=np.int64)
+    labels[order] = np.arange(len(order))
+    return labels[codes.ravel()]
+
+
+def _move_nodes(adjacency, membership, resolution, rng, threshold, blocks=None, single_pass=False):
+    """
+    Local moving phase of Louvain: every node is moved to the neighboring community with the
+    largest modularity gain, and its neighbors outside that community are visited again, until
+    no node moves (as the fast local moving of Leiden). The nodes are first visited in a
+    random order. If blocks is given, the nodes only move to communities of their own block.
+    If single_pass is True, every node is visited once.
+
+    Returns:
+    - membership (numpy.ndarray): Community of each node.
+    - moved (bool): Whether any node moved.
+    """
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    total = degrees.sum()
+    indptr, indices, weights = adjacency.indptr.tolist(), adjacency.indices.tolist(), adjacency.data.tolist()
+    membership = membership.tolist()
+    blocks = blocks.tolist() if blocks is not None else None
+    community_degrees = np.bincount(membership, weights=degrees, minlength=len(membership)).tolist()
+    degrees = degrees.tolist()
+    scale = resolution / total if total else 0.0
+
+    queue = deque(rng.permutation(len(membership)).tolist())
+    queued = [True] * len(membership)
+    moved = False
+    while queue:
+        node = queue.popleft()
+        queued[node] = False
+        links = {}
+        for position in range(indptr[node], indptr[node + 1]):
+            neighbor = indices[position]
+            if neighbor != node and (blocks is None or blocks[neighbor] == blocks[node]):
+                community = membership[neighbor]
+                links[community] = links.get(community, 0.0) + weights[position]
+
+        current = membership[node]
+        degree = degrees[node]
+        community_degrees[current] -= degree
+        best, best_gain = current, links.get(current, 0.0) - scale * community_degrees[current] * degree
+        for community, link in links.items():
+            gain = link - scale * community_degrees[community] * degree
+            if gain > best_gain + threshold:
+                best, best_gain = community, gain
+        community_degrees[best] += degree
+
+        if best != current:
+            membership[node] = best
+            moved = True
+            if not single_pass:
+                for neighbor in indices[indptr[node]:indptr[node + 1]]:
+                    if not queued[neighbor] and membership[neighbor] != best:
+                        queued[neighbor] = True
+                        queue.append(neighbor)
+    return np.array(membership, dtype=np.int64), moved
+
+
+def louvain_membership(snapshot, initial=None, resolution=1, seed=0, weighted=False, threshold=LOUVAIN_THRESHOLD):
+    """
+    Detects the communities of a snapshot with the Louvain method, on its CSR arrays.
+
+    The result only depends on the graph, the initial partition and the seed. Starting from
+    the partition of a similar graph, e.g. the previous time window, most nodes are already
+    in their final community and the first local moving phase converges quickly.
+
+    Parameters:
+    - snapshot (GraphSnapshot): Graph, directed graphs being made undirected.
+    - initial (numpy.ndarray, optional): Initial community of each local node, negative for
+      the nodes starting alone. By default every node starts alone.
+    - resolution (float): Modularity resolution, as in nx.community.louvain_communities.
+    - seed (int): Seed of the order in which the nodes are visited.
+    - weighted (bool): Whether to use the number of votes of the edges as weights. The graphs
+      of the Graph Analysis notebook are unweighted.
+    - threshold (float): Minimum modularity gain of a move.
+
+    Returns:
+    - membership (numpy.ndarray): Community of each local node, the communities being numbered
+      by decreasing size.
+    """
+    rng = np.random.default_rng(seed)
+    adjacency = _symmetric_adjacency(snapshot, weighted)
+    n_nodes = adjacency.shape[0]
+    if initial is None:
+        level_membership = np.arange(n_nodes)
+    else:
+        initial = np.asarray(initial, dtype=np.int64)
+        alone = initial < 0
+        level_membership = np.empty(n_nodes, dtype=np.int64)
+        level_membership[alone] = np.arange(np.count_nonzero(alone))
+        level_membership[~alone] = np.unique(initial[~alone], return_inverse=True)[1].ravel() + \
+            np.count_nonzero(alone)
+
+    # as in Leiden, the communities are refined before the aggregation, so that the
+    # communities of the initial partition that no longer hold together can still split
+    membership = np.arange(n_nodes)
+    while True:
+        level_membership = _relabel(_move_nodes(adjacency, level_membership, resolution, rng, threshold)[0])
+        n_level_nodes, n_communities = adjacency.shape[0], level_membership.max(initial=-1) + 1
+        if n_communities == n_level_nodes:
+            break
+        refined = _relabel(_move_nodes(adjacency, np.arange(n_level_nodes), resolution, rng, threshold,
+                                       blocks=level_membership, single_pass=True)[0])
+        if refined.max() + 1 == n_level_nodes:
+            refined = level_membership
+
+        # the refined communities become the nodes of the next level, starting in their community
+        n_refined = refined.max() + 1
+        membership = refined[membership]
+        projection = sp.csr_matrix((np.ones(n_level_nodes), (np.arange(n_level_nodes), refined)),
+                                   shape=(n_level_nodes, n_refined))
+        adjacency = (projection.T @ adjacency @ projection).tocsr()
+        communities = np.zeros(n_refined, dtype=np.int64)
+        communities[refined] = level_membership
+        level_membership = communities
+
+    return _relabel(level_membership[membership])
+
+
+def membership_communities(snapshot, membership):
+    """
+    Returns the communities as the list of sets of usernames of nx.community.louvain_communities.
+    """
+    names = snapshot.node_names().to_numpy()
+    order = np.argsort(membership, kind='stable')
+    bounds = np.cumsum(np.bincount(membership))[:-1]
+    return [set(community) for community in np.split(names[order], bounds)]
+
+
+def modularity(snapshot, membership, resolution=1, weighted=False):
+    """
+    Returns the modularity of a partition of a snapshot, as nx.community.modularity.
+    """
+    adjacency = _symmetric_adjacency(snapshot, weighted)
+    degrees = np.asarray(adjacency.sum(axis=1)).ravel()
+    total = degrees.sum()
+    if not total:
+        return 0.0
+    rows = np.repeat(np.arange(adjacency.shape[0]), np.diff(adjacency.indptr))
+    internal = adjacency.data[membership[rows] == membership[adjacency.indices]].sum()
+    community_degrees = np.bincount(membership, weights=degrees)
+    return internal / total - resolution * np.sum(community_degrees ** 2) / total ** 2
+
+
+def match_communities(previous_nodes, previous_membership, nodes, membership, min_jaccard=0.1):
+    """
+    Matches the communities of two partitions of overlapping node sets, e.g. two successive
+    time windows, greedily by decreasing Jaccard similarity of their nodes.
+
+    Parameters:
+    - previous_nodes, nodes (numpy.ndarray): Sorted node codes of the two graphs
+      (GraphSnapshot.nodes).
+    - previous_membership, membership (numpy.ndarray): Community of each node.
+    - min_jaccard (float): Minimum similarity of two matched communities.
+
+    Returns:
+    - matches (dict): Previous community -> matching community, each community being matched
+      at most once.
+    """
+    _, previous_positions, positions = np.intersect1d(previous_nodes, nodes, assume_unique=True,
+                                                      return_indices=True)
+    previous_sizes, sizes = np.bincount(previous_membership), np.bincount(membership)
+    shared = sp.coo_matrix((np.ones(len(positions)), (previous_membership[previous_positions],
+                                                      membership[positions])),
+                           shape=(len(previous_sizes), len(sizes))).tocsr()
+    shared.sum_duplicates()
+    shared = shared.tocoo()
+    jaccard = shared.data / (previous_sizes[shared.row] + sizes[shared.col] - shared.data)
+
+    matches, used = {}, set()
+    for position in np.lexsort((shared.col, shared.row, -jaccard)):
+        if jaccard[position] < min_jaccard:
+            break
+        previous, community = int(shared.row[position]), int(shared.col[position])
+        if previous not in matches and community not in used:
+            matches[previous] = community
+            used.add(community)
+    return matches
+
+
+class CommunityTracker:
+    """
+    Community detection over successive graphs (e.g. the time windows of a
+    TemporalVoteGraph), each run of Louvain starting from the communities of the previous
+    graph for the nodes they share, with the matching of the communities of successive graphs.
+
+    Usage:
+    - tracker = CommunityTracker(seed=42)
+    - for snapshot in temporal_graph.windows(span=2):
+    -     membership = tracker.update(snapshot)
+    - tracker.memberships, tracker.matches     # one array per window, one dict per pair of windows
+    - louvain_communities = [membership_communities(s, m) for s, m in zip(tracker.snapshots, tracker.memberships)]
+    """
+
+    def __init__(self, resolution=1, seed=0, weighted=False, warm_start=True, min_jaccard=0.1):
+        self.resolution = resolution
+        self.seed = seed
+        self.weighted = weighted
+        self.warm_start = warm_start
+        self.min_jaccard = min_jaccard
+        self.snapshots = []
+        self.memberships = []
+        self.matches = []
+
+    def update(self, snapshot):
+        """
+        Detects the communities of the next graph.
+
+        Returns:
+        - membership (numpy.ndarray): Community of each local node of the snapshot.
+        """
+        initial = None
+        if self.warm_start and self.snapshots:
+            previous = self.snapshots[-1]
+            initial = np.full(snapshot.n_nodes, -1, dtype=np.int64)
+            _, previous_positions, positions = np.intersect1d(previous.nodes, snapshot.nodes, assume_unique=True,
+                                                              return_indices=True)
+            initial[positions] = self.memberships[-1][previous_positions]
+
+        membership = louvain_membership(snapshot, initial, self.resolution, self.seed, self.weighted)
+        if self.snapshots:
+            self.matches.append(match_communities(self.snapshots[-1].nodes, self.memberships[-1],
+                                                  snapshot.nodes, membership, self.min_jaccard))
+        self.snapshots.append(snapshot)
+        self.memberships.append(membership)
+        return membership
+
+    def track(self, snapshots):
+        """
+        Detects the communities of every graph, returns the list of the memberships.
+        """
+        return [self.update(snapshot) for snapshot in snapshots]
+
+
+def community_labels(communities, users=None):
+    """
+    Returns the community of every user of a list of communities.
+
+    Parameters:
+    - communities (list of sets): Usernames of each community, e.g. the output of
+      nx.community.louvain_communities or membership_communities.
+    - users (array-like, optional): If given, the labels are returned for these users,
+      -1 for the users in no community.
+
+    Returns:
+    - labels (pandas Series): Community of each user, indexed by username.
+    """
+    names = [name for community in communities for name in community]
+    labels = pd.Series(np.repeat(np.arange(len(communities)), [len(community) for community in communities]),
+                       index=pd.Index(names, dtype=object))
+    if users is not None:
+        labels = labels.reindex(users, fill_value=-1)
+    return labels
+
+
+def _label_codes(labels, names):
+    """
+    Returns the community of each name, -1 for the names without a community.
+    """
+    positions = labels.index.get_indexer(names)
+    return np.where(positions >= 0, labels.to_numpy()[positions], -1)
+
+
+def community_vote_matrices(wiki_df, labels, n_communities=None):
+    """
+    Computes the votes cast by the members of each community for the members of every
+    community, in one pass over the votes.
+
+    Parameters:
+    - wiki_df (pandas DataFrame): Wiki DataFrame with columns 'SRC', 'TGT' and 'VOT'.
+    - labels (pandas Series): Community of each user, indexed by username (see community_labels),
+      the users with a negative label or missing being in no community.
+    - n_communities (int, optional): Number of communities, by default the largest label + 1.
+
+    Returns:
+    - matrices (dict): k x k numpy arrays whose entry [i, j] is about the votes of community i
+      for community j: 'Positive', 'Negative' and 'Neutral' percentages (0 without votes),
+      and 'Total' number of votes. The diagonal is the within-community voting.
+    """
+    if n_communities is None:
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+    sources = _label_codes(labels, wiki_df['SRC'])
+    targets = _label_codes(labels, wiki_df['TGT'])
+    keep = (sources >= 0) & (targets >= 0)
+    cells = sources[keep] * n_communities + targets[keep]
+    votes = wiki_df['VOT'].to_numpy()[keep]
+
+    size = n_communities * n_communities
+    totals = np.bincount(cells, minlength=size)
+    matrices = {'Total': totals.reshape(n_communities, n_communities)}
+    for name, value in [('Positive', 1), ('Negative', -1), ('Neutral', 0)]:
+        counts = np.bincount(cells[votes == value], minlength=size)
+        percentages = np.divide(counts * 100, totals, out=np.zeros(size), where=totals > 0)
+        matrices[name] = percentages.reshape(n_communities, n_communities)
+    return matrices
+
+
+def community_agreement_matrix(agreement_df, labels, n_communities=None, column='Agreement Ratio', strict=False):
+    """
+    Computes the mean agreement between the members of every pair of communities, in one pass
+    over the pairs of users.
+
+    As in the Graph Analysis notebook, a pair of users counts for the communities i and j when
+    one of the two users is in i and one of them in j, so that a pair between i and j also
+    counts for (i, i) and (j, j). With strict=True, it only counts for (i, j) and (j, i).
+
+    Parameters:
+    - agreement_df (pandas DataFrame): Agreement DataFrame with columns 'USR1', 'USR2' and column.
+    - labels (pandas Series): Community of each user, indexed by username.
+    - n_communities (int, optional): Number of communities, by default the largest label + 1.
+    - column (str): Column averaged.
+    - strict (bool): Whether a pair only counts between the communities of its two users.
+
+    Returns:
+    - agreement (numpy.ndarray): k x k mean agreements, NaN for the pairs of communities
+      without any pair of users.
+    """
+    if n_communities is None:
+        n_communities = int(labels.max()) + 1 if len(labels) else 0
+    first = _label_codes(labels, agreement_df['USR1'])
+    second = _label_codes(labels, agreement_df['USR2'])
+    values = agreement_df[column].to_numpy(dtype=np.float64)
+
+    both = (first >= 0) & (second >= 0)
+    crossing = both & (first != second)
+    cells = [first[crossing] * n_communities + second[crossing], second[crossing] * n_communities + first[crossing]]
+    weights = [values[crossing], values[crossing]]
+    if strict:
+        same = both & (first == second)
+        cells.append(first[same] * (n_communities + 1))
+        weights.append(values[same])
+    else:
+        # (i, i) for every community i of one of the two users, once per pair
+        for own, other in [(first, second), (second, first)]:
+            keep = (own >= 0) & (own != other)
+            cells.append(own[keep] * (n_communities + 1))
+            weights.append(values[keep])
+        same = both & (first == second)
+        cells.append(first[same] * (n_communities + 1))
+        weights.append(values[same])
+
+    cells, weights = np.concatenate(cells), np.concatenate(weights)
+    valid = ~np.isnan(weights)
+    size = n_communities * n_communities
+    sums = np.bincount(cells[valid], weights=weights[valid], minlength=size)
+    counts = np.bincount(cells[valid], minlength=size)
+    return np.divide(sums, counts, out=np.full(size, np.nan), where=counts > 0).reshape(n_communities, n_communities)
@@ -0,0 +1,719 @@
+import os
+import re
+import nltk
+import numpy as np
+import pandas as pd
+import joblib
+import scipy.sparse as sp
+import spacy
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from nltk.sentiment import SentimentIntensityAnalyzer
+from sklearn.decomposition import LatentDirichletAllocation
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS, CountVectorizer, TfidfVectorizer
+from textblob import TextBlob
+
+# Own directory, apart from the Parquet files of PipelineCache that its eviction deletes
+SENTIMENT_CACHE_DIR = './data/cache/sentiment'
+SENTIMENT_CHUNKSIZE = 2000
+# Fields of each sentiment analyzer, in the order of their columns
+SENTIMENT_FIELDS = {
+    'vader': ['neg', 'neu', 'pos', 'compound'],
+    'textblob': ['polarity', 'subjectivity'],
+}
+SPACY_MODEL = 'en_core_web_sm'
+# The lemmatizer only needs the tagger and the attribute ruler
+SPACY_DISABLED = ['parser', 'ner']
+LEMMATIZE_BATCH_SIZE = 1000
+EXTRA_STOPWORDS = ['hi', 'im']
+TOPIC_MODEL_PATH = './data/models/topics.joblib'
+# Settings of the TF-IDF vectorizer and of the LDA of the NLP notebook
+TFIDF_PARAMS = {'max_df': 0.95, 'min_df': 2, 'max_features': 1000, 'stop_words': 'english'}
+TOPIC_BATCH_SIZE = 512
+# Tokens of the CountVectorizer of the n-gram analysis
+NGRAM_TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+NGRAM_BATCH_SIZE = 10000
+NGRAM_MODES = ('exact', 'countmin', 'topk')
+# Custom Empath categories of the comments, and the score below which a comment is 'other'
+COMMENT_CATEGORIES = ['hardskills', 'softskills', 'friendship', 'experience', 'negative_sentiment']
+CATEGORY_THRESHOLD = 0.1
+
+# One analyzer per process, created on first use
+_sia = None
+_stopwords = None
+
+
+def _vader_scores(texts):
+    """
+    Returns the VADER negative, neutral, positive and compound scores of the texts.
+    """
+    global _sia
+    if _sia is None:
+        _sia = SentimentIntensityAnalyzer()
+    scores = np.empty((len(texts), 4), dtype=np.float32)
+    for i, text in enumerate(texts):
+        score = _sia.polarity_scores(text)
+        scores[i] = score['neg'], score['neu'], score['pos'], score['compound']
+    return scores
+
+
+def _textblob_scores(texts):
+    """
+    Returns the TextBlob polarity and subjectivity of the texts, from one parse of each text.
+    """
+    scores = np.empty((len(texts), 2), dtype=np.float32)
+    for i, text in enumerate(texts):
+        sentiment = TextBlob(text).sentiment
+        scores[i] = sentiment.polarity, sentiment.subjectivity
+    return scores
+
+
+SENTIMENT_SCORERS = {'vader': _vader_scores, 'textblob': _textblob_scores}
+
+
+def text_hashes(texts):
+    """
+    Returns a 64-bit hash of each text, the same from one run to the next.
+    """
+    return pd.util.hash_array(np.asarray(texts, dtype=object), categorize=False)
+
+
+def _score_texts(scorer, texts, workers, chunksize):
+    """
+    Scores the texts with one of SENTIMENT_SCORERS, in chunks spread over a process pool.
+    """
+    chunks = [texts[start:start + chunksize] for start in range(0, len(texts), chunksize)]
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return np.concatenate(list(executor.map(scorer, chunks)))
+    return np.concatenate([scorer(chunk) for chunk in chunks])
+
+
+def sentiment_scores(texts, analyzers=('vader', 'textblob'), workers=1, chunksize=SENTIMENT_CHUNKSIZE,
+                     cache_dir=SENTIMENT_CACHE_DIR):
+    """
+    Computes the sentiment scores of the texts (e.g. the cleaned comments of wiki_df): the
+    VADER scores of sia.polarity_scores and the TextBlob polarity and subjectivity.
+
+    Each distinct text is scored once, and only if its scores are not already in the cache:
+    the scores are kept in one Parquet file per analyzer in cache_dir, keyed by a hash of the
+    text, so that a rerun only scores the new comments.
+
+    Parameters:
+    - texts (pandas Series): Texts to score, whose missing values get NaN scores.
+    - analyzers (tuple of str): 'vader' for the 'neg', 'neu', 'pos' and 'compound' columns,
+      'textblob' for the 'polarity' and 'subjectivity' columns.
+    - workers (int, optional): Number of worker processes the texts are scored in, None for
+      one per CPU.
+    - chunksize (int): Number of texts sent to a worker at a time.
+    - cache_dir (str, optional): Directory of the score cache, None to disable it.
+
+    Returns:
+    - scores_df (pandas DataFrame): float32 score columns, with the index of texts.
+    """
+    if workers is None:
+        workers = os.cpu_count()
+    codes, unique_texts = pd.factorize(texts.astype(str).where(texts.notna()))
+    unique_texts = np.asarray(unique_texts, dtype=object)
+    hashes = text_hashes(unique_texts)
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+
+    columns = {}
+    for analyzer in analyzers:
+        fields = SENTIMENT_FIELDS[analyzer]
+        scores = np.full((len(unique_texts), len(fields)), np.nan, dtype=np.float32)
+
+        cache_path = os.path.join(cache_dir, f'sentiment_{analyzer}.parquet') if cache_dir is not None else None
+        cached = pd.read_parquet(cache_path) if cache_path and os.path.exists(cache_path) else None
+        if cached is not None:
+            positions = pd.Index(cached['HASH'].to_numpy()).get_indexer(hashes)
+            known = positions >= 0
+            scores[known] = cached[fields].to_numpy(dtype=np.float32)[positions[known]]
+            missing = np.flatnonzero(~known)
+        else:
+            missing = np.arange(len(unique_texts))
+
+        if len(missing):
+            scores[missing] = _score_texts(SENTIMENT_SCORERS[analyzer], unique_texts[missing].tolist(),
+                                           workers, chunksize)
+            if cache_path:
+                new = pd.DataFrame(scores[missing], columns=fields)
+                new.insert(0, 'HASH', hashes[missing])
+                pd.concat([cached, new], ignore_index=True).to_parquet(cache_path)
+
+        # the code -1 of the missing texts picks the last row, of NaN
+        scores = np.vstack([scores, np.full((1, len(fields)), np.nan, dtype=np.float32)])
+        for i, field in enumerate(fields):
+            columns[field] = scores[codes, i]
+
+    return pd.DataFrame(columns, index=texts.index)
+
+
+def stopword_set():
+    """
+    Returns the frozen set of the words removed by process_stop_word in the NLP notebook: the
+    nltk English stopwords and EXTRA_STOPWORDS. The set is built on the first call.
+    """
+    global _stopwords
+    if _stopwords is None:
+        _stopwords = frozenset(nltk.corpus.stopwords.words('english')) | frozenset(EXTRA_STOPWORDS)
+    return _stopwords
+
+
+def load_lemmatizer(model=SPACY_MODEL):
+    """
+    Loads the spaCy pipeline used by iter_lemmatized, without the components it does not need.
+    """
+    return spacy.load(model, disable=SPACY_DISABLED)
+
+
+def iter_lemmatized(texts, nlp=None, batch_size=LEMMATIZE_BATCH_SIZE, n_process=1, stopwords=None):
+    """
+    Lemmatizes texts as preprocess_text followed by process_stop_word in the NLP notebook: the
+    lemmas of the alphabetic tokens that are not spaCy stop words, without the nltk stopwords.
+
+    The texts are streamed through nlp.pipe and the results are yielded one at a time, so that
+    only one batch of spaCy Docs is held in memory.
+
+    Parameters:
+    - texts (iterable of str): Texts to lemmatize, e.g. the cleaned comments.
+    - nlp (spacy Language, optional): Pipeline, by default load_lemmatizer().
+    - batch_size (int): Number of texts per nlp.pipe batch.
+    - n_process (int): Number of processes of nlp.pipe.
+    - stopwords (set, optional): Words removed after lemmatization, by default stopword_set().
+
+    Returns:
+    - lemmatized (generator of str): The lemmatized text of each text, in order.
+    """
+    if nlp is None:
+        nlp = load_lemmatizer()
+    if stopwords is None:
+        stopwords = stopword_set()
+
+    for doc in nlp.pipe(texts, batch_size=batch_size, n_process=n_process):
+        yield ' '.join(word for token in doc if token.is_alpha and not token.is_stop
+                       for word in token.lemma_.split() if word not in stopwords)
+
+
+def lemmatize_batch(texts, nlp=None, batch_size=LEMMATIZE_BATCH_SIZE, n_process=1, stopwords=None):
+    """
+    Lemmatizes a whole Series with iter_lemmatized, processing each distinct text only once.
+
+    Parameters:
+    - texts (pandas Series): Texts to lemmatize.
+    - nlp, batch_size, n_process, stopwords: See iter_lemmatized.
+
+    Returns:
+    - lemmatized_texts (pandas Series): Lemmatized texts, with the same index.
+    """
+    unique_texts = pd.unique(texts)
+    lemmatized = iter_lemmatized(unique_texts.tolist(), nlp, batch_size, n_process, stopwords)
+    return texts.map(dict(zip(unique_texts, lemmatized)))
+
+
+class TopicModel:
+    """
+    TF-IDF vectorizer and LDA topic model fitted once on the whole corpus, so that the topics
+    of any subset of the comments (e.g. the positive or the negative ones) are read from the
+    same model instead of refitting a vectorizer and an LDA per subset.
+
+    The LDA is fitted with online variational Bayes over mini-batches of documents, so that
+    new comments can be added with partial_fit. The documents are assigned to topics with one
+    batched transform call. The fitted vectorizer and model are saved and loaded together.
+
+    Usage:
+    - topic_model = TopicModel(n_topics=25).fit(df_subjectiv['preprocessed_txt'])
+    - df_subjectiv['Topic'] = topic_model.assign(df_subjectiv['preprocessed_txt'])
+    - topic_model.print_top_words()
+    - topic_model.topic_prevalence(df_subjectiv['preprocessed_txt'], df_subjectiv['polarity'] > 0.5)
+    - topic_model.save(); topic_model = TopicModel.load()
+    """
+
+    def __init__(self, n_topics=25, random_state=42, batch_size=TOPIC_BATCH_SIZE, epochs=10, n_jobs=None,
+                 **tfidf_params):
+        """
+        Parameters:
+        - n_topics (int): Number of topics.
+        - random_state (int): Seed of the LDA.
+        - batch_size (int): Number of documents per online update.
+        - epochs (int): Number of passes over the documents in fit.
+        - n_jobs (int, optional): Number of jobs of the LDA transform, -1 for one per CPU.
+        - tfidf_params: Parameters of the TfidfVectorizer overriding those of TFIDF_PARAMS.
+        """
+        self.batch_size = batch_size
+        self.epochs = epochs
+        self.vectorizer = TfidfVectorizer(**{**TFIDF_PARAMS, **tfidf_params})
+        self.lda = LatentDirichletAllocation(n_components=n_topics, learning_method='online',
+                                             batch_size=batch_size, random_state=random_state, n_jobs=n_jobs)
+
+    def _matrix(self, texts):
+        """
+        Returns the document-term matrix of texts, which may already be a matrix of the vectorizer.
+        """
+        return texts if sp.issparse(texts) else self.vectorizer.transform(texts)
+
+    def fit(self, texts):
+        """
+        Fits the vectorizer and the topic model on the texts.
+
+        Parameters:
+        - texts (iterable of str): Preprocessed texts, e.g. the 'preprocessed_txt' column.
+
+        Returns:
+        - self (TopicModel)
+        """
+        dtm = self.vectorizer.fit_transform(texts)
+        self.lda.set_params(total_samples=dtm.shape[0])
+        for _ in range(self.epochs):
+            for start in range(0, dtm.shape[0], self.batch_size):
+                self.lda.partial_fit(dtm[start:start + self.batch_size])
+        return self
+
+    def partial_fit(self, texts):
+        """
+        Updates the topic model with new texts, keeping the vocabulary of the vectorizer.
+        """
+        dtm = self._matrix(texts)
+        for start in range(0, dtm.shape[0], self.batch_size):
+            self.lda.partial_fit(dtm[start:start + self.batch_size])
+        return self
+
+    def transform(self, texts):
+        """
+        Returns the topic distribution of each text (or row of a document-term matrix), as a
+        (n_texts, n_topics) array.
+        """
+        return self.lda.transform(self._matrix(texts))
+
+    def assign(self, texts):
+        """
+        Returns the most likely topic of each text, as lda.transform(dtm[i]).argmax() in the
+        NLP notebook, in one call.
+        """
+        return self.transform(texts).argmax(axis=1)
+
+    def top_words(self, n_words=10):
+        """
+        Returns the n_words heaviest words of each topic.
+        """
+        feature_names = self.vectorizer.get_feature_names_out()
+        return [feature_names[topic.argsort()[:-n_words - 1:-1]].tolist() for topic in self.lda.components_]
+
+    def print_top_words(self, n_words=10, topics=None):
+        """
+        Prints the n_words heaviest words of each topic (or of the given topics).
+        """
+        top_words = self.top_words(n_words)
+        for topic_idx in (range(len(top_words)) if topics is None else topics):
+            print(f"Topic #{topic_idx + 1}: {' | '.join(top_words[topic_idx])}")
+
+    def topic_prevalence(self, texts, mask=None):
+        """
+        Returns the mean topic distribution of the texts selected by mask (e.g. the positive
+        comments), projected on the topics of the whole corpus.
+
+        Parameters:
+        - texts (iterable of str or sparse matrix): Texts or their document-term matrix.
+        - mask (array-like of bool, optional): Selected texts, by default all of them.
+
+        Returns:
+        - prevalence (pandas Series): Mean weight of each topic, sorted by decreasing weight.
+        """
+        doc_topics = self.transform(texts)
+        if mask is not None:
+            doc_topics = doc_topics[np.asarray(mask)]
+        return pd.Series(doc_topics.mean(axis=0), name='Prevalence').sort_values(ascending=False)
+
+    def save(self, path=TOPIC_MODEL_PATH):
+        """
+        Saves the fitted vectorizer and topic model.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path=TOPIC_MODEL_PATH):
+        """
+        Loads a TopicModel saved with save().
+        """
+        return joblib.load(path)
+
+
+def _mix64(values):
+    """
+    splitmix64 finalizer: spreads the bits of 64-bit keys, for the count-min hash functions.
+    """
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class _NGramState:
+    """
+    Counts of the n-grams of one bucket: exact counts, or a count-min sketch and, in 'topk'
+    mode, the n-grams with the largest estimated counts.
+    """
+
+    def __init__(self, mode, max_n, width, depth, k):
+        self.mode = mode
+        self.k = k
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.grams = np.zeros((0, max_n), dtype=np.int32)
+        if mode != 'exact':
+            self.sketch = np.zeros((depth, width), dtype=np.int64)
+            self.shift = np.uint64(64 - int(np.log2(width)))
+            self.multipliers = (np.random.default_rng(0).integers(1, 2 ** 63, depth, dtype=np.uint64) << np.uint64(1)) \
+                | np.uint64(1)
+
+    def _slots(self, keys):
+        return (keys[None, :] * self.multipliers[:, None]) >> self.shift
+
+    def estimate(self, keys):
+        """
+        Returns the counts of the n-gram keys, estimated by the sketch unless mode is 'exact'.
+        """
+        if self.mode == 'exact':
+            if not len(self.keys):
+                return np.zeros(len(keys), dtype=np.int64)
+            positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            return np.where(self.keys[positions] == keys, self.counts[positions], 0)
+        slots = self._slots(keys)
+        return self.sketch[np.arange(len(self.sketch))[:, None], slots].min(axis=0)
+
+    def update(self, keys, counts, grams):
+        """
+        Adds the counts of distinct n-gram keys.
+        """
+        if self.mode != 'exact':
+            slots = self._slots(keys)
+            for row in range(len(self.sketch)):
+                np.add.at(self.sketch[row], slots[row], counts)
+            if self.mode == 'countmin':
+                return
+
+        keys = np.concatenate([self.keys, keys])
+        grams = np.concatenate([self.grams, grams])
+        keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        grams = grams[first]
+        if self.mode == 'exact':
+            counts = np.bincount(inverse.ravel(), weights=np.concatenate([self.counts, counts]),
+                                 minlength=len(keys)).astype(np.int64)
+        else:
+            counts = self.estimate(keys)
+            top = np.sort(np.argsort(-counts, kind='stable')[:self.k])
+            keys, counts, grams = keys[top], counts[top], grams[top]
+        self.keys, self.counts, self.grams = keys, counts, grams
+
+
+class NGramCounter:
+    """
+    Streaming counter of the n-grams of the comments, e.g. for the 2- to 5-gram analysis of the
+    NLP notebook on the whole corpus.
+
+    The comments are tokenized as by CountVectorizer(stop_words='english') and the n-grams of
+    each comment (never spanning two comments) are hashed into 64-bit integer keys, counted by
+    batch of comments. Each comment can go to a bucket (e.g. its polarity), counted separately
+    in the same pass. The counts are either:
+    - 'exact': one count per distinct n-gram,
+    - 'countmin': estimated by a count-min sketch of depth x width counters, whose memory does
+      not depend on the corpus, supporting count() only,
+    - 'topk': the count-min sketch and the k n-grams with the largest estimated counts, for
+      most_common().
+
+    Usage:
+    - counter = NGramCounter(n_range=(2, 5))
+    - counter.update(df['preprocessed_txt'], buckets=np.where(df['polarity'] > 0.5, 'positive', 'other'))
+    - counter.most_common(20, n=2, prefix='need')                  # the df_2gram_occurrence table
+    - counter.most_common(20, n=3, bucket='positive')
+    - counter.count(['lack experience', 'great editor'])
+    """
+
+    def __init__(self, n_range=(2, 5), mode='exact', stop_words='english', width=2 ** 22, depth=4, k=10000):
+        """
+        Parameters:
+        - n_range (tuple): Smallest and largest n-gram lengths.
+        - mode (str): 'exact', 'countmin' or 'topk'.
+        - stop_words (str or set, optional): Tokens removed before forming the n-grams, 'english'
+          for the stop words of CountVectorizer.
+        - width (int): Counters per row of the count-min sketch, a power of 2.
+        - depth (int): Rows of the count-min sketch.
+        - k (int): Number of n-grams kept per bucket in 'topk' mode.
+        """
+        if mode not in NGRAM_MODES:
+            raise ValueError(f'Unknown mode {mode!r}, expected one of {NGRAM_MODES}')
+        if width & (width - 1):
+            raise ValueError('The width of the count-min sketch must be a power of 2')
+        self.n_range = n_range
+        self.mode = mode
+        self.stop_words = ENGLISH_STOP_WORDS if stop_words == 'english' else frozenset(stop_words or ())
+        self.width, self.depth, self.k = width, depth, k
+        self.vocabulary = {}
+        self.tokens = []
+        self.states = {}
+
+    def _token_ids(self, text, add=True):
+        ids = []
+        for token in NGRAM_TOKEN_PATTERN.findall(text.lower()):
+            if token not in self.stop_words:
+                token_id = self.vocabulary.get(token)
+                if token_id is None:
+                    if not add:
+                        token_id = -1
+                    else:
+                        token_id = self.vocabulary[token] = len(self.tokens)
+                        self.tokens.append(token)
+                ids.append(token_id)
+        return ids
+
+    def _keys(self, ids, n):
+        """
+        Returns the keys of the n-grams of the token ids starting at each position.
+        """
+        keys = np.zeros(len(ids) - n + 1, dtype=np.uint64)
+        for j in range(n):
+            keys = keys * np.uint64(1000003) + ids[j:len(ids) - n + 1 + j].astype(np.uint64)
+        return _mix64(keys + np.uint64(n * 0x9E3779B97F4A7C15 % 2 ** 64))
+
+    def _state(self, bucket):
+        if bucket not in self.states:
+            self.states[bucket] = _NGramState(self.mode, self.n_range[1], self.width, self.depth, self.k)
+        return self.states[bucket]
+
+    def update(self, texts, buckets=None, batch_size=NGRAM_BATCH_SIZE):
+        """
+        Counts the n-grams of the texts.
+
+        Parameters:
+        - texts (iterable of str): Comments, e.g. the 'preprocessed_txt' column. Missing comments
+          (None or NaN) are skipped along with their bucket.
+        - buckets (iterable, optional): Bucket of each comment (e.g. 'positive', 'negative'),
+          by default all the comments go to the bucket None.
+        - batch_size (int): Number of comments counted at a time.
+
+        Returns:
+        - self (NGramCounter)
+        """
+        pairs = zip(texts, buckets if buckets is not None else repeat(None))
+        max_n = self.n_range[1]
+        while True:
+            chunk = list(islice(pairs, batch_size))
+            if not chunk:
+                return self
+            chunk = [(text, bucket) for text, bucket in chunk if isinstance(text, str)]
+            if not chunk:
+                continue
+            batch = [text for text, _ in chunk]
+            batch_buckets = [bucket for _, bucket in chunk]
+
+            token_ids = [self._token_ids(text) for text in batch]
+            ids = np.array([token_id for text_ids in token_ids for token_id in text_ids], dtype=np.int64)
+            lengths = np.array([len(text_ids) for text_ids in token_ids], dtype=np.int64)
+            comments = np.repeat(np.arange(len(batch)), lengths)
+            padded = np.concatenate([ids, np.full(max_n, -1, dtype=np.int64)])
+            bucket_names = list(dict.fromkeys(batch_buckets))
+            bucket_codes = np.array([bucket_names.index(bucket) for bucket in batch_buckets]) \
+                if len(bucket_names) > 1 else np.zeros(len(batch), dtype=np.int64)
+
+            for n in range(self.n_range[0], max_n + 1):
+                if len(ids) < n:
+                    continue
+                starts = np.flatnonzero(comments[:len(ids) - n + 1] == comments[n - 1:])
+                keys = self._keys(ids, n)[starts]
+                grams = np.stack([padded[starts + j] if j < n else np.full(len(starts), -1)
+                                  for j in range(max_n)], axis=1).astype(np.int32)
+                gram_buckets = bucket_codes[comments[starts]]
+                for code, bucket in enumerate(bucket_names):
+                    selected = gram_buckets == code
+                    unique_keys, first, counts = np.unique(keys[selected], return_index=True, return_counts=True)
+                    self._state(bucket).update(unique_keys, counts, grams[selected][first])
+
+    def _merged(self, bucket):
+        """
+        Returns the (keys, counts, grams) of a bucket, or of all the buckets when bucket is None
+        and the comments were split into buckets.
+        """
+        if bucket is not None or list(self.states) == [None]:
+            state = self.states.get(bucket)
+            if state is None:
+                return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64), np.zeros((0, self.n_range[1]),
+                                                                                           dtype=np.int32)
+            return state.keys, state.counts, state.grams
+
+        keys = np.concatenate([state.keys for state in self.states.values()])
+        grams = np.concatenate([state.grams for state in self.states.values()])
+        keys, first = np.unique(keys, return_index=True)
+        return keys, self.count_keys(keys), grams[first]
+
+    def count_keys(self, keys, bucket=None):
+        """
+        Returns the counts of n-gram keys in a bucket, or in all the buckets when bucket is None.
+        """
+        states = [self.states[bucket]] if bucket in self.states else \
+            (list(self.states.values()) if bucket is None else [])
+        return sum((state.estimate(keys) for state in states), np.zeros(len(keys), dtype=np.int64))
+
+    def count(self, ngrams, bucket=None):
+        """
+        Returns the counts of the given n-grams (e.g. 'lack experience'), estimated by the sketch
+        unless mode is 'exact'.
+        """
+        counts = []
+        for ngram in ngrams:
+            ids = np.array(self._token_ids(ngram, add=False), dtype=np.int64)
+            if not len(ids) or (ids < 0).any():
+                counts.append(0)
+            else:
+                counts.append(int(self.count_keys(self._keys(ids, len(ids)), bucket)[0]))
+        return pd.Series(counts, index=list(ngrams), name='Count')
+
+    def _prefix_mask(self, grams, prefix, whole_word):
+        """
+        Returns whether each n-gram starts with the prefix as a string (so that 'need' also
+        matches 'needs admin'), or with the words of the prefix when whole_word is True.
+        """
+        first_word = prefix.split(' ', 1)[0]
+        tokens = np.array(self.tokens, dtype=str)
+        first_matches = tokens == first_word if whole_word or ' ' in prefix else np.char.startswith(tokens, first_word)
+        mask = np.append(first_matches, False)[grams[:, 0]]
+        if ' ' in prefix:
+            object_tokens = np.array(self.tokens + [''], dtype=object)
+            for row in np.flatnonzero(mask):
+                ngram = ' '.join(object_tokens[grams[row][grams[row] >= 0]])
+                mask[row] = (ngram + ' ').startswith(prefix + ' ') if whole_word else ngram.startswith(prefix)
+        return mask
+
+    def most_common(self, n_items=20, n=None, bucket=None, prefix=None, whole_word=False):
+        """
+        Returns the most frequent n-grams, in 'exact' and 'topk' modes.
+
+        Parameters:
+        - n_items (int): Number of n-grams returned.
+        - n (int, optional): Only the n-grams of this length.
+        - bucket (optional): Only the comments of this bucket, by default all of them.
+        - prefix (str, optional): Only the n-grams starting with this string, e.g. 'need' as
+          feature_name.startswith('need') in the NLP notebook, which also keeps 'needs ...'.
+        - whole_word (bool): Whether the prefix must instead be whole words, so that 'need'
+          only keeps the n-grams whose first word is 'need'.
+
+        Returns:
+        - df_ngram_occurrence (pandas DataFrame): Columns 'N-gram' and 'Count', by decreasing count.
+        """
+        if self.mode == 'countmin':
+            raise ValueError("A count-min sketch only counts given n-grams, use mode='topk' for most_common")
+        keys, counts, grams = self._merged(bucket)
+        keep = np.ones(len(keys), dtype=bool)
+        if n is not None:
+            keep &= (grams >= 0).sum(axis=1) == n
+        if prefix is not None:
+            keep &= self._prefix_mask(grams, prefix, whole_word)
+        keys, counts, grams = keys[keep], counts[keep], grams[keep]
+
+        top = np.lexsort((keys, -counts))[:n_items]
+        tokens = np.array(self.tokens + [''], dtype=object)
+        return pd.DataFrame({
+            'N-gram': [' '.join(tokens[gram[gram >= 0]]) for gram in grams[top]],
+            'Count': counts[top],
+        })
+
+
+class LexiconCategorizer:
+    """
+    Scores whole corpora against lexicon categories (e.g. the custom Empath categories of the
+    NLP notebook) with one sparse product: the categories are compiled once into a binary
+    term x category matrix, multiplied by the document x term count matrix of the comments.
+
+    The scores are those of lexicon.analyze(comment, categories, normalize=True): the number of
+    whitespace-separated tokens of the comment in each category, divided by its number of
+    tokens. A comment gets the category with the highest score (the first one in case of a
+    tie, as max() over the analyze dict), or 'other' when that score is below the threshold.
+
+    Usage:
+    - categorizer = LexiconCategorizer(lexicon)                  # after lexicon.create_category(...)
+    - df_subjectiv['Category'] = categorizer.categorize(df_subjectiv['CLE'])
+    - scores_df = categorizer.scores(df_subjectiv['CLE'])
+    """
+
+    def __init__(self, lexicon, categories=COMMENT_CATEGORIES, threshold=CATEGORY_THRESHOLD, other='other'):
+        """
+        Parameters:
+        - lexicon (Empath or dict): Empath lexicon, or dict category -> list of terms.
+        - categories (list of str): Categories scored, in order of priority for the ties.
+        - threshold (float): Score below which a comment is categorized as other.
+        - other (str): Category of the comments without a significant score.
+        """
+        terms_by_category = lexicon.cats if hasattr(lexicon, 'cats') else lexicon
+        self.categories = list(categories)
+        self.threshold = threshold
+        self.other = other
+
+        category_terms = [set(terms_by_category[category]) for category in self.categories]
+        self.terms = sorted(set().union(*category_terms))
+        term_positions = {term: i for i, term in enumerate(self.terms)}
+        rows = [term_positions[term] for terms in category_terms for term in terms]
+        cols = np.repeat(np.arange(len(category_terms)), [len(terms) for terms in category_terms])
+        self.matrix = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(self.terms), len(self.categories)))
+        self.vectorizer = CountVectorizer(tokenizer=str.split, token_pattern=None, lowercase=False,
+                                          vocabulary=self.terms)
+
+    def term_matrix(self, feature_names):
+        """
+        Returns the term x category matrix on another vocabulary, e.g. the feature names of the
+        vectorizer of a TopicModel, the terms not in any category having empty rows.
+        """
+        positions = pd.Index(self.terms).get_indexer(feature_names)
+        known = np.flatnonzero(positions >= 0)
+        selection = sp.csr_matrix((np.ones(len(known)), (known, positions[known])),
+                                  shape=(len(feature_names), len(self.terms)))
+        return selection @ self.matrix
+
+    def scores(self, texts=None, dtm=None, feature_names=None):
+        """
+        Computes the normalized category scores of every comment.
+
+        Parameters:
+        - texts (pandas Series): Comments, scored exactly as lexicon.analyze does.
+        - dtm (sparse matrix, optional): Instead of texts, an existing document x term count
+          matrix (e.g. of a CountVectorizer), with its feature_names. Its tokenization replaces
+          the whitespace split of analyze and its row sums are used as the numbers of tokens.
+
+        Returns:
+        - scores_df (pandas DataFrame): One column per category, NaN for the comments without
+          tokens, with the index of texts.
+        """
+        if dtm is None:
+            counts = self.vectorizer.transform(texts) @ self.matrix
+            n_tokens = texts.str.split().str.len().to_numpy(dtype=np.float64)
+            index = texts.index
+        else:
+            counts = dtm @ self.term_matrix(feature_names)
+            n_tokens = np.asarray(dtm.sum(axis=1), dtype=np.float64).ravel()
+            index = None
+
+        counts = np.asarray(sp.csr_matrix(counts).toarray(), dtype=np.float64)
+        scores = np.divide(counts, n_tokens[:, None], out=np.full(counts.shape, np.nan),
+                           where=n_tokens[:, None] > 0)
+        return pd.DataFrame(scores, columns=self.categories, index=index)
+
+    def categorize(self, texts=None, dtm=None, feature_names=None):
+        """
+        Returns the category of every comment, as categorize_comment in the NLP notebook.
+
+        Parameters:
+        - texts, dtm, feature_names: See scores.
+
+        Returns:
+        - categories (pandas Series): Category of each comment, other when its highest score
+          is below the threshold or when it has no tokens.
+        """
+        scores = self.scores(texts, dtm, feature_names)
+        values = scores.to_numpy()
+        best = np.argmax(np.nan_to_num(values, nan=-1.0), axis=1)
+        best_scores = values[np.arange(len(values)), best]
+        categories = np.array(self.categories + [self.other], dtype=object)
+        significant = best_scores >= self.threshold
+        return pd.Series(categories[np.where(significant, best, len(self.categories))], index=scores.index,
+                         name='Category')
@@ -0,0 +1,178 @@
+import hashlib
+import inspect
+import json
+import os
+import re
+import pandas as pd
+
+CACHE_DIR = './data/cache'
+MAX_CACHE_BYTES = 2 * 1024 ** 3
+# Default repr of the objects, e.g. '<modules.data_processing.UserRegistry object at 0x7f...>'
+ADDRESS_REPR_PATTERN = re.compile(r' at 0x[0-9a-fA-F]+>')
+
+
+class PipelineCache:
+    """
+    Content-addressed on-disk cache for the preprocessing stages of the notebooks
+    (extract_data, process_dataframe, create_*_df, remove_wiki_markup_batch, ...).
+
+    The output of a stage is stored as a Parquet file named after a hash of:
+    - the source of the module defining the stage, so that editing the stage or any helper
+      it calls invalidates its results,
+    - the content of its inputs: files are hashed by content (the digest is remembered for
+      a given size and modification time), DataFrames and Series by their values,
+    - its other parameters.
+
+    When the files in the cache take more than max_bytes, the least recently used ones
+    are deleted.
+
+    On a hit the stage does not run, so none of its side effects happen: with inplace=True
+    the DataFrame passed is left unchanged (use the returned one instead), and stages filling
+    a registry= cannot be cached, objects without a stable repr such as a UserRegistry being
+    rejected as arguments with a TypeError.
+
+    Usage:
+    - cache = PipelineCache()
+    - wiki_df = cache.run(extract_data, DATA_PATH)
+    - wiki_df = cache.run(process_dataframe, wiki_df, inplace=True)
+    - elections_df = cache.run(create_elections_df, wiki_df)
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._digests_path = os.path.join(cache_dir, 'file_digests.json')
+        if os.path.exists(self._digests_path):
+            with open(self._digests_path, encoding='utf-8') as digests_file:
+                self._file_digests = json.load(digests_file)
+        else:
+            self._file_digests = {}
+
+    def _file_digest(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        known = self._file_digests.get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        digest = hashlib.sha1()
+        with open(path, 'rb') as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b''):
+                digest.update(block)
+
+        self._file_digests[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        with open(self._digests_path, 'w', encoding='utf-8') as digests_file:
+            json.dump(self._file_digests, digests_file)
+        return digest.hexdigest()
+
+    def _fingerprint(self, value):
+        """
+        Returns a string identifying the content of a stage argument.
+        """
+        if isinstance(value, str) and os.path.isfile(value):
+            return 'file:' + self._file_digest(value)
+
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            frame = value.to_frame() if isinstance(value, pd.Series) else value
+            digest = hashlib.sha1(repr(list(zip(frame.columns, frame.dtypes.astype(str)))).encode())
+            digest.update(pd.util.hash_pandas_object(frame.index).to_numpy().tobytes())
+            for column in frame.columns:
+                try:
+                    hashed = pd.util.hash_pandas_object(frame[column], index=False)
+                except TypeError:
+                    # e.g. the arrays of 'Active Years'
+                    hashed = pd.util.hash_pandas_object(frame[column].astype(str), index=False)
+                digest.update(hashed.to_numpy().tobytes())
+            return 'frame:' + digest.hexdigest()
+
+        text = repr(value)
+        if ADDRESS_REPR_PATTERN.search(text):
+            raise TypeError(f'Cannot cache a stage taking {type(value).__name__} arguments, whose repr '
+                            f'changes from one run to the next')
+        return 'value:' + text
+
+    def key(self, func, *args, **kwargs):
+        """
+        Returns the cache key of func(*args, **kwargs).
+        """
+        try:
+            source = inspect.getsource(inspect.getmodule(func))
+        except (OSError, TypeError):
+            # functions defined in a notebook
+            source = inspect.getsource(func)
+
+        digest = hashlib.sha1(f'{func.__module__}.{func.__qualname__}'.encode())
+        digest.update(source.encode())
+        for arg in args:
+            digest.update(self._fingerprint(arg).encode())
+        for name in sorted(kwargs):
+            digest.update(f'{name}={self._fingerprint(kwargs[name])}'.encode())
+        return digest.hexdigest()
+
+    def run(self, func, *args, inplace=False, **kwargs):
+        """
+        Returns func(*args, **kwargs), loaded from the cache when available.
+
+        Parameters:
+        - func (function): Stage returning a DataFrame or a Series.
+        - args, kwargs: Arguments of the stage.
+        - inplace (bool): Whether the stage modifies its first argument in place instead of
+          returning a result (e.g. process_dataframe). The modified DataFrame is then returned,
+          and on a hit it is the cached one while the argument is left unchanged.
+
+        Returns:
+        - result (pandas DataFrame or Series): The output of the stage.
+        """
+        key = self.key(func, *args, **kwargs)
+        path = os.path.join(self.cache_dir, f'{key}.parquet')
+
+        if os.path.exists(path):
+            os.utime(path)
+            result = pd.read_parquet(path)
+            if 'series_column' in result.attrs:
+                attrs, result = result.attrs, result[result.attrs['series_column']]
+                result.name = attrs['series_name']
+                result.attrs = {}
+            return result
+
+        result = func(*args, **kwargs)
+        if inplace:
+            result = args[0]
+        if not isinstance(result, (pd.DataFrame, pd.Series)):
+            raise TypeError(f'{func.__qualname__} must return a DataFrame or a Series to be cached')
+
+        if isinstance(result, pd.Series):
+            stored = result.to_frame(name='SERIES')
+            stored.attrs = {'series_column': 'SERIES', 'series_name': result.name}
+        else:
+            stored = result
+        stored.to_parquet(path)
+        self._evict()
+        return result
+
+    def _evict(self):
+        """
+        Deletes the least recently used results until the cache fits in max_bytes.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def clear(self):
+        """
+        Deletes every cached result.
+        """
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                os.remove(os.path.join(self.cache_dir, name))
@@ -0,0 +1,456 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from itertools import chain
+
+DEFAULT_BLOCK_SIZE = 2048
+DEFAULT_BLOCK_PAIRS = 5000000
+
+
+def incidence_matrix(users, items):
+    """
+    Builds the binary user x item incidence matrix from parallel arrays of (user, item) pairs,
+    e.g. the 'User' and 'Article' columns of talks_df. Repeated pairs count once.
+
+    Parameters:
+    - users (array-like): User of each pair.
+    - items (array-like): Item of each pair.
+
+    Returns:
+    - matrix (scipy.sparse.csr_matrix): Incidence matrix with one row per user.
+    - users (pandas Index): User of each row.
+    - items (pandas Index): Item of each column.
+    """
+    user_codes, users = pd.factorize(pd.Series(users, dtype=object))
+    item_codes, items = pd.factorize(pd.Series(items, dtype=object))
+    keep = (user_codes >= 0) & (item_codes >= 0)
+
+    matrix = sp.csr_matrix((np.ones(keep.sum(), dtype=np.int32), (user_codes[keep], item_codes[keep])),
+                           shape=(len(users), len(items)))
+    matrix.sum_duplicates()
+    matrix.data[:] = 1
+    return matrix, pd.Index(users), pd.Index(items)
+
+
+def sets_incidence_matrix(sets):
+    """
+    Builds the binary incidence matrix of a Series of sets, e.g. the 'Article' or 'Categories'
+    column of grouped_talks, with one row per set.
+
+    Returns:
+    - matrix (scipy.sparse.csr_matrix): Incidence matrix.
+    - items (pandas Index): Item of each column.
+    """
+    sets = list(sets)
+    lengths = np.fromiter(map(len, sets), dtype=np.int64, count=len(sets))
+    item_codes, items = pd.factorize(pd.Series(list(chain.from_iterable(sets)), dtype=object))
+
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    matrix = sp.csr_matrix((np.ones(len(item_codes), dtype=np.int32), item_codes, indptr),
+                           shape=(len(sets), len(items)))
+    return matrix, pd.Index(items)
+
+
+def _row_blocks(matrices, block_size, block_pairs):
+    """
+    Splits the rows into consecutive blocks of at most block_size rows, and of at most
+    block_pairs candidate pairs when possible, bounding the pairs of a row by the sum of the
+    degrees of its items.
+    """
+    n_rows = next(iter(matrices.values())).shape[0]
+    costs = np.zeros(n_rows)
+    for matrix in matrices.values():
+        degrees = np.asarray(matrix.sum(axis=0)).ravel()
+        costs += np.minimum(matrix @ degrees, n_rows)
+    cumulated = np.concatenate([[0], np.cumsum(costs)])
+
+    blocks = []
+    start = 0
+    while start < n_rows:
+        stop = np.searchsorted(cumulated, cumulated[start] + block_pairs, side='right') - 1
+        stop = min(max(stop, start + 1), start + block_size, n_rows)
+        blocks.append((start, stop))
+        start = stop
+    return blocks
+
+
+def _kth_largest(values, rows, n_rows, k):
+    """
+    Returns for each row the k-th largest of its values, 0 when it has fewer than k values.
+    """
+    kth = np.zeros(n_rows)
+    if not len(values):
+        return kth
+    order = np.lexsort((-values, rows))
+    rank = np.arange(len(order)) - np.searchsorted(rows[order], rows[order])
+    selected = order[rank == k - 1]
+    kth[rows[selected]] = values[selected]
+    return kth
+
+
+class _PairIntersections:
+    """
+    Intersections of the rows of one or several incidence matrices with the same rows.
+
+    The intersections of all the matrices come out of a single product, each one weighted by
+    a power of the largest possible intersection: the pattern of the product is the union of
+    the patterns and the intersections are decoded from its values.
+    """
+
+    def __init__(self, matrices):
+        self.matrices = {name: sp.csr_matrix(matrix, dtype=np.int64) for name, matrix in matrices.items()}
+        self.sizes = {name: np.asarray(matrix.sum(axis=1)).ravel() for name, matrix in self.matrices.items()}
+        self.n_rows = next(iter(self.matrices.values())).shape[0]
+
+        self.weights, self.bases = {}, {}
+        weight = 1
+        for name, size in self.sizes.items():
+            self.weights[name] = weight
+            self.bases[name] = int(size.max(initial=0)) + 1
+            weight *= self.bases[name]
+        if weight >= 2 ** 63:
+            raise ValueError('Too many items to compute the intersections of these matrices in one product')
+        self.weighted = sp.hstack([matrix * self.weights[name] for name, matrix in self.matrices.items()],
+                                  format='csr')
+        self.transposed = sp.hstack(list(self.matrices.values()), format='csr').T.tocsr()
+
+    def similarities(self, rows, cols, intersections):
+        """
+        Returns the dict name -> (intersections, jaccard similarities) of the pairs.
+        """
+        similarities = {}
+        for name, intersection in intersections.items():
+            unions = self.sizes[name][rows] + self.sizes[name][cols] - intersection
+            similarities[name] = (intersection,
+                                  np.divide(intersection, unions, out=np.zeros(len(rows)), where=unions > 0))
+        return similarities
+
+    def of_rows(self, row_index, upper, min_intersection=1):
+        """
+        Returns the pairs (rows, cols, similarities) of the given rows with every other row
+        sharing at least min_intersection items in one of the matrices, only with the rows
+        after them when upper is True.
+        """
+        product = (self.weighted[row_index] @ self.transposed).tocsr()
+        product.sort_indices()
+        product = product.tocoo()
+        rows, cols = np.asarray(row_index)[product.row], product.col
+        keep = cols > rows if upper else cols != rows
+        rows, cols, values = rows[keep], cols[keep], product.data[keep]
+
+        intersections = {name: values // self.weights[name] % self.bases[name] for name in self.matrices}
+        if min_intersection > 1:
+            keep = np.logical_or.reduce([intersection >= min_intersection for intersection in intersections.values()])
+            rows, cols = rows[keep], cols[keep]
+            intersections = {name: intersection[keep] for name, intersection in intersections.items()}
+        return rows, cols, self.similarities(rows, cols, intersections)
+
+    def of_pairs(self, rows, cols, chunk_size=1000000):
+        """
+        Returns the similarities of the given pairs of rows.
+        """
+        intersections = {}
+        for name, matrix in self.matrices.items():
+            intersections[name] = np.concatenate([np.zeros(0, dtype=np.int64)] + [
+                np.asarray(matrix[rows[start:start + chunk_size]].multiply(matrix[cols[start:start + chunk_size]])
+                           .sum(axis=1), dtype=np.int64).ravel()
+                for start in range(0, len(rows), chunk_size)])
+        return self.similarities(rows, cols, intersections)
+
+
+def iter_pair_similarities(matrices, block_size=DEFAULT_BLOCK_SIZE, block_pairs=DEFAULT_BLOCK_PAIRS,
+                           min_intersection=1, top_k=None, rank_by=None):
+    """
+    Streams the Jaccard similarities of the pairs of rows of one or several incidence matrices
+    with the same rows, computing the intersections as sparse products A[block] . A^T over
+    blocks of rows, so that only the pairs of one block are in memory at a time.
+
+    Only the pairs sharing at least min_intersection items in one of the matrices are kept:
+    the pairs sharing nothing, whose similarities are all 0, are never materialized.
+
+    Parameters:
+    - matrices (dict): Name -> binary incidence matrix (scipy sparse), all with the same rows.
+    - block_size (int): Maximum number of rows per block.
+    - block_pairs (int): Maximum number of candidate pairs per block, which bounds the memory
+      used (a single row may exceed it).
+    - min_intersection (int): Minimum number of shared items, in at least one of the matrices.
+    - top_k (int, optional): If given, a pair is only kept when it is among the top_k most
+      similar pairs of one of its two rows, according to the similarity of rank_by. This
+      needs a first pass over the blocks.
+    - rank_by (str, optional): Name of the matrix used by top_k, by default the first one.
+
+    Returns:
+    - block (tuple): (rows, cols, similarities) for each block, with rows < cols and
+      similarities a dict name -> (intersections, jaccard similarities).
+    """
+    if min_intersection < 1:
+        raise ValueError('min_intersection must be at least 1, the pairs sharing nothing are not enumerated')
+
+    intersections = _PairIntersections(matrices)
+    rank_by = rank_by or next(iter(matrices))
+    blocks = _row_blocks(intersections.matrices, block_size, block_pairs)
+
+    kth = None
+    if top_k is not None:
+        kth = np.zeros(intersections.n_rows)
+        for start, stop in blocks:
+            rows, _, similarities = intersections.of_rows(np.arange(start, stop), False, min_intersection)
+            kth[start:stop] = _kth_largest(similarities[rank_by][1], rows - start, stop - start, top_k)
+
+    for start, stop in blocks:
+        rows, cols, similarities = intersections.of_rows(np.arange(start, stop), True, min_intersection)
+        if kth is not None:
+            similarity = similarities[rank_by][1]
+            keep = (similarity >= kth[rows]) | (similarity >= kth[cols])
+            rows, cols = rows[keep], cols[keep]
+            similarities = {name: (intersection[keep], jaccard[keep])
+                            for name, (intersection, jaccard) in similarities.items()}
+        yield rows, cols, similarities
+
+
+def _talks_matrices(grouped_talks):
+    return {'Article': sets_incidence_matrix(grouped_talks['Article'])[0],
+            'Categories': sets_incidence_matrix(grouped_talks['Categories'])[0]}
+
+
+def _talks_similarity_frame(users, rows, cols, similarities):
+    return pd.DataFrame({
+        'User1': users[rows],
+        'User2': users[cols],
+        'Article Similarity': similarities['Article'][1],
+        'Categories Similarity': similarities['Categories'][1],
+        'Categories Intersection': similarities['Categories'][0],
+        'Articles Intersection': similarities['Article'][0],
+    })
+
+
+def jaccard_similarity(grouped_talks, user_column='User', block_size=DEFAULT_BLOCK_SIZE,
+                       block_pairs=DEFAULT_BLOCK_PAIRS, min_intersection=1, top_k=None):
+    """
+    Computes the Jaccard similarities of the talk pages (articles and categories) of every
+    pair of users, as the DataFrame built with itertools.combinations in the Graph Analysis
+    notebook, without the pairs that share neither an article nor a category.
+
+    Parameters:
+    - grouped_talks (pandas DataFrame): One row per user, with the set columns 'Article' and
+      'Categories'.
+    - user_column (str): Column identifying the users, e.g. 'User' or 'User_ID'.
+    - block_size, block_pairs, min_intersection, top_k: See iter_pair_similarities (top_k ranks by
+      'Article Similarity').
+
+    Returns:
+    - df_jaccard_similarity (pandas DataFrame): Columns 'User1', 'User2', 'Article Similarity',
+      'Categories Similarity', 'Categories Intersection' and 'Articles Intersection', with the
+      pairs in the order of the rows of grouped_talks.
+    """
+    users = grouped_talks[user_column].to_numpy()
+    blocks = iter_pair_similarities(_talks_matrices(grouped_talks), block_size, block_pairs,
+                                    min_intersection, top_k)
+    frames = [_talks_similarity_frame(users, rows, cols, similarities) for rows, cols, similarities in blocks]
+    return pd.concat(frames, ignore_index=True) if frames else \
+        _talks_similarity_frame(users, np.zeros(0, dtype=int), np.zeros(0, dtype=int),
+                                {'Article': (np.zeros(0), np.zeros(0)), 'Categories': (np.zeros(0), np.zeros(0))})
+
+
+# Approximate mode: MinHash signatures and LSH banding
+
+MINHASH_PRIME = (1 << 31) - 1
+# Largest LSH bucket whose pairs are generated, about 500k pairs: the users sharing a very
+# common item set (e.g. a single popular article) would otherwise give O(bucket^2) pairs
+DEFAULT_MAX_BUCKET_SIZE = 1000
+
+
+def minhash_signatures(matrix, n_hashes=128, seed=0):
+    """
+    Computes the MinHash signature of every row of a binary incidence matrix: for each of the
+    n_hashes random hash functions h(x) = (a * x + b) mod p of the item codes, the minimum
+    hash of the items of the row. Two rows agree on a hash with probability their Jaccard
+    similarity.
+
+    Parameters:
+    - matrix (scipy sparse matrix): Binary user x item incidence matrix.
+    - n_hashes (int): Length of the signatures.
+    - seed (int): Seed of the hash functions.
+
+    Returns:
+    - signatures (numpy.ndarray): uint32 array of shape (n_rows, n_hashes), MINHASH_PRIME for
+      the empty rows.
+    """
+    matrix = sp.csr_matrix(matrix)
+    matrix.sum_duplicates()
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MINHASH_PRIME, n_hashes, dtype=np.uint64)
+    b = rng.integers(0, MINHASH_PRIME, n_hashes, dtype=np.uint64)
+
+    n_rows = matrix.shape[0]
+    signatures = np.full((n_rows, n_hashes), MINHASH_PRIME, dtype=np.uint32)
+    non_empty = np.flatnonzero(np.diff(matrix.indptr) > 0)
+    if not len(non_empty):
+        return signatures
+
+    items = matrix.indices.astype(np.uint64)
+    starts = matrix.indptr[non_empty]
+    for i in range(n_hashes):
+        hashes = (a[i] * items + b[i]) % MINHASH_PRIME
+        signatures[non_empty, i] = np.minimum.reduceat(hashes, starts)
+    return signatures
+
+
+def _bucket_pairs(keys, max_bucket_size=DEFAULT_MAX_BUCKET_SIZE):
+    """
+    Returns the pairs (rows, cols), rows < cols, of the positions with equal keys.
+    """
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    run_start = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    run_size = np.diff(np.r_[run_start, len(keys)])
+
+    # each position pairs with the next positions of its run
+    positions = np.arange(len(keys))
+    counts = np.repeat(run_start + run_size, run_size) - positions - 1
+    if max_bucket_size is not None:
+        counts[np.repeat(run_size > max_bucket_size, run_size)] = 0
+    first = np.repeat(positions, counts)
+    second = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + first + 1
+
+    rows, cols = order[first], order[second]
+    return np.minimum(rows, cols), np.maximum(rows, cols)
+
+
+def lsh_candidate_pairs(signatures, bands, rows_per_band, max_bucket_size=DEFAULT_MAX_BUCKET_SIZE, seed=0):
+    """
+    Generates the candidate pairs of similar rows with LSH banding: the signatures are cut
+    into bands of rows_per_band hashes and two rows are candidates when they agree on a
+    whole band. A pair of similarity s is found with probability 1 - (1 - s^r)^b, whose
+    threshold is about (1 / b)^(1 / r): more bands raise the recall, longer bands the
+    precision.
+
+    Parameters:
+    - signatures (numpy.ndarray): MinHash signatures, with at least bands * rows_per_band hashes.
+    - bands (int): Number of bands.
+    - rows_per_band (int): Number of hashes per band.
+    - max_bucket_size (int, optional): Buckets with more rows are skipped, which bounds the
+      number of candidates at the cost of the recall of very common item sets. By default
+      DEFAULT_MAX_BUCKET_SIZE (1000 rows, about 500k pairs per bucket), None for no bound.
+    - seed (int): Seed of the hashing of the bands.
+
+    Returns:
+    - rows, cols (numpy.ndarray): The candidate pairs, rows < cols, sorted and unique.
+    """
+    if bands * rows_per_band > signatures.shape[1]:
+        raise ValueError(f'{bands} bands of {rows_per_band} rows need {bands * rows_per_band} hashes, '
+                         f'the signatures only have {signatures.shape[1]}')
+
+    n_rows = signatures.shape[0]
+    non_empty = np.flatnonzero(signatures[:, 0] != MINHASH_PRIME)
+    multipliers = np.random.default_rng(seed).integers(1, 2 ** 63, rows_per_band, dtype=np.uint64) | 1
+
+    pair_keys = []
+    for band in range(bands):
+        band_signatures = signatures[non_empty, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+        keys = (band_signatures * multipliers).sum(axis=1)
+        rows, cols = _bucket_pairs(keys, max_bucket_size)
+        pair_keys.append(non_empty[rows].astype(np.int64) * n_rows + non_empty[cols])
+
+    pair_keys = np.unique(np.concatenate(pair_keys)) if pair_keys else np.zeros(0, dtype=np.int64)
+    return pair_keys // n_rows, pair_keys % n_rows
+
+
+def approximate_jaccard_similarity(grouped_talks, user_column='User', bands=32, rows_per_band=4,
+                                   verify=True, max_bucket_size=DEFAULT_MAX_BUCKET_SIZE, seed=0):
+    """
+    Approximate version of jaccard_similarity for large user populations: the candidate pairs
+    are the pairs found by LSH on the MinHash signatures of the articles or of the categories
+    of the users, instead of every pair sharing an item.
+
+    Parameters:
+    - grouped_talks (pandas DataFrame): One row per user, with the set columns 'Article' and
+      'Categories'.
+    - user_column (str): Column identifying the users.
+    - bands, rows_per_band, max_bucket_size: LSH parameters, see lsh_candidate_pairs. The
+      default finds pairs of similarity 0.5 with probability 0.87 and 0.3 with 0.23.
+    - verify (bool): Whether to compute the exact intersections of the candidate pairs, so
+      that the similarities are exact and only some pairs are missing, or to estimate them
+      from the signatures.
+    - seed (int): Seed of the hash functions.
+
+    Returns:
+    - df_jaccard_similarity (pandas DataFrame): Same columns as jaccard_similarity, without the
+      pairs sharing nothing.
+    """
+    users = grouped_talks[user_column].to_numpy()
+    matrices = _talks_matrices(grouped_talks)
+    signatures = {name: minhash_signatures(matrix, bands * rows_per_band, seed) for name, matrix in matrices.items()}
+
+    candidates = [lsh_candidate_pairs(signature, bands, rows_per_band, max_bucket_size, seed)
+                  for signature in signatures.values()]
+    n_rows = len(users)
+    pair_keys = np.unique(np.concatenate([rows.astype(np.int64) * n_rows + cols for rows, cols in candidates]))
+    rows, cols = pair_keys // n_rows, pair_keys % n_rows
+
+    intersections = _PairIntersections(matrices)
+    if verify:
+        similarities = intersections.of_pairs(rows, cols)
+    else:
+        similarities = {}
+        for name, signature in signatures.items():
+            jaccard = (signature[rows] == signature[cols]).mean(axis=1)
+            sizes = intersections.sizes[name]
+            # |A n B| = J (|A| + |B|) / (1 + J)
+            estimated = np.rint(jaccard * (sizes[rows] + sizes[cols]) / (1 + jaccard)).astype(np.int64)
+            similarities[name] = (estimated, jaccard)
+
+    keep = (similarities['Article'][0] > 0) | (similarities['Categories'][0] > 0)
+    similarities = {name: (intersection[keep], jaccard[keep]) for name, (intersection, jaccard) in similarities.items()}
+    return _talks_similarity_frame(users, rows[keep], cols[keep], similarities)
+
+
+def similarity_error(approximate_df, grouped_talks, user_column='User', threshold=0.5,
+                     sample_size=500, seed=0):
+    """
+    Measures the error of approximate_jaccard_similarity against the exact similarities of the
+    pairs of a random sample of users.
+
+    Parameters:
+    - approximate_df (pandas DataFrame): Output of approximate_jaccard_similarity.
+    - grouped_talks (pandas DataFrame): The grouped talks it was computed from.
+    - user_column (str): Column identifying the users.
+    - threshold (float): 'Article Similarity' above which a pair counts as similar for the
+      recall and the precision.
+    - sample_size (int): Number of sampled users, whose pairs with every user are compared.
+    - seed (int): Seed of the sample.
+
+    Returns:
+    - error (pandas Series): 'Sampled Users', 'Exact Pairs' (similar pairs of the sampled users),
+      'Recall' (fraction of them in approximate_df), 'Precision' (fraction of the similar pairs of
+      approximate_df that are similar) and the mean absolute error of 'Article Similarity' and
+      'Categories Similarity' over the pairs in both.
+    """
+    users = grouped_talks[user_column].to_numpy()
+    n_rows = len(users)
+    sample = np.sort(np.random.default_rng(seed).choice(n_rows, min(sample_size, n_rows), replace=False))
+
+    rows, cols, similarities = _PairIntersections(_talks_matrices(grouped_talks)).of_rows(sample, upper=False)
+    exact_df = _talks_similarity_frame(users, np.minimum(rows, cols), np.maximum(rows, cols), similarities)
+    exact_df = exact_df.drop_duplicates(['User1', 'User2'])
+
+    sampled_users = users[sample]
+    approximate_df = approximate_df[approximate_df['User1'].isin(sampled_users) |
+                                    approximate_df['User2'].isin(sampled_users)]
+    merged = exact_df.merge(approximate_df, on=['User1', 'User2'], how='outer',
+                            suffixes=(' Exact', ' Approximate'), indicator=True)
+
+    exact_similar = merged['Article Similarity Exact'] >= threshold
+    approximate_similar = merged['Article Similarity Approximate'] >= threshold
+    both = merged['_merge'] == 'both'
+    return pd.Series({
+        'Sampled Users': len(sample),
+        'Exact Pairs': int(exact_similar.sum()),
+        'Recall': (exact_similar & both).sum() / exact_similar.sum() if exact_similar.any() else np.nan,
+        'Precision': (approximate_similar & exact_similar).sum() / approximate_similar.sum()
+        if approximate_similar.any() else np.nan,
+        'Article Similarity MAE': (merged.loc[both, 'Article Similarity Exact'] -
+                                   merged.loc[both, 'Article Similarity Approximate']).abs().mean(),
+        'Categories Similarity MAE': (merged.loc[both, 'Categories Similarity Exact'] -
+                                      merged.loc[both, 'Categories Similarity Approximate']).abs().mean(),
+    })
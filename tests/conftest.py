@@ -0,0 +1,42 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Make the modules package importable when pytest is run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+COMMENTS = ['', "'''Support''' per nom", 'Oppose, not enough experience', 'Neutral -- good editor but new',
+            'Strong support, great work on [[WP:AIV]]']
+
+
+def make_wiki_df(n_votes=3000, n_users=60, seed=0):
+    """
+    Random votes in elections of varied sizes, with a nullable 'VOT' as read_votes returns.
+    """
+    rng = np.random.default_rng(seed)
+    election_sizes = rng.integers(1, 120, size=n_votes)
+    election_ids = np.repeat(np.arange(1, len(election_sizes) + 1), election_sizes)[:n_votes]
+    users = np.array([f'User{i}' for i in range(n_users)], dtype=object)
+
+    votes = pd.array(rng.choice([1, 1, 0, -1], size=n_votes), dtype='Int8')
+    votes[rng.random(n_votes) < 0.02] = pd.NA
+    sources = users[rng.integers(0, n_users, size=n_votes)]
+    sources[rng.random(n_votes) < 0.02] = np.nan
+
+    return pd.DataFrame({
+        'SRC': sources,
+        'TGT': users[rng.integers(0, n_users, size=election_ids.max())][election_ids - 1],
+        'VOT': votes,
+        'RES': rng.integers(0, 2, size=election_ids.max())[election_ids - 1],
+        'DAT': pd.Timestamp('2003-01-01') + pd.to_timedelta(np.sort(rng.integers(0, 10 ** 8, size=n_votes)), unit='s'),
+        'TXT': np.array(COMMENTS, dtype=object)[rng.integers(0, len(COMMENTS), size=n_votes)],
+        'ELECTION_ID': election_ids,
+    })
+
+
+@pytest.fixture
+def wiki_df():
+    return make_wiki_df()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from modules.data_processing import ActivityIndex, create_elections_df, summarize_before_adminship
+
+
+def summarize_before_adminship_reference(row, wiki_df, edits_df):
+    """
+    Row-wise summarize_before_adminship of the Data Exploration notebook.
+    """
+    candidate, start_date = row['TGT'], row['Earliest Voting Date']
+    candidate_votes_before = wiki_df[(wiki_df['SRC'] == candidate) & (wiki_df['DAT'] < start_date)]
+    num_votes_no = (candidate_votes_before['VOT'] == -1).sum()
+    num_votes_yes = (candidate_votes_before['VOT'] == 1).sum()
+    num_votes_neutral = (candidate_votes_before['VOT'] == 0).sum()
+    return pd.Series({
+        'ELECTION_ID': row['ELECTION_ID'],
+        'TGT': candidate,
+        'RES': row['RES'],
+        'TotalNumPrevVotes': num_votes_no + num_votes_yes + num_votes_neutral,
+        'NumPrevVotesNo': num_votes_no,
+        'NumPrevVotesYes': num_votes_yes,
+        'NumPrevVotesNeutral': num_votes_neutral,
+        'AvgPrevCommentLength': candidate_votes_before['TXT'].str.len().mean(),
+        'NumPrevRevisions': edits_df[(edits_df['user_name'] == candidate)
+                                     & (edits_df['month'] < start_date)]['revisions'].sum(),
+    })
+
+
+def make_edits_df(wiki_df, seed=0):
+    rng = np.random.default_rng(seed)
+    users = pd.unique(pd.concat([wiki_df['SRC'].dropna(), wiki_df['TGT']]))
+    months = pd.date_range('2003-01-01', '2006-12-01', freq='MS')
+    edits_df = pd.DataFrame({
+        'user_name': rng.choice(users, 2000),
+        'month': rng.choice(months, 2000),
+        'revisions': rng.integers(0, 500, 2000).astype(float),
+    })
+    return edits_df.drop_duplicates(['user_name', 'month']).reset_index(drop=True)
+
+
+def test_summary_equals_the_notebook(wiki_df):
+    wiki_df['VOT'] = wiki_df['VOT'].astype('float64')
+    elections_df = create_elections_df(wiki_df)
+    edits_df = make_edits_df(wiki_df)
+
+    summary_df = summarize_before_adminship(elections_df, wiki_df, edits_df)
+    elections = elections_df[['ELECTION_ID', 'TGT', 'RES', 'Earliest Voting Date']].drop_duplicates()
+    expected = elections.apply(summarize_before_adminship_reference, axis=1, args=(wiki_df, edits_df))
+
+    assert list(summary_df.columns) == list(expected.columns)
+    assert summary_df['TotalNumPrevVotes'].sum() > 0
+    assert summary_df['TGT'].tolist() == expected['TGT'].tolist()
+    for column in expected.columns.drop('TGT'):
+        np.testing.assert_allclose(summary_df[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float),
+                                   err_msg=column)
+
+
+def test_before_is_strict_and_per_user():
+    times = pd.to_datetime(['2005-01-01', '2005-01-01', '2005-03-01', '2006-01-01'])
+    index = ActivityIndex(['a', 'b', 'a', 'a'], times, Value=[1, 10, 100, 1000])
+
+    before = index.before(['a', 'a', 'a', 'b', 'unknown'], pd.to_datetime(['2005-01-01', '2005-01-02', '2007-01-01',
+                                                                            '2005-06-01', '2007-01-01']))
+    assert before['Value'].tolist() == [0, 1, 1101, 10, 0]
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_processing import AgreementIndex, calculate_agreement_before_election, create_elections_df
+
+
+@pytest.mark.parametrize('vote_dtype', ['Int8', object])
+def test_workers_give_the_single_process_result(wiki_df, vote_dtype):
+    wiki_df['VOT'] = wiki_df['VOT'].astype(vote_dtype)
+    elections_df = create_elections_df(wiki_df)
+
+    single = calculate_agreement_before_election(wiki_df, elections_df, workers=1)
+    sharded = calculate_agreement_before_election(wiki_df, elections_df, workers=3)
+
+    assert len(single) > 0
+    pd.testing.assert_frame_equal(sharded, single)
+
+
+def test_incremental_index_gives_the_full_result(wiki_df, tmp_path):
+    expected = calculate_agreement_before_election(wiki_df, create_elections_df(wiki_df))
+
+    # the batches come latest first, so the later ones move first elections earlier
+    batches = np.array_split(wiki_df['ELECTION_ID'].unique(), 3)[::-1]
+    batch_dfs = [wiki_df[wiki_df['ELECTION_ID'].isin(batch)] for batch in batches]
+    assert set(batch_dfs[0]['TGT']) & set(batch_dfs[2]['TGT'])
+
+    index = AgreementIndex()
+    for i, batch_df in enumerate(batch_dfs):
+        index.update(batch_df)
+        if i == 1:
+            index.save(str(tmp_path / 'index.npz'))
+            index = AgreementIndex.load(str(tmp_path / 'index.npz'))
+
+    pd.testing.assert_frame_equal(index.to_frame(), expected)
+
+    index.save(str(tmp_path / 'index.npz'))
+    pd.testing.assert_frame_equal(AgreementIndex.load(str(tmp_path / 'index.npz')).to_frame(), expected)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_processing import cohort_retention, create_voters_df, voter_activity
+
+
+@pytest.fixture
+def votes_df(wiki_df):
+    # few votes per voter over many years, so that the voters are active in different years
+    votes_df = wiki_df.sample(frac=0.15, random_state=0)
+    votes_df['YEA'] = np.random.default_rng(1).integers(2003, 2013, len(votes_df))
+    return votes_df
+
+
+def notebook_retention(voters_df, years):
+    # loop of the Data Exploration notebook
+    voters_active_years = voters_df['Active Years']
+    results_df = pd.DataFrame(index=years, columns=years).astype(float)
+    for y1 in years:
+        for y2 in years:
+            if y1 == y2:
+                results_df.at[y1, y2] = 1
+            else:
+                results_df.at[y1, y2] = len(voters_active_years[voters_active_years.apply(
+                    lambda x: y1 in x and y2 in x)].index) / len(voters_active_years[voters_active_years.apply(
+                        lambda x: y1 in x)])
+    return results_df
+
+
+def test_retention_matches_notebook(votes_df):
+    voters_df, activity_df = create_voters_df(votes_df, with_activity=True)
+    assert activity_df.index.equals(pd.Index(voters_df['USER'], name='USER'))
+    for active_years, (_, active) in zip(voters_df['Active Years'], activity_df.iterrows()):
+        assert set(active_years) == set(activity_df.columns[active.to_numpy()])
+
+    years = votes_df['YEA'].unique()
+    expected = notebook_retention(voters_df, years)
+    retention = cohort_retention(activity_df)
+    assert 0 < retention.to_numpy().min() < 1
+    pd.testing.assert_frame_equal(retention.loc[years, years], expected, check_names=False, rtol=0, atol=1e-12)
+
+    sparse_activity = voter_activity(votes_df)
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in sparse_activity.dtypes)
+    pd.testing.assert_frame_equal(cohort_retention(sparse_activity), retention)
+
+
+def test_retention_counts(votes_df):
+    activity_df = voter_activity(votes_df, sparse=False)
+    counts = cohort_retention(activity_df, counts=True)
+
+    for y1 in activity_df.columns:
+        for y2 in activity_df.columns:
+            assert counts.at[y1, y2] == (activity_df[y1] & activity_df[y2]).sum()
+    np.testing.assert_array_equal(counts.to_numpy(), counts.to_numpy().T)
+    pd.testing.assert_frame_equal(cohort_retention(voter_activity(votes_df), counts=True), counts)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.compact_storage import load_compact, to_compact, user_categories
+
+
+def make_frames():
+    wiki_df = pd.DataFrame({
+        'SRC': ['alice', 'bob', None, 'carol', 'bob'],
+        'TGT': ['dave', 'dave', 'erin', 'erin', 'alice'],
+        'VOT': [1, -1, 0, 1, 1],
+        'RES': [1, 1, 0, 0, 1],
+        'YEA': [2004, 2004, 2010, 2010, 2012],
+        'TXT': ['Support', 'Oppose', '', 'per nom', 'Strong support'],
+    }, index=[10, 11, 13, 20, 42])
+    voters_df = pd.DataFrame({'USER': ['carol', 'alice', 'bob'], 'Votes Count': [1, 1, 2]})
+    return wiki_df, voters_df
+
+
+def test_round_trip_keeps_dtypes_index_and_shared_codes(tmp_path):
+    wiki_df, voters_df = make_frames()
+    users = user_categories(wiki_df, voters_df)
+    to_compact(wiki_df, str(tmp_path / 'wiki.arrow'), users=users)
+    to_compact(voters_df, str(tmp_path / 'voters.arrow'), users=users)
+
+    loaded = load_compact(str(tmp_path / 'wiki.arrow'), columns=['SRC', 'TGT', 'VOT'])
+    assert list(loaded.columns) == ['SRC', 'TGT', 'VOT']
+    assert loaded.index.tolist() == wiki_df.index.tolist()
+    assert isinstance(loaded['SRC'].dtype, pd.CategoricalDtype)
+    assert isinstance(loaded['TGT'].dtype, pd.CategoricalDtype)
+    assert loaded['VOT'].dtype == np.int8
+    assert loaded['SRC'].astype(object).tolist() == [name if name is not None else np.nan
+                                                     for name in wiki_df['SRC']]
+    assert loaded['TGT'].astype(object).tolist() == wiki_df['TGT'].tolist()
+
+    voters = load_compact(str(tmp_path / 'voters.arrow'))
+    assert loaded['SRC'].cat.categories.equals(voters['USER'].cat.categories)
+    assert voters['USER'].cat.codes.tolist() == users.get_indexer(voters_df['USER']).tolist()
+    assert loaded['SRC'].cat.codes.iloc[0] == voters['USER'].cat.codes.iloc[1]
+
+
+def test_usernames_missing_from_users_are_rejected(tmp_path):
+    wiki_df, _ = make_frames()
+    with pytest.raises(ValueError, match='carol'):
+        to_compact(wiki_df, str(tmp_path / 'wiki.arrow'), users=pd.Index(['alice', 'bob', 'dave', 'erin']))
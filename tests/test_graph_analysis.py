@@ -0,0 +1,171 @@
+import networkx as nx
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_processing import calculate_agreement_before_election, create_elections_df
+from modules.graph_analysis import (CommunityTracker, GraphSnapshot, TemporalVoteGraph, betweenness_centrality,
+                                    betweenness_error_bound, betweenness_pivots, community_agreement_matrix,
+                                    community_labels, community_vote_matrices, degree_centrality,
+                                    louvain_membership, membership_communities, modularity)
+
+
+@pytest.mark.parametrize('span, stride', [(1, 1), (2, 1), (2, 3), (3, 2), (1, 4), (20, 1)])
+def test_windows_cover_every_vote(span, stride):
+    years = np.arange(2003, 2013)
+    votes_df = pd.DataFrame({
+        'SRC': [f'User{i}' for i in range(len(years))],
+        'TGT': [f'User{i + 1}' for i in range(len(years))],
+        'YEA': years,
+    })
+    graph = TemporalVoteGraph.from_votes(votes_df, time_column='YEA')
+
+    starts, stops = graph._window_bounds(span, stride, 'year')
+    assert starts[0] == 2003 and np.all(np.diff(starts) == stride)
+    # the last window is the first one ending past the votes, unless the next one would
+    # start past them after the gap left by a stride longer than the span
+    assert stops[-1] > 2012 or starts[-1] + stride > 2012
+    assert len(stops) == 1 or stops[-2] <= 2012
+
+    covered = sum(snapshot.n_edges for snapshot in graph.windows(span, stride))
+    in_windows = sum(np.count_nonzero((years >= start) & (years < stop)) for start, stop in zip(starts, stops))
+    assert covered == in_windows
+    if stride <= span:
+        assert set(years) <= {year for start, stop in zip(starts, stops) for year in range(start, stop)}
+
+
+def make_vote_edges(n_users=70, n_votes=260, seed=0):
+    rng = np.random.default_rng(seed)
+    sources, targets = rng.integers(0, n_users, (2, n_votes))
+    keep = sources != targets
+    return pd.DataFrame({'SRC': [f'User{i}' for i in sources[keep]], 'TGT': [f'User{i}' for i in targets[keep]]})
+
+
+def networkx_values(values, snapshot):
+    return np.array([values[name] for name in snapshot.node_names()])
+
+
+@pytest.mark.parametrize('directed', [False, True])
+@pytest.mark.parametrize('normalized', [True, False])
+def test_betweenness_centrality_matches_networkx(directed, normalized):
+    snapshot = GraphSnapshot.from_edgelist(make_vote_edges(), 'SRC', 'TGT', directed=directed)
+    expected = networkx_values(nx.betweenness_centrality(snapshot.to_networkx(), normalized=normalized), snapshot)
+
+    np.testing.assert_allclose(betweenness_centrality(snapshot, normalized=normalized), expected, rtol=0, atol=1e-12)
+    # small batches so that the sources are split over the worker processes
+    np.testing.assert_allclose(betweenness_centrality(snapshot, normalized=normalized, workers=2, batch_size=8),
+                               expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('directed', [False, True])
+def test_degree_centrality_matches_networkx(directed):
+    snapshot = GraphSnapshot.from_edgelist(make_vote_edges(), 'SRC', 'TGT', directed=directed)
+    expected = networkx_values(nx.degree_centrality(snapshot.to_networkx()), snapshot)
+    np.testing.assert_allclose(degree_centrality(snapshot), expected, rtol=0, atol=1e-12)
+
+
+def test_sampled_betweenness_within_error_bound():
+    snapshot = GraphSnapshot.from_edgelist(make_vote_edges(n_users=150, n_votes=600), 'SRC', 'TGT')
+    exact = betweenness_centrality(snapshot)
+    for k in [20, 60]:
+        sampled = betweenness_centrality(snapshot, k=k, seed=0)
+        np.testing.assert_array_equal(sampled, betweenness_centrality(snapshot, k=k, seed=0))
+        assert np.abs(sampled - exact).max() <= betweenness_error_bound(snapshot.n_nodes, k)
+    np.testing.assert_allclose(betweenness_centrality(snapshot, k=snapshot.n_nodes, seed=0), exact)
+    assert betweenness_error_bound(snapshot.n_nodes, betweenness_pivots(snapshot.n_nodes, 0.2)) <= 0.2
+
+
+def make_planted_graph(n_groups=4, group_size=25, seed=0):
+    graph = nx.planted_partition_graph(n_groups, group_size, 0.5, 0.02, seed=seed)
+    edges = nx.to_pandas_edgelist(graph).astype({'source': str, 'target': str})
+    edges['weight'] = np.random.default_rng(seed).integers(1, 4, len(edges))
+    groups = [{str(node) for node in group} for group in graph.graph['partition']]
+    return edges, groups
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_modularity_matches_networkx(weighted):
+    edges, groups = make_planted_graph()
+    snapshot = GraphSnapshot.from_edgelist(edges, 'source', 'target', weight='weight')
+    graph = snapshot.to_networkx()
+    weight = 'weight' if weighted else None
+
+    membership = louvain_membership(snapshot, weighted=weighted)
+    for resolution in [1, 0.5]:
+        assert modularity(snapshot, membership, resolution, weighted) == pytest.approx(
+            nx.community.modularity(graph, membership_communities(snapshot, membership), weight, resolution),
+            abs=1e-12)
+    planted = community_labels(groups, snapshot.node_names()).to_numpy()
+    assert modularity(snapshot, planted, weighted=weighted) == pytest.approx(
+        nx.community.modularity(graph, groups, weight), abs=1e-12)
+
+
+def test_louvain_membership_finds_planted_partition():
+    edges, groups = make_planted_graph()
+    snapshot = GraphSnapshot.from_edgelist(edges, 'source', 'target')
+    membership = louvain_membership(snapshot, seed=1)
+
+    np.testing.assert_array_equal(membership, louvain_membership(snapshot, seed=1))
+    assert sorted(map(sorted, membership_communities(snapshot, membership))) == sorted(map(sorted, groups))
+    reference = nx.community.louvain_communities(snapshot.to_networkx(), weight=None, seed=1)
+    assert modularity(snapshot, membership) >= nx.community.modularity(snapshot.to_networkx(), reference,
+                                                                       weight=None) - 1e-12
+    # starting from the result, every node is already in its final community
+    np.testing.assert_array_equal(louvain_membership(snapshot, initial=membership, seed=2), membership)
+
+
+def test_community_tracker_matches_communities():
+    edges, _ = make_planted_graph()
+    # the same votes in two years, in another order in the second one
+    votes_df = pd.concat([edges.assign(YEA=2003), edges.iloc[::-1].assign(YEA=2004)], ignore_index=True)
+    first, second = TemporalVoteGraph.from_votes(votes_df.rename(columns={'source': 'SRC', 'target': 'TGT'}),
+                                                 time_column='YEA').windows()
+
+    tracker = CommunityTracker(seed=3)
+    tracker.track([first, second])
+    matches = tracker.matches[0]
+    assert sorted(matches) == sorted(matches.values()) == list(range(4))
+    np.testing.assert_array_equal(first.nodes, second.nodes)
+    np.testing.assert_array_equal(pd.Series(tracker.memberships[0]).map(matches), tracker.memberships[1])
+
+
+def make_communities(users, n_communities=4, seed=0):
+    # a few users in no community
+    groups = np.random.default_rng(seed).integers(-1, n_communities, len(users))
+    return [set(users[groups == community]) for community in range(n_communities)]
+
+
+def test_community_vote_matrices_match_notebook(wiki_df):
+    communities = make_communities(np.array([f'User{i}' for i in range(60)]))
+
+    matrices = community_vote_matrices(wiki_df, community_labels(communities))
+
+    # loops of the Graph Analysis notebook
+    for i, first in enumerate(communities):
+        for j, second in enumerate(communities):
+            votes = wiki_df[wiki_df['SRC'].isin(first) & wiki_df['TGT'].isin(second)]['VOT']
+            assert matrices['Total'][i, j] == len(votes)
+            for name, value in [('Positive', 1), ('Negative', -1), ('Neutral', 0)]:
+                expected = (votes == value).sum() / len(votes) * 100 if len(votes) else 0
+                assert matrices[name][i, j] == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_community_agreement_matrix_matches_notebook(wiki_df, strict):
+    agreement_df = calculate_agreement_before_election(wiki_df, create_elections_df(wiki_df))
+    agreement_df.loc[agreement_df.index[::7], 'Agreement Ratio'] = np.nan
+    communities = make_communities(np.array([f'User{i}' for i in range(60)]))
+
+    agreement = community_agreement_matrix(agreement_df, community_labels(communities), strict=strict)
+
+    for i, first in enumerate(communities):
+        for j, second in enumerate(communities):
+            if strict:
+                pairs = (agreement_df['USR1'].isin(first) & agreement_df['USR2'].isin(second)) | \
+                    (agreement_df['USR1'].isin(second) & agreement_df['USR2'].isin(first))
+            else:
+                # loop of the Graph Analysis notebook
+                pairs = (agreement_df['USR1'].isin(first) | agreement_df['USR2'].isin(first)) & \
+                    (agreement_df['USR1'].isin(second) | agreement_df['USR2'].isin(second))
+            expected = agreement_df[pairs]['Agreement Ratio'].mean()
+            np.testing.assert_allclose(agreement[i, j], expected, rtol=0, atol=1e-12)
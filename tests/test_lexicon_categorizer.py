@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.feature_extraction.text import CountVectorizer
+
+from modules.nlp_processing import COMMENT_CATEGORIES, LexiconCategorizer
+
+
+@pytest.fixture(scope='module')
+def lexicon():
+    empath = pytest.importorskip('empath')
+    lexicon = empath.Empath()
+    # built-in categories standing for the custom ones, created online by create_category
+    for category, builtin in zip(COMMENT_CATEGORIES, ['work', 'help', 'friends', 'leader', 'negative_emotion']):
+        lexicon.cats[category] = lexicon.cats[builtin]
+    return lexicon
+
+
+def make_comments(lexicon, n_comments=400, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [term for category in COMMENT_CATEGORIES for term in lexicon.cats[category][:30]]
+    words += ['admin', 'Support', 'The', 'good,', 'WORK'] * 20
+    return pd.Series([' '.join(rng.choice(words, rng.integers(1, 25))) for _ in range(n_comments)],
+                     index=rng.permutation(n_comments))
+
+
+def categorize_comment(lexicon, comment):
+    # categorize_comment of the NLP notebook
+    categories = lexicon.analyze(comment, categories=COMMENT_CATEGORIES, normalize=True)
+    theme = max(categories, key=categories.get)
+    if categories[theme] < 0.1:
+        theme = 'other'
+    return theme
+
+
+def test_categorize_matches_empath(lexicon):
+    comments = make_comments(lexicon)
+    categorizer = LexiconCategorizer(lexicon)
+
+    expected = pd.DataFrame([lexicon.analyze(comment, categories=COMMENT_CATEGORIES, normalize=True)
+                             for comment in comments], index=comments.index)
+    pd.testing.assert_frame_equal(categorizer.scores(comments), expected, check_exact=False, rtol=0, atol=1e-12)
+
+    categories = categorizer.categorize(comments)
+    assert categories.name == 'Category'
+    pd.testing.assert_series_equal(categories, comments.apply(lambda comment: categorize_comment(lexicon, comment)),
+                                   check_names=False)
+    assert set(categories) > {'other'}
+
+
+def test_tokens_are_split_on_whitespace():
+    categorizer = LexiconCategorizer({'a': ['Support', 'good'], 'b': ['good', 'admin']}, categories=['a', 'b'],
+                                     threshold=0.3)
+    comments = pd.Series(['Support admin', 'support admin', 'good, admin admin', 'good', 'x y z good', '', '  '])
+
+    scores = categorizer.scores(comments)
+    np.testing.assert_array_equal(scores['a'], [0.5, 0, 0, 1, 0.25, np.nan, np.nan])
+    np.testing.assert_array_equal(scores['b'], [0.5, 0.5, 2 / 3, 1, 0.25, np.nan, np.nan])
+    # ties go to the first category, as max() over the analyze dict
+    assert categorizer.categorize(comments).tolist() == ['a', 'b', 'b', 'a', 'other', 'other', 'other']
+
+
+def test_document_term_matrix(lexicon):
+    comments = make_comments(lexicon)
+    categorizer = LexiconCategorizer(lexicon)
+    vectorizer = CountVectorizer(tokenizer=str.split, token_pattern=None, lowercase=False)
+    dtm = vectorizer.fit_transform(comments)
+
+    scores = categorizer.scores(dtm=dtm, feature_names=vectorizer.get_feature_names_out())
+    np.testing.assert_allclose(scores.to_numpy(), categorizer.scores(comments).to_numpy(), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(categorizer.categorize(dtm=dtm, feature_names=vectorizer.get_feature_names_out()),
+                                  categorizer.categorize(comments))
@@ -0,0 +1,28 @@
+import numpy as np
+
+from modules.nlp_processing import NGramCounter
+
+
+def test_prefix_is_a_string_prefix_as_in_the_notebook():
+    texts = ['need admin tools', 'needs admin tools', 'knowledgeable editor', 'knowledge editor']
+    counter = NGramCounter(n_range=(2, 3)).update(texts)
+
+    need = counter.most_common(n=2, prefix='need')
+    assert sorted(need['N-gram']) == ['need admin', 'needs admin']
+    assert counter.most_common(n=2, prefix='need', whole_word=True)['N-gram'].tolist() == ['need admin']
+    assert counter.most_common(n=2, prefix='knowledge')['Count'].sum() == 2
+    assert counter.most_common(n=3, prefix='needs admin')['N-gram'].tolist() == ['needs admin tools']
+
+
+def test_missing_texts_keep_their_buckets_aligned():
+    texts = ['good admin', None, 'great tool', np.nan, 'good admin']
+    counter = NGramCounter(n_range=(2, 2)).update(texts, buckets=['a', 'b', 'c', 'd', 'a'], batch_size=2)
+
+    assert counter.most_common(bucket='a').values.tolist() == [['good admin', 2]]
+    assert counter.most_common(bucket='c').values.tolist() == [['great tool', 1]]
+    assert counter.most_common(bucket='b').empty
+
+
+def test_batches_of_missing_texts_do_not_stop_counting():
+    counter = NGramCounter(n_range=(2, 2)).update([None, None, 'great tool'], batch_size=2)
+    assert counter.count(['great tool']).tolist() == [1]
@@ -0,0 +1,125 @@
+import importlib.util
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from modules.data_processing import UserRegistry, create_elections_df
+from modules.pipeline_cache import PipelineCache
+
+STAGE_SOURCE = '''
+import pandas as pd
+
+CALLS = []
+
+
+def stage(path, factor=1):
+    CALLS.append(path)
+    with open(path, encoding='utf-8') as data_file:
+        values = [int(line) * factor for line in data_file]
+    return pd.DataFrame({'VALUE': values})
+
+
+def series_stage(df):
+    CALLS.append('series')
+    return df['VALUE'].rename('Doubled') * 2
+'''
+
+
+def load_stages(directory, source=STAGE_SOURCE):
+    path = os.path.join(directory, 'stages.py')
+    with open(path, 'w', encoding='utf-8') as module_file:
+        module_file.write(source)
+    spec = importlib.util.spec_from_file_location('stages', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_data(path, values):
+    with open(path, 'w', encoding='utf-8') as data_file:
+        data_file.write(''.join(f'{value}\n' for value in values))
+
+
+@pytest.fixture
+def setup(tmp_path):
+    data_path = str(tmp_path / 'data.txt')
+    write_data(data_path, [1, 2, 3])
+    return PipelineCache(str(tmp_path / 'cache')), load_stages(str(tmp_path)), data_path
+
+
+def test_hit_and_miss(setup):
+    cache, stages, data_path = setup
+
+    first = cache.run(stages.stage, data_path)
+    second = cache.run(stages.stage, data_path)
+    assert len(stages.CALLS) == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    cache.run(stages.stage, data_path, factor=2)
+    assert len(stages.CALLS) == 2
+
+
+def test_input_file_change_invalidates(setup):
+    cache, stages, data_path = setup
+    cache.run(stages.stage, data_path)
+
+    write_data(data_path, [4, 5, 6, 7])
+    result = cache.run(stages.stage, data_path)
+    assert len(stages.CALLS) == 2
+    assert result['VALUE'].tolist() == [4, 5, 6, 7]
+
+
+def test_stage_source_change_invalidates(setup, tmp_path):
+    cache, stages, data_path = setup
+    cache.run(stages.stage, data_path)
+
+    edited = load_stages(str(tmp_path), STAGE_SOURCE.replace('int(line) * factor', 'int(line) * factor + 1'))
+    result = cache.run(edited.stage, data_path)
+    assert edited.CALLS == [data_path]
+    assert result['VALUE'].tolist() == [2, 3, 4]
+
+
+def test_series_round_trip(setup):
+    cache, stages, data_path = setup
+    df = pd.DataFrame({'VALUE': [1, 2, 3]}, index=[5, 6, 7])
+
+    computed = cache.run(stages.series_stage, df)
+    loaded = cache.run(stages.series_stage, df)
+    assert stages.CALLS == ['series']
+    pd.testing.assert_series_equal(loaded, computed)
+    assert loaded.name == 'Doubled'
+
+
+def test_least_recently_used_results_are_evicted(setup, tmp_path):
+    cache, stages, data_path = setup
+    cache.run(stages.stage, data_path, factor=1)
+    size = sum(os.path.getsize(os.path.join(cache.cache_dir, name))
+               for name in os.listdir(cache.cache_dir) if name.endswith('.parquet'))
+    cache.max_bytes = int(3.5 * size)
+
+    for factor in [2, 3]:
+        time.sleep(0.05)
+        cache.run(stages.stage, data_path, factor=factor)
+    time.sleep(0.05)
+    cache.run(stages.stage, data_path, factor=1)  # hit, now the most recently used
+    time.sleep(0.05)
+    cache.run(stages.stage, data_path, factor=4)  # over the budget, evicts factor=2
+
+    calls = len(stages.CALLS)
+    for factor in [1, 3, 4]:
+        cache.run(stages.stage, data_path, factor=factor)
+    assert len(stages.CALLS) == calls
+    cache.run(stages.stage, data_path, factor=2)
+    assert len(stages.CALLS) == calls + 1
+
+
+def test_arguments_without_stable_repr_are_rejected(setup):
+    cache, _, _ = setup
+    df = pd.DataFrame({'ELECTION_ID': [1], 'TGT': ['a'], 'RES': [1], 'VOT': [1],
+                       'DAT': pd.to_datetime(['2005-01-01'])})
+
+    assert cache.key(create_elections_df, df, registry=None) == cache.key(create_elections_df, df, registry=None)
+    with pytest.raises(TypeError, match='UserRegistry'):
+        cache.run(create_elections_df, df, registry=UserRegistry())
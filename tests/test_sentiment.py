@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from modules import nlp_processing
+from modules.nlp_processing import SENTIMENT_SCORERS, sentiment_scores
+from modules.pipeline_cache import PipelineCache
+
+
+def test_score_cache_survives_pipeline_cache_clear(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    texts = pd.Series(['great candidate, strong support', 'terrible idea', np.nan, 'great candidate, strong support'],
+                      index=[3, 5, 7, 9])
+
+    scores_df = sentiment_scores(texts, analyzers=('vader',))
+    PipelineCache().clear()
+
+    def no_scoring(texts):
+        raise AssertionError('the texts should be read from the cache')
+
+    monkeypatch.setitem(SENTIMENT_SCORERS, 'vader', no_scoring)
+    pd.testing.assert_frame_equal(sentiment_scores(texts, analyzers=('vader',)), scores_df)
+
+
+def test_missing_texts_are_not_scored(tmp_path):
+    texts = pd.Series(['nan', np.nan, None, 'good'])
+    scores_df = sentiment_scores(texts, cache_dir=str(tmp_path))
+
+    assert scores_df.iloc[[1, 2]].isna().all().all()
+    assert scores_df.iloc[[0, 3]].notna().all().all()
+    assert list(scores_df.columns) == nlp_processing.SENTIMENT_FIELDS['vader'] + nlp_processing.SENTIMENT_FIELDS['textblob']
+    assert (scores_df.dtypes == np.float32).all()
+
+    assert sentiment_scores(pd.Series([np.nan]), cache_dir=None).isna().all().all()
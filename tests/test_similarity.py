@@ -0,0 +1,106 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from modules.similarity import (MINHASH_PRIME, _bucket_pairs, approximate_jaccard_similarity, jaccard_similarity,
+                                minhash_signatures, similarity_error)
+
+
+def make_grouped_talks(n_users=80, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for user in range(n_users):
+        n_items = rng.integers(0, 25)
+        rows.append((f'User{user}', {f'A{item}' for item in rng.zipf(1.3, n_items) % 500},
+                     {f'C{item}' for item in rng.zipf(1.5, n_items) % 100}))
+    return pd.DataFrame(rows, columns=['User', 'Article', 'Categories'])
+
+
+def jaccard_similarity_reference(grouped_talks):
+    """
+    itertools.combinations loop of the Graph Analysis notebook.
+    """
+    def jaccard(a, b):
+        union = len(a | b)
+        return len(a & b) / union if union > 0 else 0
+
+    rows = []
+    for user1, user2 in combinations(grouped_talks['User'], 2):
+        entry1 = grouped_talks[grouped_talks['User'] == user1]
+        entry2 = grouped_talks[grouped_talks['User'] == user2]
+        articles1, articles2 = entry1['Article'].iloc[0], entry2['Article'].iloc[0]
+        categories1, categories2 = entry1['Categories'].iloc[0], entry2['Categories'].iloc[0]
+        rows.append((user1, user2, jaccard(articles1, articles2), jaccard(categories1, categories2),
+                     len(categories1 & categories2), len(articles1 & articles2)))
+    return pd.DataFrame(rows, columns=['User1', 'User2', 'Article Similarity', 'Categories Similarity',
+                                       'Categories Intersection', 'Articles Intersection'])
+
+
+def test_jaccard_similarity_equals_the_combinations_loop():
+    grouped_talks = make_grouped_talks()
+    expected = jaccard_similarity_reference(grouped_talks)
+    # the pairs sharing nothing are not enumerated
+    expected = expected[(expected['Articles Intersection'] > 0) | (expected['Categories Intersection'] > 0)]
+    expected = expected.reset_index(drop=True)
+
+    for block_size in [7, 2048]:
+        similarity_df = jaccard_similarity(grouped_talks, block_size=block_size, block_pairs=50 * block_size)
+        pd.testing.assert_frame_equal(similarity_df, expected, check_dtype=False)
+
+
+def test_min_intersection_and_top_k():
+    grouped_talks = make_grouped_talks()
+    full = jaccard_similarity(grouped_talks)
+
+    shared = jaccard_similarity(grouped_talks, min_intersection=2)
+    assert len(shared) < len(full)
+    assert ((shared['Articles Intersection'] >= 2) | (shared['Categories Intersection'] >= 2)).all()
+
+    k = 3
+    both_ways = pd.concat([full.rename(columns={'User1': 'User', 'User2': 'Other'}),
+                           full.rename(columns={'User2': 'User', 'User1': 'Other'})])
+    kth = both_ways.groupby('User')['Article Similarity'].apply(lambda s: s.nlargest(k).iloc[-1] if len(s) >= k else 0)
+    expected = full[(full['Article Similarity'] >= full['User1'].map(kth).fillna(0))
+                    | (full['Article Similarity'] >= full['User2'].map(kth).fillna(0))].reset_index(drop=True)
+    pd.testing.assert_frame_equal(jaccard_similarity(grouped_talks, top_k=k, block_size=13), expected,
+                                  check_dtype=False)
+
+
+def test_bucket_pairs_are_the_pairs_of_equal_keys():
+    keys = np.array([3, 1, 3, 2, 3, 1, 7], dtype=np.uint64)
+    rows, cols = _bucket_pairs(keys, max_bucket_size=None)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(0, 2), (0, 4), (1, 5), (2, 4)]
+
+    rows, cols = _bucket_pairs(keys, max_bucket_size=2)
+    assert sorted(zip(rows.tolist(), cols.tolist())) == [(1, 5)]
+
+
+def test_approximate_similarity_finds_near_duplicates_exactly():
+    grouped_talks = make_grouped_talks(200)
+    duplicates = grouped_talks.sample(40, random_state=0).assign(User=lambda df: df['User'] + 'd')
+    duplicates['Article'] = [set(sorted(articles)[:-1]) if len(articles) > 3 else articles
+                             for articles in duplicates['Article']]
+    grouped_talks = pd.concat([grouped_talks, duplicates], ignore_index=True)
+    exact = jaccard_similarity(grouped_talks)
+
+    approximate = approximate_jaccard_similarity(grouped_talks)
+    merged = approximate.merge(exact, on=['User1', 'User2'], suffixes=('', ' exact'))
+    assert len(merged) == len(approximate)
+    for column in ['Article Similarity', 'Categories Similarity', 'Articles Intersection']:
+        np.testing.assert_allclose(merged[column], merged[f'{column} exact'])
+
+    error = similarity_error(approximate, grouped_talks, threshold=0.5, sample_size=len(grouped_talks))
+    assert error['Precision'] == 1
+    assert error['Recall'] > 0.8
+
+    unverified = approximate_jaccard_similarity(grouped_talks, verify=False)
+    assert similarity_error(unverified, grouped_talks, threshold=0.5)['Article Similarity MAE'] < 0.1
+
+
+def test_minhash_agreement_estimates_jaccard():
+    matrix = sp.csr_matrix(np.array([[1, 1, 1, 1, 0, 0], [1, 1, 1, 0, 1, 0], [0, 0, 0, 0, 0, 0]]))
+    signatures = minhash_signatures(matrix, n_hashes=2000, seed=1)
+    assert abs((signatures[0] == signatures[1]).mean() - 3 / 5) < 0.05
+    assert (signatures[2] == MINHASH_PRIME).all()
@@ -0,0 +1,31 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from modules.data_processing import remove_wiki_markup, remove_wiki_markup_batch
+
+# Comments covering every pass of remove_wiki_markup and their edge cases (unpaired and
+# nested markup, line breaks, unicode), followed by random combinations of markup pieces,
+# with the output of the original twelve-pass implementation
+GOLDEN_PATH = os.path.join(os.path.dirname(__file__), 'data', 'wiki_markup_golden.json')
+
+with open(GOLDEN_PATH, encoding='utf-8') as golden_file:
+    GOLDEN = json.load(golden_file)
+
+
+@pytest.mark.parametrize('case', GOLDEN, ids=range(len(GOLDEN)))
+def test_remove_wiki_markup_golden(case):
+    assert remove_wiki_markup(case['input']) == case['expected']
+
+
+def test_remove_wiki_markup_batch_golden():
+    texts = [case['input'] for case in GOLDEN]
+    expected = [case['expected'] for case in GOLDEN]
+
+    assert remove_wiki_markup_batch(texts) == expected
+    assert remove_wiki_markup_batch(iter(texts)) == expected
+
+    series = pd.Series(texts * 2, index=range(10, 10 + 2 * len(texts)))
+    pd.testing.assert_series_equal(remove_wiki_markup_batch(series), pd.Series(expected * 2, index=series.index))
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+from modules.data_processing import AUTHORS_COLUMNS, _wikitable_column, read_wikitable
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def test_only_the_leading_cells_are_filled():
+    options = AUTHORS_COLUMNS['NB_ARTICLES']
+    assert _wikitable_column([None, 'x', '1,204', '1,100', '17'], options).tolist() == [1205, 1205, 1204, 1100, 17]
+    assert _wikitable_column([None, '3', '2'], AUTHORS_COLUMNS['RANK']).tolist() == [1, 3, 2]
+
+    with pytest.raises(ValueError, match='cell 3'):
+        _wikitable_column([None, '1,204', '1,100', '1O0', '17'], options)
+
+
+def test_authors_tied_block():
+    authors_df = read_wikitable(os.path.join(DATA_DIR, 'top_authors.txt'), columns=AUTHORS_COLUMNS)
+    assert (authors_df.loc[:100, 'RANK'] == 1).all()
+    assert (authors_df.loc[:100, 'NB_ARTICLES'] == authors_df.loc[101, 'NB_ARTICLES'] + 1).all()